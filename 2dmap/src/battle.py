@@ -0,0 +1,253 @@
+import os
+import random
+
+import numpy as np
+
+from map.generate_map import load_map_from_csv  # 导入地图加载函数
+from map.map_file import MAP_FILE, load_map_file  # 导入二进制地图加载函数
+from map.pathfinding import PathFinder  # 导入寻路服务
+from map.line_of_sight import LineOfSight  # 导入视线判定
+from map.terrain import MutableTerrain, writable  # 导入可修改地形
+from map.visibility import FogOfWar  # 导入战争迷雾
+from entites.soldier import Engineer, Medic, Assault, Support  # 导入士兵类
+from entites.spatial import first_enemy_index_in_range  # 导入空间索引查询
+from entites.influence import InfluenceMap, HEAL_DISTANCE, heal_reach  # 导入影响力地图
+from entites.batch import (ACTION_IDLE, ACTION_ATTACK, ACTION_BUILD, ACTION_HEAL, ENGINEER, MEDIC, ASSAULT, SUPPORT,
+                           PLAYER_TEAM, ENEMY_TEAM)  # 导入动作、兵种和队伍编号
+from entites.commands import CommandBuffer, COMMAND_MOVE_TO  # 导入命令缓冲区
+from entites.combat import CombatResolver  # 导入批量战斗结算
+from events import event_log, TEAM_NAMES  # 导入事件流
+from instrumentation import profiler  # 导入性能统计
+
+# 地图文件路径
+TERRAIN_FILE = "terrain_map.csv"
+HEIGHT_FILE = "height_map.csv"
+
+# 默认编制：(兵种编号, 队伍编号, x, y)，与 rl.env.DEFAULT_ROSTER 相同
+DEFAULT_ROSTER = (
+    (ENGINEER, PLAYER_TEAM, 100, 100),
+    (MEDIC, PLAYER_TEAM, 150, 100),
+    (ASSAULT, PLAYER_TEAM, 200, 100),
+    (SUPPORT, PLAYER_TEAM, 250, 100),
+    (ENGINEER, ENEMY_TEAM, 500, 500),
+    (MEDIC, ENEMY_TEAM, 550, 500),
+    (ASSAULT, ENEMY_TEAM, 600, 500),
+    (SUPPORT, ENEMY_TEAM, 650, 500),
+)
+UNIT_CLASSES = (Engineer, Medic, Assault, Support)  # 按兵种编号排列的士兵类
+# 工程兵所在格子周围多少格内有障碍物时视为已有掩体；随机地图上障碍物很密，相邻格子几乎总有障碍物，
+# 因此只看所在格子，也就是工程兵自己修筑的障碍物
+COVER_RADIUS = 0
+
+
+class Battle:
+    """一局对战的全部状态和回合逻辑，不依赖窗口，可以在无界面模式下运行
+
+    fog_of_war 默认关闭（与 VecBattleEnv 一致），双方都能选中射程内的任何敌人。
+    influence=True 时每个阶段更新影响力平面，并按它调整默认规则（见 steer_by_influence），平面也可供外部策略读取。
+    recorder 不为空时每个阶段执行前把命令缓冲区交给它记录；playback 不为空时由它填入命令，
+    代替默认规则（见 entites.replay.CommandRecorder）。
+    """
+
+    def __init__(self, seed=None, fog_of_war=False, influence=False):
+        self.seed = seed  # 随机种子，录制时保存，回放时用同一个种子新建对局
+        self.turn_counter = 0  # 当前回合计数
+        self.fog_of_war = fog_of_war  # 是否只能看到己方视野内的敌人
+        self.track_influence = influence  # 是否维护影响力平面
+        self.combat = CombatResolver(seed=seed)  # 每个阶段的攻击批量结算，给定种子时结果可复现
+        self.rng = random.Random(seed)  # 单位逐发命中判定（如瞄准射击）共用的随机数来源
+        self.player_commands = CommandBuffer()  # 蓝方每回合的命令，回合之间复用
+        self.enemy_commands = CommandBuffer()  # 红方每回合的命令
+        self.player_units = []  # 玩家单位列表
+        self.enemy_units = []  # 敌方单位列表
+        self.terrain_map = None  # 地形地图
+        self.height_map = None  # 高度地图
+        self.pathfinder = None  # 寻路服务
+        self.line_of_sight = None  # 视线判定服务
+        self.terrain = None  # 可修改的地形，修改在每回合结束时通知寻路、视线等
+        self.fog = None  # 各阵营的视野（fog_of_war 为 True 时）
+        self.influence = None  # 视角 -> InfluenceMap（track_influence 为 True 时），每个阶段开始时增量更新
+        self.roster = []  # 初始编制，录制时保存
+        self.recorder = None  # 记录每个阶段的命令（CommandRecorder）
+        self.playback = None  # 按录像填入每个阶段的命令（CommandReplay）
+
+    def setup(self):
+        """加载地图并初始化单位"""
+        self.load_map()
+        self.initialize_units()
+
+    def load_map(self):
+        """加载地图，优先使用二进制地图文件，不存在时回退到 CSV 文件"""
+        with profiler.timer("map_load"):
+            if os.path.exists(MAP_FILE):
+                self.terrain_map, self.height_map, _ = load_map_file(MAP_FILE)
+            else:
+                game_map = load_map_from_csv(TERRAIN_FILE, HEIGHT_FILE)
+                self.terrain_map, self.height_map = game_map[:, :, 0], game_map[:, :, 1]
+            self.terrain_map, self.height_map = writable(self.terrain_map), writable(self.height_map)
+            self.bind_terrain()
+
+    def bind_terrain(self):
+        """根据当前的地形和高度数组创建寻路、视线服务，并注册为地形修改的监听者"""
+        self.pathfinder = PathFinder(self.terrain_map)
+        self.line_of_sight = LineOfSight(self.terrain_map, self.height_map)
+        self.terrain = MutableTerrain(self.terrain_map, self.height_map)
+        self.terrain.add_listener(self.pathfinder.update_cells)
+        self.terrain.add_listener(self.line_of_sight.update_cells)
+        if self.fog_of_war:
+            self.fog = FogOfWar(self.terrain_map, self.height_map)
+            self.terrain.add_listener(self.fog.update_cells)
+        self.influence = {} if self.track_influence else None
+
+    def initialize_units(self, roster=DEFAULT_ROSTER):
+        """按编制 (兵种编号, 队伍编号, x, y) 初始化玩家和敌方单位"""
+        self.roster = [tuple(entry) for entry in roster]
+        self.player_units = []
+        self.enemy_units = []
+        for unit_type, team, x, y in self.roster:
+            unit = UNIT_CLASSES[unit_type](x, y, TEAM_NAMES[team])
+            (self.player_units if team == PLAYER_TEAM else self.enemy_units).append(unit)
+
+        # 支援兵瞄准时需要判断视线，工程兵修筑完成时修改地形
+        for unit in self.player_units + self.enemy_units:
+            unit.rng = self.rng
+            if isinstance(unit, Support):
+                unit.line_of_sight = self.line_of_sight
+            elif isinstance(unit, Engineer):
+                unit.terrain = self.terrain
+
+        self.player_commands.bind(self.player_units)
+        self.enemy_commands.bind(self.enemy_units)
+
+    def handle_turn_logic(self):
+        """处理回合逻辑"""
+        self.turn_counter += 1
+        with profiler.timer("turn"):
+            event_log.begin_turn(self.turn_counter)
+
+            # 执行回合操作，射程内有敌人则攻击，否则移动；射程内的敌人由网格空间索引批量查询
+            self.run_phase(self.player_commands, self.player_units, self.enemy_units, 300, 300)  # 示例移动到某个位置
+
+            # 同样处理敌方单位的回合逻辑
+            self.run_phase(self.enemy_commands, self.enemy_units, self.player_units, 600, 600)
+
+            # 本回合的地形修改只刷新受影响的区域
+            with profiler.timer("terrain"):
+                self.terrain.flush()
+
+            # 本回合的事件批量交给输出端
+            with profiler.timer("events"):
+                event_log.flush()
+
+        if profiler.enabled:
+            profiler.gauge("alive_blue", sum(u.is_alive() for u in self.player_units))
+            profiler.gauge("alive_red", sum(u.is_alive() for u in self.enemy_units))
+            profiler.end_turn()
+
+    def run_phase(self, commands, units, enemies, move_x, move_y):
+        """一方的行动阶段：按默认规则生成整批命令，分组执行后统一结算攻击
+
+        与 Engineer.take_turn 一致，修筑进行中的工程兵继续修筑，完成时在所在格子放置障碍物。
+        射程内有敌人、还没有掩体（见 COVER_RADIUS）的工程兵不开火，而是原地修筑障碍物作为掩体。
+        """
+        with profiler.timer("visibility"):
+            visible = self.visible_enemies(units, enemies)
+        if self.influence is not None:
+            with profiler.timer("influence"):
+                self.update_influence(units, enemies, visible)
+        with profiler.timer("target_selection"):
+            if self.playback is not None:
+                self.playback.load_phase(commands)
+            else:
+                first = first_enemy_index_in_range(units, enemies, visible=visible)
+                building = np.array([isinstance(u, Engineer) and (u.build_turns > 0 or (
+                    target >= 0 and not self.terrain.obstacle_near(u.x, u.y, COVER_RADIUS)))
+                    for u, target in zip(units, first)], dtype=bool)
+                code = np.where(building, ACTION_BUILD, np.where(first >= 0, ACTION_ATTACK, COMMAND_MOVE_TO))
+                goal_x = np.full(len(units), float(move_x))
+                goal_y = np.full(len(units), float(move_y))
+                if self.influence is not None and units and enemies:
+                    self.steer_by_influence(units, enemies, code, first, goal_x, goal_y)
+                commands.submit(code, first, goal_x, goal_y)
+        if self.recorder is not None:
+            self.recorder.record_phase(commands)
+        with profiler.timer("commands"):
+            commands.execute(units, enemies, self.pathfinder, self.combat)
+        with profiler.timer("combat"):
+            self.combat.resolve()
+
+    def visible_enemies(self, units, enemies):
+        """更新 units 所在阵营的视野（只重新计算移动过的单位），返回 enemies 中可见的布尔数组
+
+        没有开启战争迷雾时返回 None，表示全部可见。
+        """
+        if self.fog is None or not units:
+            return None
+        team = units[0].team
+        self.fog.update(team, units)
+        return self.fog.visible_mask(team, enemies)
+
+    def influence_view(self, team):
+        """team 视角下的影响力地图：开启战争迷雾时每个阵营一份，否则各阵营共用一份"""
+        key = team if self.fog is not None else None
+        influence = self.influence.get(key)
+        if influence is None:
+            rows, cols = self.terrain_map.shape
+            influence = self.influence[key] = InfluenceMap(cols * self.terrain.tile_size,
+                                                           rows * self.terrain.tile_size)
+        return influence
+
+    def update_influence(self, units, enemies, visible=None):
+        """更新 units 所在阵营视角下双方的影响力平面（只重新盖章位置或状态改变的单位）
+
+        visible 为 visible_enemies 的结果，开启战争迷雾时看不见的敌人不计入。
+        """
+        if self.influence is None or not units:
+            return
+        influence = self.influence_view(units[0].team)
+        influence.update(units[0].team, units)
+        if enemies:
+            influence.update(enemies[0].team, enemies, visible)
+
+    def steer_by_influence(self, units, enemies, code, target, goal_x, goal_y):
+        """用影响力平面调整默认规则生成的命令（原地修改 code、target 和移动目标），每个单位只查几次表
+
+        医疗兵：射程内没有敌人时走向其他医疗兵覆盖最少的受伤友军（覆盖相同时取最近的），到达后治疗。
+        移动中的单位：下一步所在格子的敌方火力高于己方、并且高于当前格子时原地待命，不走进敌方火力占优的区域。
+        """
+        team, enemy_team = units[0].team, enemies[0].team
+        influence = self.influence_view(team)
+        moving = code == COMMAND_MOVE_TO
+
+        injured = [i for i, u in enumerate(units) if u.is_alive() and u.health < 100]
+        if injured:
+            ix = np.array([units[i].x for i in injured], dtype=float)
+            iy = np.array([units[i].y for i in injured], dtype=float)
+            coverage = influence.heal_at(team, ix, iy)
+            for i, unit in enumerate(units):
+                if not moving[i] or not isinstance(unit, Medic) or not unit.is_alive():
+                    continue
+                others = coverage - influence.reaches(unit.x, unit.y, heal_reach(unit), ix, iy)
+                distance = np.hypot(ix - unit.x, iy - unit.y)
+                j = int(np.lexsort((distance, others))[0])
+                if distance[j] < HEAL_DISTANCE:
+                    code[i], target[i] = ACTION_HEAL, injured[j]
+                else:
+                    goal_x[i], goal_y[i] = ix[j], iy[j]
+
+        movers = np.flatnonzero(code == COMMAND_MOVE_TO)
+        if len(movers):
+            x = np.array([units[i].x for i in movers], dtype=float)
+            y = np.array([units[i].y for i in movers], dtype=float)
+            speed = np.array([units[i].speed for i in movers], dtype=float)
+            dx, dy = goal_x[movers] - x, goal_y[movers] - y
+            step = np.minimum(speed / np.maximum(np.hypot(dx, dy), 1e-9), 1)
+            next_x, next_y = x + dx * step, y + dy * step
+            danger = influence.threat_at(enemy_team, next_x, next_y)
+            hold = ((danger > influence.threat_at(team, next_x, next_y))
+                    & (danger > influence.threat_at(enemy_team, x, y)))
+            code[movers[hold]] = ACTION_IDLE
+
+    def is_over(self):
+        """某一方全部阵亡时对局结束"""
+        return not any(u.is_alive() for u in self.player_units) or not any(u.is_alive() for u in self.enemy_units)
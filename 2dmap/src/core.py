@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+# 模拟核心：士兵、武器、动作、战斗结算和地图逻辑，只依赖 NumPy，不导入 arcade / pyglet。
+# 无界面的训练或推演进程只需 import core（或其中的模块）；窗口和界面在 gui.py 中，由 main.py 按需导入。
+#
+# 用法（在 2dmap/src 目录下）：python core.py   # 在全新的解释器中报告各模块的导入耗时
+
+from entites.soldier import Weapon, Soldier, Engineer, Medic, Assault, Support
+from entites.actions import (Action, MoveAction, AttackAction, BuildObstacleAction, HealAction, ReloadAction,
+                             AimAndAttackAction, SupplyAction, execute_action)
+from entites.batch import SoldierArrays, BatchEngine
+from entites.combat import CombatResolver
+from entites.commands import CommandBuffer
+from entites.influence import TeamInfluence, InfluenceMap
+from entites.replay import BattleRecorder, Replay, load_replay, CommandRecorder, CommandReplay, load_command_replay
+from map.generate_map import generate_random_map, generate_random_map_tiled, load_map_from_csv, save_map_to_csv
+from map.map_file import load_map_file, save_map_file
+from map.chunked_map import ChunkedMap
+from map.pathfinding import PathFinder
+from map.line_of_sight import LineOfSight
+from map.visibility import TeamVisibility, FogOfWar
+from battle import Battle
+from scheduler import TurnScheduler, run_headless
+from events import event_log
+from instrumentation import profiler
+
+# 报告导入耗时时按顺序导入的模块（后面的模块只计入前面没有导入过的部分）
+CORE_MODULES = (
+    "numpy",
+    "events",
+    "instrumentation",
+    "entites.soldier",
+    "entites.actions",
+    "entites.batch",
+    "entites.combat",
+    "entites.commands",
+    "entites.influence",
+    "entites.replay",
+    "map.generate_map",
+    "map.map_file",
+    "map.chunked_map",
+    "map.pathfinding",
+    "map.line_of_sight",
+    "map.visibility",
+    "battle",
+    "scheduler",
+)
+# 核心模块不应加载的图形相关依赖
+GUI_MODULES = ("arcade", "pyglet")
+
+_REPORT_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+times = []
+for name in {modules!r}:
+    t = time.perf_counter()
+    importlib.import_module(name)
+    times.append((name, time.perf_counter() - t))
+total = time.perf_counter() - start
+gui = [m for m in {gui!r} if m in sys.modules]
+print(json.dumps({{"total": total, "modules": times, "gui_modules": gui}}))
+"""
+
+
+def import_report(modules=CORE_MODULES):
+    """在全新的解释器中依次导入核心模块，返回 {total, modules: [(模块, 秒)], gui_modules}
+
+    gui_modules 列出被意外加载的图形依赖，正常情况下为空。
+    """
+    script = _REPORT_SCRIPT.format(modules=tuple(modules), gui=GUI_MODULES)
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, "-c", script], text=True,
+                                     cwd=os.path.dirname(os.path.abspath(__file__)))
+    report = json.loads(output)
+    report["process"] = time.perf_counter() - start  # 包括解释器启动在内的总耗时
+    return report
+
+
+def main():
+    report = import_report()
+    for name, seconds in report["modules"]:
+        print(f"{name:<20} {seconds * 1000:8.1f} ms")
+    print(f"{'合计':<20} {report['total'] * 1000:8.1f} ms（含解释器启动 {report['process'] * 1000:.1f} ms）")
+    if report["gui_modules"]:
+        print(f"警告：核心模块加载了图形依赖 {', '.join(report['gui_modules'])}")
+
+
+if __name__ == "__main__":
+    main()
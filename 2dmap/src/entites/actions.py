@@ -1,3 +1,7 @@
+from events import (event_log, EVENT_MOVE, EVENT_ATTACK, EVENT_BUILD, EVENT_HEAL, EVENT_RELOAD, EVENT_AIM,
+                    EVENT_SUPPLY, EVENT_ARMOR_RESTORED, EVENT_AMMO_RESTORED)
+
+
 class Action:
     """基本的行动类"""
     def __init__(self, soldier):
@@ -10,27 +14,32 @@ class Action:
 
 class MoveAction(Action):
     """移动动作"""
-    def __init__(self, soldier, target_x, target_y):
+    def __init__(self, soldier, target_x, target_y, pathfinder=None):
         super().__init__(soldier)
         self.target_x = target_x
         self.target_y = target_y
+        self.pathfinder = pathfinder  # 寻路服务，为 None 时沿直线移动
 
     def execute(self):
         """执行移动"""
-        print(f"{self.soldier.team} 的 {self.soldier.__class__.__name__} 移动到 ({self.target_x}, {self.target_y})")
-        self.soldier.move(self.target_x, self.target_y)
+        event_log.emit(EVENT_MOVE, self.soldier, x=self.target_x, y=self.target_y)
+        move_towards(self.soldier, self.target_x, self.target_y, self.pathfinder)
 
 
 class AttackAction(Action):
     """攻击动作"""
-    def __init__(self, soldier, target):
+    def __init__(self, soldier, target, resolver=None):
         super().__init__(soldier)
         self.target = target
+        self.resolver = resolver  # 战斗结算器（CombatResolver），为 None 时立即逐发结算
 
     def execute(self):
-        """执行攻击"""
-        print(f"{self.soldier.team} 的 {self.soldier.__class__.__name__} 攻击 {self.target.team} 的 {self.target.__class__.__name__}")
-        self.soldier.attack(self.target)
+        """执行攻击；有结算器时只声明攻击，由结算器在本阶段结束时批量结算"""
+        event_log.emit(EVENT_ATTACK, self.soldier, self.target)
+        if self.resolver is None:
+            self.soldier.attack(self.target)
+        else:
+            self.resolver.declare(self.soldier, self.target)
 
 
 class BuildObstacleAction(Action):
@@ -42,7 +51,7 @@ class BuildObstacleAction(Action):
 
     def execute(self):
         """执行修筑障碍"""
-        print(f"{self.soldier.team} 的工程兵正在修筑障碍")
+        event_log.emit(EVENT_BUILD, self.soldier)
         self.soldier.build_obstacle()
 
 
@@ -56,7 +65,7 @@ class HealAction(Action):
 
     def execute(self):
         """执行治疗"""
-        print(f"{self.soldier.team} 的医疗兵正在治疗 {self.target.team} 的单位")
+        event_log.emit(EVENT_HEAL, self.soldier, self.target)
         self.soldier.heal(self.target)
 
 
@@ -69,7 +78,7 @@ class ReloadAction(Action):
 
     def execute(self):
         """执行重新装弹"""
-        print(f"{self.soldier.team} 的突击兵正在重装弹夹")
+        event_log.emit(EVENT_RELOAD, self.soldier)
         self.soldier.reload()
 
 
@@ -83,7 +92,7 @@ class AimAndAttackAction(Action):
 
     def execute(self):
         """执行瞄准和攻击"""
-        print(f"{self.soldier.team} 的支援兵正在瞄准 {self.target.team} 的单位")
+        event_log.emit(EVENT_AIM, self.soldier, self.target)
         self.soldier.aim_and_attack(self.target)
 
 
@@ -97,14 +106,29 @@ class SupplyAction(Action):
 
     def execute(self):
         """执行补给弹药或护甲的动作"""
-        print(f"{self.soldier.team} 的支援兵正在为 {self.target.team} 提供补给")
-        # 这里可以根据需求选择恢复护甲或补充弹药
-        if self.target.armor < 100:
-            self.target.armor = min(self.target.armor + 50, 100)
-            print(f"{self.target.team} 的护甲恢复至 {self.target.armor}")
-        elif self.target.weapon and self.target.weapon.current_ammo < self.target.weapon.max_ammo:
-            self.target.weapon.reload()
-            print(f"{self.target.team} 的武器弹药已补充")
+        event_log.emit(EVENT_SUPPLY, self.soldier, self.target)
+        supply(self.target)
+
+
+def move_towards(soldier, target_x, target_y, pathfinder=None):
+    """朝目标移动一步；有寻路服务时沿路径朝下一个路点移动，目标不可达时原地不动"""
+    if pathfinder is None:
+        soldier.move(target_x, target_y)
+        return
+    waypoint = pathfinder.next_waypoint(soldier.x, soldier.y, target_x, target_y)
+    if waypoint is not None:
+        soldier.move(*waypoint)
+
+
+def supply(target):
+    """为目标补给：优先恢复护甲，护甲满时补充弹药"""
+    # 这里可以根据需求选择恢复护甲或补充弹药
+    if target.armor < 100:
+        target.armor = min(target.armor + 50, 100)
+        event_log.emit(EVENT_ARMOR_RESTORED, target, value=target.armor)
+    elif target.weapon and target.weapon.current_ammo < target.weapon.max_ammo:
+        target.weapon.reload()
+        event_log.emit(EVENT_AMMO_RESTORED, target)
 
 
 def execute_action(action):
@@ -0,0 +1,411 @@
+import numpy as np
+
+from entites.combat import HIT_CHANCE, CombatResolver, apply_sequential_hits
+from entites.spatial import UniformGrid
+from events import TEAM_NAMES, UNIT_TYPE_NAMES
+
+# 兵种编号（与 soldier.py 中的类一一对应）
+ENGINEER = 0  # 工程兵
+MEDIC = 1  # 医疗兵
+ASSAULT = 2  # 突击兵
+SUPPORT = 3  # 支援兵
+
+# 队伍编号
+PLAYER_TEAM = 0  # 蓝方
+ENEMY_TEAM = 1  # 红方
+
+# 兵种默认属性：生命值、护甲、速度、射程、伤害、最大弹药、射速（与 soldier.py 保持一致）
+UNIT_STATS = {
+    ENGINEER: (120, 100, 1.5, 40, 30, 7, 1),
+    MEDIC: (80, 50, 2, 40, 30, 7, 1),
+    ASSAULT: (100, 70, 2.5, 50, 40, 30, 3),
+    SUPPORT: (100, 50, 1.0, 200, 200, float('inf'), 1),
+}
+
+# 各队伍在射程内没有敌人时的移动目标（与 handle_turn_logic 一致）
+DEFAULT_MOVE_TARGETS = ((300, 300), (600, 600))
+
+# 动作编号（对应 actions.py 中的各个 Action 子类）
+ACTION_AUTO = 0  # 按 handle_turn_logic 的默认规则：射程内有敌人则攻击，否则移动
+ACTION_IDLE = 1  # 原地待命
+ACTION_ATTACK = 2  # AttackAction：攻击射程内第一个敌人
+ACTION_MOVE_UP = 3  # MoveAction：向上移动
+ACTION_MOVE_DOWN = 4  # MoveAction：向下移动
+ACTION_MOVE_LEFT = 5  # MoveAction：向左移动
+ACTION_MOVE_RIGHT = 6  # MoveAction：向右移动
+ACTION_BUILD = 7  # BuildObstacleAction（工程兵专属）
+ACTION_HEAL = 8  # HealAction（医疗兵专属）：治疗最近的受伤友军
+ACTION_RELOAD = 9  # ReloadAction（突击兵专属）
+ACTION_AIM = 10  # AimAndAttackAction（支援兵专属）：瞄准最近的敌人
+ACTION_SUPPLY = 11  # SupplyAction（支援兵专属）：为最近的友军补给护甲或弹药
+NUM_ACTIONS = 12
+
+# 移动动作对应的方向
+MOVE_DIRECTIONS = {
+    ACTION_MOVE_UP: (0, 1),
+    ACTION_MOVE_DOWN: (0, -1),
+    ACTION_MOVE_LEFT: (-1, 0),
+    ACTION_MOVE_RIGHT: (1, 0),
+}
+
+# 兵种专属动作（其他兵种执行时视为待命，与 actions.py 中的 ValueError 检查对应）
+EXCLUSIVE_ACTIONS = {
+    ACTION_BUILD: ENGINEER,
+    ACTION_HEAL: MEDIC,
+    ACTION_RELOAD: ASSAULT,
+    ACTION_AIM: SUPPORT,
+    ACTION_SUPPLY: SUPPORT,
+}
+
+CONTACT_DISTANCE = 10  # 治疗和补给需要的距离（与 Medic.take_turn 一致）
+
+# 每局单位数不超过该值时直接计算两两距离，超过时改用网格空间索引
+DENSE_UNIT_LIMIT = 256
+
+
+class SoldierArrays:
+    """以数组结构（SoA）保存所有单位的状态，形状为 (环境数, 单位数)"""
+
+    FIELDS = ("x", "y", "team", "unit_type", "health", "armor", "speed",
+              "range", "damage", "ammo", "max_ammo", "fire_rate",
+              "build_turns", "heal_turns", "reload_turns", "aim_turns")
+
+    def __init__(self, num_envs, num_units):
+        shape = (num_envs, num_units)
+        self.x = np.zeros(shape)
+        self.y = np.zeros(shape)
+        self.team = np.zeros(shape, dtype=np.int8)
+        self.unit_type = np.zeros(shape, dtype=np.int8)
+        self.health = np.zeros(shape)
+        self.armor = np.zeros(shape)
+        self.speed = np.zeros(shape)
+        self.range = np.zeros(shape)
+        self.damage = np.zeros(shape)
+        self.ammo = np.zeros(shape)  # 支援兵的弹药为无穷大，因此使用浮点数
+        self.max_ammo = np.zeros(shape)
+        self.fire_rate = np.zeros(shape, dtype=np.int64)
+        self.build_turns = np.zeros(shape, dtype=np.int64)  # 工程兵修筑进度
+        self.heal_turns = np.zeros(shape, dtype=np.int64)  # 医疗兵治疗进度
+        self.reload_turns = np.zeros(shape, dtype=np.int64)  # 突击兵装弹进度
+        self.aim_turns = np.zeros(shape, dtype=np.int64)  # 支援兵瞄准进度
+
+    @property
+    def num_envs(self):
+        return self.x.shape[0]
+
+    @property
+    def num_units(self):
+        return self.x.shape[1]
+
+    @classmethod
+    def from_roster(cls, unit_types, teams, xs, ys, num_envs=1):
+        """根据兵种、队伍和初始位置创建单位数组，所有环境使用相同的编制"""
+        unit_types = np.asarray(unit_types, dtype=np.int8)
+        units = cls(num_envs, len(unit_types))
+        units.unit_type[:] = unit_types
+        units.team[:] = np.asarray(teams, dtype=np.int8)
+        units.x[:] = np.asarray(xs, dtype=float)
+        units.y[:] = np.asarray(ys, dtype=float)
+
+        stats = np.array([UNIT_STATS[t] for t in range(len(UNIT_STATS))])
+        for column, name in enumerate(("health", "armor", "speed", "range", "damage", "max_ammo")):
+            getattr(units, name)[:] = stats[unit_types, column]
+        units.fire_rate[:] = stats[unit_types, 6].astype(np.int64)
+        units.ammo[:] = units.max_ammo
+        return units
+
+    @classmethod
+    def from_soldiers(cls, player_units, enemy_units, num_envs=1):
+        """从现有的 Soldier 对象列表创建单位数组，保留对象当前的状态"""
+        soldiers = list(player_units) + list(enemy_units)
+        units = cls(num_envs, len(soldiers))
+        units.team[:] = [PLAYER_TEAM] * len(player_units) + [ENEMY_TEAM] * len(enemy_units)
+        units.unit_type[:] = [UNIT_TYPE_NAMES.index(s.__class__.__name__) for s in soldiers]
+        units.x[:] = [s.x for s in soldiers]
+        units.y[:] = [s.y for s in soldiers]
+        units.health[:] = [s.health for s in soldiers]
+        units.armor[:] = [s.armor for s in soldiers]
+        units.speed[:] = [s.speed for s in soldiers]
+        units.range[:] = [s.weapon.range for s in soldiers]
+        units.damage[:] = [s.weapon.damage for s in soldiers]
+        units.ammo[:] = [s.weapon.current_ammo for s in soldiers]
+        units.max_ammo[:] = [s.weapon.max_ammo for s in soldiers]
+        units.fire_rate[:] = [s.weapon.fire_rate for s in soldiers]
+        for name in ("build_turns", "heal_turns", "reload_turns", "aim_turns"):
+            getattr(units, name)[:] = [getattr(s, name, 0) for s in soldiers]
+        return units
+
+    def write_back(self, player_units, enemy_units, env=0):
+        """把某个环境中的单位状态写回 Soldier 对象（例如用于渲染）"""
+        for i, soldier in enumerate(list(player_units) + list(enemy_units)):
+            soldier.x = float(self.x[env, i])
+            soldier.y = float(self.y[env, i])
+            soldier.health = float(self.health[env, i])
+            soldier.armor = float(self.armor[env, i])
+            soldier.speed = float(self.speed[env, i])
+            soldier.weapon.current_ammo = float(self.ammo[env, i])
+            for name in ("build_turns", "heal_turns", "reload_turns", "aim_turns"):
+                if hasattr(soldier, name):
+                    setattr(soldier, name, int(getattr(self, name)[env, i]))
+
+    def alive(self):
+        """返回存活单位的布尔掩码"""
+        return self.health > 0
+
+    def copy(self):
+        """深拷贝所有数组"""
+        units = SoldierArrays.__new__(SoldierArrays)
+        for name in self.FIELDS:
+            setattr(units, name, getattr(self, name).copy())
+        return units
+
+    def assign(self, other, envs=None):
+        """用另一组单位数组覆盖当前状态；envs 为布尔掩码时只覆盖对应的环境"""
+        for name in self.FIELDS:
+            if envs is None:
+                getattr(self, name)[:] = getattr(other, name)
+            else:
+                getattr(self, name)[envs] = getattr(other, name)[envs]
+
+    def action_mask(self):
+        """返回每个单位可执行动作的布尔掩码，形状为 (环境数, 单位数, 动作数)"""
+        mask = np.ones(self.x.shape + (NUM_ACTIONS,), dtype=bool)
+        for action, unit_type in EXCLUSIVE_ACTIONS.items():
+            mask[..., action] = self.unit_type == unit_type
+        mask &= self.alive()[..., None]
+        return mask
+
+
+class BatchEngine:
+    """向量化的回合引擎，一次推进所有环境、所有单位的一个回合
+
+    默认回合规则与 TurnBasedStrategyGame.handle_turn_logic 相同：蓝方先行动、红方后行动；
+    每个单位若射程内有敌人，则攻击列表中第一个敌人，否则朝本队的目标点移动。
+    也可以通过动作编号为每个单位指定 actions.py 中的具体动作。
+    已阵亡的单位不再行动，也不会被选为目标。
+    """
+
+    def __init__(self, units, move_targets=DEFAULT_MOVE_TARGETS, hit_chance=HIT_CHANCE, seed=None,
+                 line_of_sight=None, bounds=None):
+        self.units = units
+        self.bounds = bounds  # (宽, 高)，不为 None 时每回合结束把单位位置限制在地图范围内
+        self.line_of_sight = line_of_sight  # 视线判定服务，为 None 时支援兵瞄准不考虑地形
+        self.move_targets = np.asarray(move_targets, dtype=float)
+        self.hit_chance = hit_chance
+        self.rng = np.random.default_rng(seed)
+        self.combat = CombatResolver(hit_chance, rng=self.rng)  # 与引擎共用随机数生成器，状态随 get_state 保存
+        self.turn_counter = 0
+        self.d2 = None  # 当前阶段的距离矩阵（单位较少时）
+        self.grid = None  # 当前阶段的网格索引（单位较多时）
+
+    def step(self, actions=None):
+        """执行一个完整回合；actions 为 (环境数, 单位数) 的动作编号，缺省时全部按默认规则行动"""
+        self.turn_counter += 1
+        if actions is None:
+            actions = np.full(self.units.x.shape, ACTION_AUTO, dtype=np.int64)
+        for team in (PLAYER_TEAM, ENEMY_TEAM):
+            self.team_phase(team, actions)
+        if self.bounds is not None:
+            np.clip(self.units.x, 0, self.bounds[0], out=self.units.x)
+            np.clip(self.units.y, 0, self.bounds[1], out=self.units.y)
+
+    def get_state(self):
+        """返回可以完整恢复当前对局的状态（单位数组副本、回合数和随机数生成器状态）"""
+        state = {name: getattr(self.units, name).copy() for name in SoldierArrays.FIELDS}
+        state["turn_counter"] = self.turn_counter
+        state["rng"] = self.rng.bit_generator.state
+        return state
+
+    def set_state(self, state):
+        """恢复 get_state 保存的状态，之后的回合与保存时完全相同"""
+        for name in SoldierArrays.FIELDS:
+            getattr(self.units, name)[...] = state[name]
+        self.turn_counter = int(state["turn_counter"])
+        self.rng.bit_generator.state = state["rng"]
+
+    def pairwise_distance_sq(self):
+        """每个环境内单位之间距离的平方，形状为 (环境数, 单位数, 单位数)"""
+        u = self.units
+        dx = u.x[:, :, None] - u.x[:, None, :]
+        dy = u.y[:, :, None] - u.y[:, None, :]
+        return dx * dx + dy * dy
+
+    def prepare_queries(self):
+        """在一个行动阶段开始时准备距离查询：单位少时计算距离矩阵，单位多时建立网格索引"""
+        u = self.units
+        if u.num_units <= DENSE_UNIT_LIMIT:
+            self.d2 = self.pairwise_distance_sq()
+            self.grid = None
+        else:
+            self.d2 = None
+            group = np.repeat(np.arange(u.num_envs), u.num_units)
+            self.grid = UniformGrid().build(u.x.ravel(), u.y.ravel(), group)
+
+    def select_targets(self, acting, enemies):
+        """为行动单位选出射程内的第一个敌人，返回 (是否有目标, 目标下标)"""
+        u = self.units
+        if self.grid is None:
+            in_range = self.d2 <= (u.range * u.range)[:, :, None]
+            in_range &= enemies[:, None, :]
+            in_range &= acting[:, :, None]
+            return in_range.any(axis=2), in_range.argmax(axis=2)
+
+        query = np.flatnonzero(acting)
+        first = self.grid.first_within(u.x.ravel()[query], u.y.ravel()[query], u.range.ravel()[query],
+                                       query // u.num_units, enemies.ravel())
+        return self._scatter(query, first)
+
+    def nearest(self, acting, candidates, exclude_self=False):
+        """为行动单位选出候选单位中最近的一个，返回 (是否存在, 下标, 距离平方)"""
+        if self.grid is None:
+            masked = np.where(candidates[:, None, :] & acting[:, :, None], self.d2, np.inf)
+            if exclude_self:
+                idx = np.arange(masked.shape[1])
+                masked[:, idx, idx] = np.inf
+            target = masked.argmin(axis=2)
+            dist = np.take_along_axis(masked, target[..., None], axis=2)[..., 0]
+            return np.isfinite(dist), target, dist
+
+        u = self.units
+        query = np.flatnonzero(acting)
+        nearest, d2 = self.grid.nearest(u.x.ravel()[query], u.y.ravel()[query], query // u.num_units,
+                                        candidates.ravel(), exclude=query if exclude_self else None)
+        found, target = self._scatter(query, nearest)
+        dist = np.full(acting.shape, np.inf)
+        dist.ravel()[query] = d2
+        return found, target, dist
+
+    def _scatter(self, query, flat_result):
+        """把网格查询结果（展平下标，-1 表示没有）还原为 (是否存在, 单位下标) 数组"""
+        shape = self.units.x.shape
+        found = np.zeros(shape, dtype=bool)
+        target = np.zeros(shape, dtype=np.int64)
+        found.ravel()[query] = flat_result >= 0
+        target.ravel()[query] = np.maximum(flat_result, 0) % shape[1]
+        return found, target
+
+    def team_phase(self, team, actions):
+        """某个队伍的行动阶段：依次结算攻击、兵种专属动作和移动"""
+        u = self.units
+        alive = u.alive()
+        acting = alive & (u.team == team)
+        enemies = alive & (u.team != team)
+        codes = np.where(acting, actions, ACTION_IDLE)
+        for action, unit_type in EXCLUSIVE_ACTIONS.items():
+            codes[(codes == action) & (u.unit_type != unit_type)] = ACTION_IDLE
+
+        self.prepare_queries()
+        has_target, target = self.select_targets(acting, enemies)
+        auto = codes == ACTION_AUTO
+        shooters = (auto | (codes == ACTION_ATTACK)) & has_target
+
+        # 支援兵瞄准最近的敌人，瞄准满 5 回合后开火
+        aiming = codes == ACTION_AIM
+        if aiming.any():
+            found, closest, dist = self.nearest(aiming, enemies)
+            aiming &= found & (dist <= u.range * u.range)
+            if self.line_of_sight is not None and aiming.any():
+                tx = np.take_along_axis(u.x, closest, axis=1)
+                ty = np.take_along_axis(u.y, closest, axis=1)
+                aiming[aiming] = self.line_of_sight.visible_pixels(u.x[aiming], u.y[aiming], tx[aiming], ty[aiming])
+            ready = aiming & (u.aim_turns >= 5)
+            u.aim_turns[aiming & ~ready] += 1
+            u.aim_turns[ready] = 0
+            shooters |= ready
+            target = np.where(ready, closest, target)
+
+        self.attack(shooters, target)
+        self.heal(codes == ACTION_HEAL, alive & (u.team == team))
+        self.supply(codes == ACTION_SUPPLY, alive & (u.team == team))
+        self.reload(codes == ACTION_RELOAD)
+        self.build(codes == ACTION_BUILD)
+
+        self.move_towards(auto & ~has_target, *self.move_targets[team])
+        for action, (dx, dy) in MOVE_DIRECTIONS.items():
+            movers = codes == action
+            u.x += np.where(movers, dx * u.speed, 0)
+            u.y += np.where(movers, dy * u.speed, 0)
+
+    def attack(self, attackers, target):
+        """让掩码中的单位向各自的目标开火，按攻击者批量抽样命中数并结算伤害"""
+        u = self.units
+        fired = np.where(attackers, np.minimum(u.fire_rate, u.ammo), 0).astype(np.int64)
+        u.ammo -= fired
+        if not fired.any():
+            return
+
+        # 展平为一维，目标下标加上环境偏移，使不同环境互不影响
+        num_envs, num_units = u.x.shape
+        flat_target = (target + np.arange(num_envs)[:, None] * num_units).ravel()
+        health = u.health.reshape(-1)
+        armor = u.armor.reshape(-1)
+        self.combat.resolve_arrays(health, armor, flat_target, fired.ravel(), u.damage.ravel())
+
+    def heal(self, medics, allies):
+        """医疗兵治疗最近的受伤友军，5 回合后恢复 50 点生命值（与 Medic.heal 一致）"""
+        if not medics.any():
+            return
+        u = self.units
+        found, target, dist = self.nearest(medics, allies & (u.health < 100))
+        medics = medics & found & (dist < CONTACT_DISTANCE ** 2)
+        done = medics & (u.heal_turns >= 5)
+        u.heal_turns[medics & ~done] += 1
+        u.heal_turns[done] = 0
+
+        num_envs, num_units = u.x.shape
+        env = np.broadcast_to(np.arange(num_envs)[:, None], done.shape)
+        gain = np.zeros_like(u.health)
+        np.add.at(gain, (env[done], target[done]), 50)
+        healed = gain > 0
+        u.health[healed] = np.minimum(u.health[healed] + gain[healed], 100)
+
+    def supply(self, supporters, allies):
+        """支援兵为最近的友军恢复 50 点护甲，护甲已满时补满弹药（与 SupplyAction 一致）"""
+        if not supporters.any():
+            return
+        u = self.units
+        found, target, dist = self.nearest(supporters, allies, exclude_self=True)
+        supporters = supporters & found & (dist < CONTACT_DISTANCE ** 2)
+
+        num_envs, num_units = u.x.shape
+        env = np.broadcast_to(np.arange(num_envs)[:, None], supporters.shape)
+        gain = np.zeros_like(u.armor)
+        np.add.at(gain, (env[supporters], target[supporters]), 50)
+        supplied = gain > 0
+        repair = supplied & (u.armor < 100)
+        u.armor[repair] = np.minimum(u.armor[repair] + gain[repair], 100)
+        refill = supplied & ~repair & (u.ammo < u.max_ammo)
+        u.ammo[refill] = u.max_ammo[refill]
+
+    def reload(self, assaults):
+        """突击兵重装弹夹，5 回合内速度降为 1.5（与 Assault.reload 一致）"""
+        u = self.units
+        done = assaults & (u.reload_turns >= 5)
+        loading = assaults & ~done
+        u.reload_turns[loading] += 1
+        u.speed[loading] = 1.5
+        u.ammo[done] = u.max_ammo[done]
+        u.reload_turns[done] = 0
+        u.speed[done] = 2.5
+
+    def build(self, engineers):
+        """工程兵修筑障碍，第 4 个回合完成并重置进度（进度与 Engineer.build_obstacle 一致）
+
+        批量环境的所有对局共用同一张只读地形（视线图层和观测的地形平面也只有一份），
+        所以完成时不放置障碍物，这一点与对象版本不同。
+        """
+        u = self.units
+        done = engineers & (u.build_turns >= 3)
+        u.build_turns[engineers & ~done] += 1
+        u.build_turns[done] = 0
+
+    def move_towards(self, movers, target_x, target_y):
+        """让掩码中的单位按各自速度朝目标点移动一步（与 Soldier.move 一致）"""
+        u = self.units
+        dx = target_x - u.x
+        dy = target_y - u.y
+        distance = np.sqrt(dx * dx + dy * dy)
+        moving = movers & (distance > 0)
+        scale = np.divide(u.speed, distance, out=np.zeros_like(distance), where=moving)
+        u.x += dx * scale
+        u.y += dy * scale
@@ -0,0 +1,131 @@
+import numpy as np
+
+HIT_CHANCE = 0.8  # 单发命中概率（与 Soldier._check_hit 一致）
+
+
+def apply_sequential_hits(health, armor, targets, hits, damage):
+    """按顺序把命中结算到目标上，语义与逐发调用 Soldier.calculate_damage 相同
+
+    health、armor 为一维数组（原地修改）；targets、hits、damage 为按攻击顺序排列的
+    每个攻击者的目标下标、命中数和单发伤害。返回每个攻击者造成的总伤害（未命中为 0）。
+    同一目标的连续命中中，护甲按 armor *= (1 - damage / 100) 逐发衰减，
+    护甲降到 0 或以下后不再减伤。
+    """
+    hits = np.asarray(hits)
+    valid = hits > 0
+    result = np.zeros(len(hits))
+    if not valid.any():
+        return result
+    targets = np.asarray(targets)[valid]
+    hits = hits[valid]
+    damage = np.asarray(damage, dtype=float)[valid]
+
+    # 稳定排序：同一目标内保持攻击者的先后顺序
+    order = np.argsort(targets, kind="stable")
+    result_index = np.flatnonzero(valid)[order]
+    t, k, d = targets[order], hits[order], damage[order]
+
+    # 一个攻击者的 k 发子弹对护甲的总衰减系数；单发伤害 >= 100 时第一发就会击穿护甲
+    r = 1 - d / 100
+    k_eff = np.where(r > 0, k, np.minimum(k, 1))
+    f = r ** k_eff
+
+    # 同一目标内的前缀（不含自身）衰减乘积，使用对数前缀和实现分段累乘
+    seg_start = np.ones(len(t), dtype=bool)
+    seg_start[1:] = t[1:] != t[:-1]
+    seg_id = np.cumsum(seg_start) - 1
+    starts = np.flatnonzero(seg_start)
+
+    positive = f > 0
+    log_f = np.log(np.where(positive, f, 1.0))
+    cum_log = np.cumsum(log_f) - log_f
+    cum_log -= cum_log[starts][seg_id]
+    broken = (~positive).astype(np.int64)
+    cum_broken = np.cumsum(broken) - broken
+    cum_broken -= cum_broken[starts][seg_id]
+
+    a0 = armor[t]
+    active = (a0 > 0) & (cum_broken == 0)  # 结算这名攻击者时目标仍有护甲
+    armor_before = np.where(active, a0 * np.exp(cum_log), 0.0)
+    absorbed = armor_before * (1 - f)
+    dealt = d * k - absorbed
+
+    total = np.zeros(len(health))
+    np.add.at(total, t, dealt)
+    np.maximum(health - total, 0, out=health)
+
+    # 每个目标的最终护甲由最后一个有效结算决定
+    idx = np.flatnonzero(active)
+    if len(idx):
+        last = np.ones(len(idx), dtype=bool)
+        last[:-1] = t[idx[1:]] != t[idx[:-1]]
+        idx = idx[last]
+        armor[t[idx]] = armor_before[idx] * f[idx]
+
+    result[result_index] = dealt
+    return result
+
+
+class CombatResolver:
+    """批量结算一个阶段内声明的所有攻击
+
+    每个攻击者本回合发射的子弹数用一次二项分布抽样得到命中数，
+    再由 apply_sequential_hits 一次性结算护甲衰减和生命值损失，
+    结果与逐发调用 _check_hit / calculate_damage 的分布相同，并且可以由种子完全复现。
+    """
+
+    def __init__(self, hit_chance=HIT_CHANCE, seed=None, rng=None):
+        self.hit_chance = hit_chance
+        self.rng = np.random.default_rng(seed) if rng is None else rng
+        self.attacks = []  # 已声明、尚未结算的 (攻击者, 目标)
+
+    def roll_hits(self, fired):
+        """对每个攻击者发射的子弹数抽样命中数"""
+        return self.rng.binomial(np.asarray(fired, dtype=np.int64), self.hit_chance)
+
+    def resolve_arrays(self, health, armor, targets, fired, damage):
+        """数组版本：health、armor 为一维数组（原地修改），其余为按攻击顺序排列的每个攻击者的数据
+
+        返回 (每个攻击者的命中数, 每个攻击者造成的总伤害)。
+        """
+        hits = self.roll_hits(fired)
+        dealt = apply_sequential_hits(health, armor, targets, hits, damage)
+        return hits, dealt
+
+    def declare(self, attacker, target):
+        """声明一次 Soldier 之间的攻击，等到 resolve 时统一结算"""
+        if target is not None:
+            self.attacks.append((attacker, target))
+
+    def resolve(self):
+        """结算所有已声明的攻击（按声明顺序），返回 [(攻击者, 目标, 命中数, 总伤害)]"""
+        from events import event_log, EVENT_HIT
+
+        attacks, self.attacks = self.attacks, []
+        if not attacks:
+            return []
+
+        # 目标去重，同一目标只在数组中出现一次，按声明顺序依次减护甲
+        slots = {}
+        targets = []
+        for _, target in attacks:
+            if id(target) not in slots:
+                slots[id(target)] = len(targets)
+                targets.append(target)
+        health = np.array([t.health for t in targets], dtype=float)
+        armor = np.array([t.armor for t in targets], dtype=float)
+        fired = [attacker.weapon.fire() for attacker, _ in attacks]
+        damage = [attacker.weapon.damage for attacker, _ in attacks]
+        target_index = [slots[id(target)] for _, target in attacks]
+
+        hits, dealt = self.resolve_arrays(health, armor, target_index, fired, damage)
+        for target, h, a in zip(targets, health, armor):
+            target.health = float(h)
+            target.armor = float(a)
+
+        results = []
+        for (attacker, target), h, d in zip(attacks, hits, dealt):
+            if h > 0:
+                event_log.emit(EVENT_HIT, attacker, target, value=d)
+            results.append((attacker, target, int(h), float(d)))
+        return results
@@ -0,0 +1,184 @@
+import numpy as np
+
+from entites.actions import move_towards, supply
+from entites.batch import (
+    UNIT_TYPE_NAMES, NUM_ACTIONS, EXCLUSIVE_ACTIONS, MOVE_DIRECTIONS,
+    ACTION_AUTO, ACTION_IDLE, ACTION_ATTACK, ACTION_BUILD, ACTION_HEAL, ACTION_RELOAD, ACTION_AIM, ACTION_SUPPLY,
+)
+from events import (event_log, EVENT_MOVE, EVENT_ATTACK, EVENT_BUILD, EVENT_HEAL, EVENT_RELOAD, EVENT_AIM,
+                    EVENT_SUPPLY)
+from instrumentation import profiler
+
+# 在 batch.py 的动作编号之外增加“移动到指定坐标”（MoveAction），坐标写在命令的 x、y 中
+COMMAND_MOVE_TO = NUM_ACTIONS
+NUM_COMMANDS = NUM_ACTIONS + 1
+COMMAND_NAMES = ("auto", "idle", "attack", "move_up", "move_down", "move_left", "move_right", "build", "heal",
+                 "reload", "aim", "supply", "move_to")
+# 性能统计使用的名称，预先拼好避免每回合格式化字符串
+COMMAND_TIMERS = tuple(f"action_{name}" for name in COMMAND_NAMES)
+COMMAND_COUNTERS = tuple(f"actions_{name}" for name in COMMAND_NAMES)
+
+# 需要目标的命令：目标下标指向敌方列表还是友方列表（按命令编号索引的查找表）
+ENEMY_TARGET = np.zeros(NUM_COMMANDS, dtype=bool)
+ENEMY_TARGET[[ACTION_ATTACK, ACTION_AIM]] = True
+ALLY_TARGET = np.zeros(NUM_COMMANDS, dtype=bool)
+ALLY_TARGET[[ACTION_HEAL, ACTION_SUPPLY]] = True
+
+# 每种命令允许的兵种，形状为 (命令数, 兵种数)；与 actions.py 构造函数中的 isinstance 检查一致
+ALLOWED = np.ones((NUM_COMMANDS, len(UNIT_TYPE_NAMES)), dtype=bool)
+ALLOWED[ACTION_AUTO] = False  # 默认规则由 handle_turn_logic 决定，不作为命令提交
+for _action, _unit_type in EXCLUSIVE_ACTIONS.items():
+    ALLOWED[_action] = False
+    ALLOWED[_action, _unit_type] = True
+
+COMMAND_CAPACITY = 256  # 命令缓冲区的初始容量，不够时按倍数扩容
+
+
+class CommandBuffer:
+    """一个阵营一回合内的命令缓冲区
+
+    命令以紧凑的数组记录保存（单位下标、命令编号、目标下标、坐标），
+    数组在回合之间复用，不再为每个单位每回合创建 Action 对象。
+    执行前一次性校验兵种和存活状态，然后按命令类型分组执行。
+    """
+
+    def __init__(self, capacity=COMMAND_CAPACITY):
+        self.unit = np.zeros(capacity, dtype=np.int32)
+        self.command = np.zeros(capacity, dtype=np.int8)
+        self.target = np.full(capacity, -1, dtype=np.int32)
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.count = 0
+        self.units = []
+        self.unit_types = np.zeros(0, dtype=np.int8)
+
+    def bind(self, units):
+        """绑定本阵营的单位列表，兵种编号只在这里计算一次"""
+        self.units = units
+        self.unit_types = np.array([UNIT_TYPE_NAMES.index(u.__class__.__name__) for u in units], dtype=np.int8)
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+
+    def _reserve(self, n):
+        """确保还能写入 n 条命令"""
+        needed = self.count + n
+        if needed <= len(self.unit):
+            return
+        capacity = max(needed, 2 * len(self.unit))
+        for name in ("unit", "command", "target", "x", "y"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, unit, command, target=-1, x=0.0, y=0.0):
+        """添加一条命令"""
+        self._reserve(1)
+        i = self.count
+        self.unit[i], self.command[i], self.target[i], self.x[i], self.y[i] = unit, command, target, x, y
+        self.count += 1
+
+    def submit(self, commands, targets=-1, x=0.0, y=0.0, units=None):
+        """批量提交命令，例如策略输出的整数数组；units 缺省时第 i 条命令属于第 i 个单位"""
+        commands = np.asarray(commands)
+        n = len(commands)
+        units = np.arange(n) if units is None else units
+        self._reserve(n)
+        s = slice(self.count, self.count + n)
+        self.unit[s] = units
+        self.command[s] = commands
+        self.target[s] = targets
+        self.x[s] = x
+        self.y[s] = y
+        self.count += n
+
+    def validate(self, allies, enemies, strict=False):
+        """批量校验：兵种不允许、单位已阵亡或目标下标无效的命令会被丢弃
+
+        strict 为 True 时改为抛出 ValueError（与 actions.py 中构造函数的行为一致）。
+        返回有效命令的布尔掩码。
+        """
+        n = self.count
+        unit, command, target = self.unit[:n], self.command[:n].astype(np.int64), self.target[:n]
+        alive = np.array([u.is_alive() for u in self.units], dtype=bool)
+        valid = (unit >= 0) & (unit < len(self.units)) & (command >= 0) & (command < NUM_COMMANDS)
+        slot = np.where(valid, unit, 0)
+        code = np.where(valid, command, ACTION_IDLE)
+        valid &= ALLOWED[code, self.unit_types[slot]] & alive[slot]
+
+        valid &= ~ENEMY_TARGET[code] | ((target >= 0) & (target < len(enemies)))
+        valid &= ~ALLY_TARGET[code] | ((target >= 0) & (target < len(allies)))
+
+        if strict and not valid.all():
+            bad = int(np.flatnonzero(~valid)[0])
+            raise ValueError(f"无效的命令：单位 {int(unit[bad])} 不能执行命令 {int(command[bad])}")
+        return valid
+
+    def execute(self, allies, enemies, pathfinder=None, resolver=None, strict=False):
+        """校验并按命令类型分组执行；攻击在有结算器时只声明，由调用方在阶段结束时结算
+
+        allies 为治疗、补给目标所在的列表，enemies 为攻击、瞄准目标所在的列表。
+        返回执行的命令数。
+        """
+        valid = self.validate(allies, enemies, strict)
+        index = np.flatnonzero(valid)
+        command = self.command[index]
+        order = np.argsort(command, kind="stable")  # 同一类命令内保持提交顺序
+        index, command = index[order], command[order]
+        bounds = [0] + (np.flatnonzero(np.diff(command)) + 1).tolist() + [len(index)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if start == end:
+                continue
+            group = index[start:end]
+            code = int(command[start])
+            profiler.count(COMMAND_COUNTERS[code], end - start)
+            if code == ACTION_IDLE:
+                continue
+            with profiler.timer(COMMAND_TIMERS[code]):
+                self._execute_group(code, group, allies, enemies, pathfinder, resolver)
+        self.clear()
+        return len(index)
+
+    def _execute_group(self, code, group, allies, enemies, pathfinder, resolver):
+        """执行同一类型的一组命令"""
+        soldiers = [self.units[i] for i in self.unit[group]]
+        targets = self.target[group].tolist()
+        if code == ACTION_ATTACK:
+            for soldier, t in zip(soldiers, targets):
+                event_log.emit(EVENT_ATTACK, soldier, enemies[t])
+                if resolver is None:
+                    soldier.attack(enemies[t])
+                else:
+                    resolver.declare(soldier, enemies[t])
+        elif code == COMMAND_MOVE_TO:
+            for soldier, x, y in zip(soldiers, self.x[group].tolist(), self.y[group].tolist()):
+                event_log.emit(EVENT_MOVE, soldier, x=x, y=y)
+                move_towards(soldier, x, y, pathfinder)
+        elif code in MOVE_DIRECTIONS:
+            dx, dy = MOVE_DIRECTIONS[code]
+            for soldier in soldiers:
+                event_log.emit(EVENT_MOVE, soldier, x=soldier.x + dx * soldier.speed,
+                               y=soldier.y + dy * soldier.speed)
+                soldier.move(soldier.x + dx, soldier.y + dy)
+        elif code == ACTION_BUILD:
+            for soldier in soldiers:
+                event_log.emit(EVENT_BUILD, soldier)
+                soldier.build_obstacle()
+        elif code == ACTION_HEAL:
+            for soldier, t in zip(soldiers, targets):
+                event_log.emit(EVENT_HEAL, soldier, allies[t])
+                soldier.heal(allies[t])
+        elif code == ACTION_RELOAD:
+            for soldier in soldiers:
+                event_log.emit(EVENT_RELOAD, soldier)
+                soldier.reload()
+        elif code == ACTION_AIM:
+            for soldier, t in zip(soldiers, targets):
+                event_log.emit(EVENT_AIM, soldier, enemies[t])
+                soldier.aim_and_attack(enemies[t])
+        elif code == ACTION_SUPPLY:
+            for soldier, t in zip(soldiers, targets):
+                event_log.emit(EVENT_SUPPLY, soldier, allies[t])
+                supply(allies[t])
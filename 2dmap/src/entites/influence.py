@@ -0,0 +1,204 @@
+import numpy as np
+
+from entites.soldier import Medic
+
+INFLUENCE_CELL_SIZE = 50  # 影响力网格的边长（像素），比地形格子粗得多，查询和更新都很便宜
+HEAL_REACH_TURNS = 5  # 医疗兵覆盖范围按几回合内能走到并开始治疗估算
+HEAL_DISTANCE = 10  # 医疗兵开始治疗的距离（与 Medic.take_turn 一致）
+
+# 影响力平面：单位数量、火力（射程覆盖范围内每回合可造成的伤害之和）、治疗覆盖（能赶到的医疗兵数量）
+FIELDS = ("presence", "threat", "heal")
+PRESENCE, THREAT, HEAL = range(len(FIELDS))
+
+_KERNELS = {}  # (覆盖半径, 格子边长) -> 覆盖到的格子偏移
+
+
+def reach_kernel(radius, cell_size):
+    """半径 radius（像素）的圆从一个格子内任意位置出发可能覆盖到的格子偏移 (行, 列)
+
+    按两个格子之间的最近距离判断，是圆的保守外包：真实距离在半径内的点所在格子一定被覆盖。
+    """
+    key = (float(radius), cell_size)
+    kernel = _KERNELS.get(key)
+    if kernel is not None:
+        return kernel
+    reach = int(np.ceil(radius / cell_size)) + 1
+    dr, dc = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    gap_r = np.maximum(np.abs(dr) - 1, 0) * cell_size
+    gap_c = np.maximum(np.abs(dc) - 1, 0) * cell_size
+    inside = gap_r * gap_r + gap_c * gap_c <= radius * radius
+    kernel = (dr[inside].astype(np.int64), dc[inside].astype(np.int64))
+    _KERNELS[key] = kernel
+    return kernel
+
+
+class TeamInfluence:
+    """一个阵营在粗网格上的影响力平面 fields[FIELDS, 行, 列]
+
+    每个单位的贡献按其所在格子盖章（火力和治疗按射程 / 覆盖半径的圆盖章），
+    update 只重新盖章位置所在格子、数值或半径改变的单位：先减去旧贡献，再加上新贡献。
+    fields 可以传入预分配的全零数组（例如批量环境观测缓冲区的切片），平面直接写入其中。
+    """
+
+    def __init__(self, rows, cols, num_slots, cell_size=INFLUENCE_CELL_SIZE, fields=None):
+        self.rows, self.cols = rows, cols
+        self.cell_size = cell_size
+        self.num_slots = num_slots
+        self.fields = np.zeros((len(FIELDS), rows, cols), dtype=np.float32) if fields is None else fields
+        self._cells = np.full(num_slots, -1, dtype=np.int64)  # 每个单位当前贡献所在的格子，-1 表示没有贡献
+        self._values = np.zeros((num_slots, len(FIELDS)), dtype=np.float32)
+        self._ranges = np.zeros((num_slots, len(FIELDS)), dtype=float)
+
+    @property
+    def presence(self):
+        return self.fields[PRESENCE]
+
+    @property
+    def threat(self):
+        return self.fields[THREAT]
+
+    @property
+    def heal(self):
+        return self.fields[HEAL]
+
+    def cell_of(self, x, y):
+        """像素坐标（标量或数组）所在的格子 (行, 列)"""
+        rows = np.clip(np.floor_divide(y, self.cell_size).astype(np.int64), 0, self.rows - 1)
+        cols = np.clip(np.floor_divide(x, self.cell_size).astype(np.int64), 0, self.cols - 1)
+        return rows, cols
+
+    def value_at(self, field, x, y):
+        """像素坐标处某个平面的值，O(1) 查表；x、y 可以是数组"""
+        rows, cols = self.cell_of(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        return self.fields[field, rows, cols]
+
+    def update(self, xs, ys, threat, threat_range, heal_range, alive):
+        """根据单位的像素坐标、每回合火力、射程、治疗覆盖半径和存活状态更新，返回重新盖章的单位数
+
+        heal_range 为 0 的单位没有治疗贡献。
+        """
+        rows, cols = self.cell_of(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float))
+        alive = np.asarray(alive, dtype=bool)
+        cells = np.where(alive, rows * self.cols + cols, -1)
+        heal_range = np.asarray(heal_range, dtype=float)
+        values = np.zeros((self.num_slots, len(FIELDS)), dtype=np.float32)
+        values[:, PRESENCE] = 1
+        values[:, THREAT] = threat
+        values[:, HEAL] = heal_range > 0
+        values[~alive] = 0
+        ranges = np.zeros((self.num_slots, len(FIELDS)), dtype=float)
+        ranges[:, THREAT] = threat_range
+        ranges[:, HEAL] = heal_range
+        changed = np.flatnonzero((cells != self._cells) | (values != self._values).any(axis=1)
+                                 | (ranges != self._ranges).any(axis=1))
+        if len(changed) == 0:
+            return 0
+
+        # 旧贡献取负、新贡献取正，一起盖章
+        old = changed[self._cells[changed] >= 0]
+        new = changed[cells[changed] >= 0]
+        self._stamp(np.concatenate((self._cells[old], cells[new])),
+                    np.concatenate((-self._values[old], values[new])),
+                    np.concatenate((self._ranges[old], ranges[new])))
+
+        self._cells[changed] = cells[changed]
+        self._values[changed] = values[changed]
+        self._ranges[changed] = ranges[changed]
+        return len(changed)
+
+    def _stamp(self, cells, values, ranges):
+        """把一组单位的（带符号的）贡献加到平面上：同一平面、同一半径的单位一起展开，最后一次 bincount"""
+        size = self.rows * self.cols
+        r, c = np.divmod(cells, self.cols)
+        indices, weights = [cells], [values[:, PRESENCE]]
+        for field in (THREAT, HEAL):
+            active = values[:, field] != 0
+            for radius in np.unique(ranges[active, field]).tolist():
+                group = np.flatnonzero(active & (ranges[:, field] == radius))
+                dr, dc = reach_kernel(radius, self.cell_size)
+                target_rows = r[group][:, None] + dr
+                target_cols = c[group][:, None] + dc
+                valid = ((target_rows >= 0) & (target_rows < self.rows)
+                         & (target_cols >= 0) & (target_cols < self.cols))
+                indices.append(field * size + target_rows[valid] * self.cols + target_cols[valid])
+                weights.append(np.broadcast_to(values[group, field][:, None], valid.shape)[valid])
+        total = np.bincount(np.concatenate(indices), weights=np.concatenate(weights), minlength=len(FIELDS) * size)
+        self.fields += total.reshape(self.fields.shape).astype(np.float32)
+
+
+def heal_reach(unit):
+    """医疗兵的治疗覆盖半径（像素），其他兵种为 0"""
+    return unit.speed * HEAL_REACH_TURNS + HEAL_DISTANCE if isinstance(unit, Medic) else 0
+
+
+def soldier_influence(units):
+    """由 Soldier 列表得到 TeamInfluence.update 需要的 (火力, 射程, 治疗覆盖半径) 数组
+
+    火力为武器伤害 x 每回合射速，没有弹药时为 0；只有医疗兵有治疗覆盖。
+    """
+    threat = [u.weapon.damage * u.weapon.fire_rate if u.weapon.current_ammo > 0 else 0 for u in units]
+    threat_range = [u.weapon.range for u in units]
+    heal_range = [heal_reach(u) for u in units]
+    return threat, threat_range, heal_range
+
+
+class InfluenceMap:
+    """对局中每个阵营（按 Soldier.team 区分）的影响力平面，供 AI 和策略以 O(1) 查表代替逐个比较距离"""
+
+    def __init__(self, world_width, world_height, cell_size=INFLUENCE_CELL_SIZE):
+        self.cell_size = cell_size
+        self.rows = -(-int(world_height) // cell_size)
+        self.cols = -(-int(world_width) // cell_size)
+        self.teams = {}  # 阵营名 -> TeamInfluence
+
+    def update(self, team, units, visible=None):
+        """根据该阵营单位的当前状态更新影响力，返回重新盖章的单位数
+
+        visible 为布尔数组时只计入可见的单位（战争迷雾下的敌人）。
+        """
+        influence = self.teams.get(team)
+        if influence is None or influence.num_slots != len(units):
+            influence = self.teams[team] = TeamInfluence(self.rows, self.cols, len(units), self.cell_size)
+        threat, threat_range, heal_range = soldier_influence(units)
+        alive = np.array([u.is_alive() for u in units], dtype=bool)
+        if visible is not None:
+            alive &= visible
+        return influence.update([u.x for u in units], [u.y for u in units], threat, threat_range, heal_range, alive)
+
+    def cell_of(self, x, y):
+        """像素坐标（标量或数组）所在的格子 (行, 列)"""
+        rows = np.clip(np.floor_divide(y, self.cell_size).astype(np.int64), 0, self.rows - 1)
+        cols = np.clip(np.floor_divide(x, self.cell_size).astype(np.int64), 0, self.cols - 1)
+        return rows, cols
+
+    def reaches(self, x0, y0, radius, x, y):
+        """在 (x0, y0) 盖章、半径为 radius 的贡献是否覆盖 (x, y) 所在的格子（与 reach_kernel 的判断一致）
+
+        用于从平面的值中扣除某个单位自身的贡献；x、y 可以是数组。
+        """
+        row0, col0 = self.cell_of(np.asarray(x0, dtype=float), np.asarray(y0, dtype=float))
+        rows, cols = self.cell_of(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        gap_r = np.maximum(np.abs(rows - row0) - 1, 0) * self.cell_size
+        gap_c = np.maximum(np.abs(cols - col0) - 1, 0) * self.cell_size
+        return (radius > 0) & (gap_r * gap_r + gap_c * gap_c <= radius * radius)
+
+    def value_at(self, team, field, x, y):
+        """该阵营某个平面在像素坐标处的值；尚未更新过的阵营为 0"""
+        influence = self.teams.get(team)
+        if influence is None:
+            return np.zeros(np.shape(x), dtype=np.float32)
+        return influence.value_at(field, x, y)
+
+    def threat_at(self, team, x, y):
+        """该阵营在像素坐标处可能造成的每回合伤害"""
+        return self.value_at(team, THREAT, x, y)
+
+    def heal_at(self, team, x, y):
+        """能赶到像素坐标处治疗的该阵营医疗兵数量"""
+        return self.value_at(team, HEAL, x, y)
+
+    def planes(self, teams):
+        """按 teams 顺序拼接各阵营的平面，形状为 (阵营数 x len(FIELDS), 行, 列)，可直接作为策略的空间特征"""
+        return np.concatenate([self.teams[team].fields if team in self.teams
+                               else np.zeros((len(FIELDS), self.rows, self.cols), dtype=np.float32)
+                               for team in teams])
@@ -0,0 +1,258 @@
+import json
+
+import numpy as np
+
+from entites.batch import ACTION_AUTO, BatchEngine, SoldierArrays
+from entites.commands import CommandBuffer
+
+SNAPSHOT_INTERVAL = 1000  # 每隔多少回合保存一次完整状态，决定 seek 最多需要重新模拟的回合数
+
+
+class BattleRecorder:
+    """记录 BatchEngine 对局：初始状态、每回合的动作和定期的状态快照
+
+    BatchEngine 的随机数全部来自自身带种子的生成器，因此只要从某个快照出发
+    重放之后的动作，就能得到与录制时完全相同的结果。
+    回合之间把部分环境恢复为初始单位（例如 VecBattleEnv 的自动重置）时，用 step(..., reset=掩码)
+    记录每回合被重置的环境，回放时在同一位置重新套用初始状态，不需要额外保存快照。
+    """
+
+    def __init__(self, engine, snapshot_interval=SNAPSHOT_INTERVAL, seed=None):
+        self.engine = engine
+        self.snapshot_interval = snapshot_interval
+        self.seed = seed
+        self.actions = []  # 每回合 (环境数, 单位数) 的 int8 动作编号
+        self.resets = []  # 每回合开始前被重置为初始单位的环境，(环境数,) 的布尔掩码
+        self.snapshots = {0: engine.get_state()}  # 已录制的回合数 -> 该时刻的状态，第 0 回合即初始单位
+
+    @property
+    def num_turns(self):
+        return len(self.actions)
+
+    def snapshot(self):
+        """在当前位置保存一次状态快照"""
+        self.snapshots[self.num_turns] = self.engine.get_state()
+
+    def step(self, actions=None, reset=None):
+        """推进并记录一个回合；reset 为本回合之前已恢复为初始单位的环境掩码"""
+        if actions is None:
+            actions = np.full(self.engine.units.x.shape, ACTION_AUTO, dtype=np.int8)
+        num_envs = self.engine.units.num_envs
+        self.resets.append(np.zeros(num_envs, dtype=bool) if reset is None else np.array(reset, dtype=bool))
+        self.actions.append(np.asarray(actions, dtype=np.int8).copy())
+        self.engine.step(actions)
+        if self.num_turns % self.snapshot_interval == 0:
+            self.snapshot()
+
+    def save(self, filename):
+        """保存为压缩的 .npz 文件"""
+        turns = sorted(self.snapshots)
+        num_envs = self.engine.units.num_envs
+        arrays = {
+            "actions": np.stack(self.actions) if self.actions else np.zeros((0,) + self.engine.units.x.shape, np.int8),
+            "resets": np.stack(self.resets) if self.resets else np.zeros((0, num_envs), bool),
+            "snapshot_turns": np.array(turns, dtype=np.int64),
+            "snapshot_turn_counters": np.array([self.snapshots[t]["turn_counter"] for t in turns], dtype=np.int64),
+        }
+        for name in SoldierArrays.FIELDS:
+            arrays["snapshot_" + name] = np.stack([self.snapshots[t][name] for t in turns])
+        metadata = {
+            "seed": self.seed,
+            "snapshot_interval": self.snapshot_interval,
+            "rng_states": [self.snapshots[t]["rng"] for t in turns],
+            "move_targets": self.engine.move_targets.tolist(),
+            "hit_chance": self.engine.hit_chance,
+            "bounds": list(self.engine.bounds) if self.engine.bounds is not None else None,
+        }
+        np.savez_compressed(filename, metadata=np.array(json.dumps(metadata)), **arrays)
+
+    def replay(self, line_of_sight=None):
+        """直接在内存中回放当前录制的内容"""
+        return Replay(self.actions, self.snapshots, self.engine.move_targets, self.engine.hit_chance,
+                      self.engine.bounds, line_of_sight, self.resets)
+
+
+def load_replay(filename, line_of_sight=None):
+    """读取 BattleRecorder.save 保存的文件；地图不保存在录像中，需要视线判定时由调用方提供"""
+    with np.load(filename) as data:
+        metadata = json.loads(str(data["metadata"]))
+        snapshots = {}
+        for i, turn in enumerate(data["snapshot_turns"]):
+            state = {name: data["snapshot_" + name][i] for name in SoldierArrays.FIELDS}
+            state["turn_counter"] = int(data["snapshot_turn_counters"][i])
+            state["rng"] = metadata["rng_states"][i]
+            snapshots[int(turn)] = state
+        actions = data["actions"]
+        resets = data["resets"]
+    bounds = tuple(metadata["bounds"]) if metadata["bounds"] is not None else None
+    replay = Replay(actions, snapshots, metadata["move_targets"], metadata["hit_chance"], bounds, line_of_sight,
+                    resets)
+    replay.seed = metadata["seed"]
+    return replay
+
+
+class Replay:
+    """无界面回放录像，可以跳转到任意回合
+
+    seek 从目标回合之前最近的快照开始重新模拟，最多只需要模拟 snapshot_interval 个回合。
+    录制时被重置的环境在对应回合开始前重新套用第 0 回合的单位状态。
+    """
+
+    def __init__(self, actions, snapshots, move_targets, hit_chance, bounds=None, line_of_sight=None, resets=None):
+        self.actions = actions
+        self.resets = resets
+        self.snapshots = snapshots
+        self.snapshot_turns = np.array(sorted(snapshots), dtype=np.int64)
+        self.seed = None
+        first = snapshots[0]
+        units = SoldierArrays(*first["x"].shape)
+        self.engine = BatchEngine(units, move_targets, hit_chance, line_of_sight=line_of_sight, bounds=bounds)
+        self.position = 0  # 已回放的回合数
+        self.engine.set_state(first)
+        self.initial_units = units.copy()
+
+    @property
+    def num_turns(self):
+        return len(self.actions)
+
+    @property
+    def units(self):
+        return self.engine.units
+
+    def step(self):
+        """回放下一个回合，已到结尾时返回 False"""
+        if self.position >= self.num_turns:
+            return False
+        if self.resets is not None and self.resets[self.position].any():
+            self.engine.units.assign(self.initial_units, self.resets[self.position])
+        self.engine.step(self.actions[self.position])
+        self.position += 1
+        if self.position in self.snapshots:
+            self.engine.set_state(self.snapshots[self.position])
+        return True
+
+    def seek(self, turn):
+        """跳转到已回放 turn 个回合后的状态"""
+        turn = min(max(int(turn), 0), self.num_turns)
+        start = int(self.snapshot_turns[np.searchsorted(self.snapshot_turns, turn, side="right") - 1])
+        if not start <= self.position <= turn:
+            self.engine.set_state(self.snapshots[start])
+            self.position = start
+        while self.position < turn:
+            self.step()
+
+    def run(self, until=None, callback=None):
+        """一直回放到 until 回合（默认到结尾）；callback(replay) 在每个回合之后调用"""
+        until = self.num_turns if until is None else min(until, self.num_turns)
+        while self.position < until:
+            self.step()
+            if callback is not None:
+                callback(self)
+
+
+COMMAND_FIELDS = ("unit", "command", "target", "x", "y")  # CommandBuffer 中每条命令的字段
+
+
+class CommandRecorder:
+    """记录 Battle 对局：种子、初始编制和每个行动阶段执行前的命令缓冲区
+
+    Battle 的随机数全部来自带种子的 CombatResolver 和单位共用的 random.Random，地形修改也只由命令引起，
+    因此用相同的种子、编制和地图重新执行这些命令就能复现整局。每回合两个阶段（蓝方、红方）。
+    创建时对局应已初始化单位；地图不保存在录像中。
+    """
+
+    def __init__(self, battle):
+        self.seed = battle.seed
+        self.fog_of_war = battle.fog_of_war
+        self.roster = list(battle.roster)
+        self.phases = []  # 每个阶段一组 (unit, command, target, x, y) 数组
+        battle.recorder = self
+
+    @property
+    def num_turns(self):
+        return len(self.phases) // 2
+
+    def record_phase(self, commands):
+        """复制命令缓冲区中尚未执行的命令"""
+        n = commands.count
+        self.phases.append(tuple(getattr(commands, name)[:n].copy() for name in COMMAND_FIELDS))
+
+    def save(self, filename):
+        """保存为压缩的 .npz 文件，所有阶段的命令首尾相接，phase_ends 记录每个阶段的结束位置"""
+        counts = [len(phase[0]) for phase in self.phases]
+        arrays = {"phase_ends": np.cumsum(counts, dtype=np.int64)}
+        empty = CommandBuffer(0)
+        for column, name in enumerate(COMMAND_FIELDS):
+            parts = [phase[column] for phase in self.phases]
+            arrays[name] = np.concatenate(parts) if parts else getattr(empty, name)
+        metadata = {"seed": self.seed, "fog_of_war": self.fog_of_war, "roster": self.roster}
+        np.savez_compressed(filename, metadata=np.array(json.dumps(metadata)), **arrays)
+
+    def replay(self):
+        """直接在内存中回放当前录制的内容"""
+        return CommandReplay(self.seed, self.roster, self.phases, self.fog_of_war)
+
+
+def load_command_replay(filename):
+    """读取 CommandRecorder.save 保存的文件"""
+    with np.load(filename) as data:
+        metadata = json.loads(str(data["metadata"]))
+        columns = [data[name] for name in COMMAND_FIELDS]
+        ends = data["phase_ends"].tolist()
+    starts = [0] + ends[:-1]
+    phases = [tuple(column[s:e] for column in columns) for s, e in zip(starts, ends)]
+    roster = [tuple(entry) for entry in metadata["roster"]]
+    return CommandReplay(metadata["seed"], roster, phases, metadata["fog_of_war"])
+
+
+class CommandReplay:
+    """按录制的命令回放 Battle 对局
+
+    用法：battle = Battle(replay.seed, replay.fog_of_war); battle.load_map(); replay.start(battle)，
+    之后每次 step 推进一个回合。地图需要与录制时相同。
+    """
+
+    def __init__(self, seed, roster, phases, fog_of_war=False):
+        self.seed = seed
+        self.roster = roster
+        self.phases = phases
+        self.fog_of_war = fog_of_war
+        self.battle = None
+        self.phase = 0  # 已回放的阶段数
+
+    @property
+    def num_turns(self):
+        return len(self.phases) // 2
+
+    @property
+    def position(self):
+        """已回放的回合数"""
+        return self.phase // 2
+
+    def start(self, battle):
+        """用录像中的编制初始化 battle，之后它的每个阶段都从录像读取命令"""
+        battle.initialize_units(self.roster)
+        battle.playback = self
+        self.battle = battle
+        self.phase = 0
+
+    def load_phase(self, commands):
+        """把下一个阶段录制的命令填入命令缓冲区（由 Battle.run_phase 调用）"""
+        unit, command, target, x, y = self.phases[self.phase]
+        self.phase += 1
+        commands.submit(command, target, x, y, units=unit)
+
+    def step(self):
+        """回放下一个回合，已到结尾时返回 False"""
+        if self.position >= self.num_turns:
+            return False
+        self.battle.handle_turn_logic()
+        return True
+
+    def run(self, until=None, callback=None):
+        """一直回放到 until 回合（默认到结尾）；callback(replay) 在每个回合之后调用"""
+        until = self.num_turns if until is None else min(until, self.num_turns)
+        while self.position < until:
+            self.step()
+            if callback is not None:
+                callback(self)
@@ -1,7 +1,17 @@
-import arcade
 import random
 import math
 
+from events import (event_log, EVENT_HIT, EVENT_BUILD_PROGRESS, EVENT_BUILD_DONE, EVENT_HEAL_PROGRESS, EVENT_HEAL_DONE,
+                    EVENT_RELOAD_PROGRESS, EVENT_RELOAD_DONE, EVENT_AIM_PROGRESS)
+from instrumentation import profiler
+
+# 单位颜色（RGB，与 arcade.color 中的同名颜色一致）；本模块不导入 arcade，只在绘制时导入
+BLUE = (0, 0, 255)
+GREEN = (0, 255, 0)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+YELLOW = (255, 255, 0)
+
 # 定义武器类
 class Weapon:
     def __init__(self, name, range, damage, max_ammo, fire_rate):
@@ -17,6 +27,7 @@ class Weapon:
         """发射子弹，返回本回合发射的子弹数量"""
         fired_ammo = min(self.fire_rate, self.current_ammo)
         self.current_ammo -= fired_ammo
+        profiler.count("bullets_fired", fired_ammo)
         return fired_ammo
 
     def reload(self):
@@ -26,7 +37,10 @@ class Weapon:
 
 # 士兵基础类
 class Soldier:
-    def __init__(self, x, y, team, health=100, armor=100, speed=2, weapon=None, color=arcade.color.BLUE):
+    rng = random  # 命中判定使用的随机数来源，可替换为 random.Random(种子) 以复现对局
+    sight_range = 150  # 视野距离（像素），战争迷雾按此计算每个单位能看到的范围
+
+    def __init__(self, x, y, team, health=100, armor=100, speed=2, weapon=None, color=BLUE):
         """士兵的初始化，包括位置、队伍、生命值、护甲、速度、武器等"""
         self.x = x
         self.y = y
@@ -60,12 +74,12 @@ class Soldier:
                     damage = self.weapon.damage
                     actual_damage = self.calculate_damage(target, damage)
                     target.take_damage(actual_damage)
-                    print(f"{self.team} 士兵使用 {self.weapon.name} 攻击了 {target.team}，造成 {actual_damage} 伤害！")
+                    event_log.emit(EVENT_HIT, self, target, value=actual_damage)
 
     def _check_hit(self, target):
         """判断弹药是否命中目标"""
         hit_chance = 0.8  # 命中概率
-        return random.random() < hit_chance
+        return self.rng.random() < hit_chance
 
     def calculate_damage(self, target, base_damage):
         """计算基于护甲的实际伤害"""
@@ -87,6 +101,7 @@ class Soldier:
 
     def draw(self):
         """绘制士兵"""
+        import arcade
         arcade.draw_circle_filled(self.x, self.y, self.radius, self.color)
 
     def distance_to(self, target):
@@ -97,17 +112,20 @@ class Soldier:
 # 工程兵类，具备修筑障碍物的能力
 class Engineer(Soldier):
     def __init__(self, x, y, team, weapon=None):
-        super().__init__(x, y, team, health=120, armor=100, speed=1.5, weapon=weapon or Weapon("手枪", 40, 30, 7, 1), color=arcade.color.GREEN)
+        super().__init__(x, y, team, health=120, armor=100, speed=1.5, weapon=weapon or Weapon("手枪", 40, 30, 7, 1), color=GREEN)
         self.build_turns = 0  # 工程兵修筑障碍物的回合数
+        self.terrain = None  # MutableTerrain，设置后修筑完成时在所在格子放置障碍物
     
     def build_obstacle(self):
-        """工程兵修筑障碍，三回合内无法移动或攻击"""
+        """工程兵修筑障碍，三回合内无法移动或攻击，完成时在所在格子放置障碍物"""
         if self.build_turns < 3:
             self.build_turns += 1
-            print(f"{self.team} 工程兵正在修筑障碍... ({self.build_turns}/3)")
+            event_log.emit(EVENT_BUILD_PROGRESS, self, progress=self.build_turns, total=3)
         else:
             self.build_turns = 0
-            print(f"{self.team} 工程兵完成了障碍的修筑！")
+            event_log.emit(EVENT_BUILD_DONE, self)
+            if self.terrain is not None:
+                self.terrain.place_obstacle(self.x, self.y)
 
     def take_turn(self, allies, enemies):
         """工程兵回合：修筑障碍或攻击敌人"""
@@ -120,18 +138,18 @@ class Engineer(Soldier):
 # 医疗兵类，具备治疗能力
 class Medic(Soldier):
     def __init__(self, x, y, team, weapon=None):
-        super().__init__(x, y, team, health=80, armor=50, speed=2, weapon=weapon or Weapon("手枪", 40, 30, 7, 1), color=arcade.color.WHITE)
+        super().__init__(x, y, team, health=80, armor=50, speed=2, weapon=weapon or Weapon("手枪", 40, 30, 7, 1), color=WHITE)
         self.heal_turns = 0
 
     def heal(self, target):
         """医疗兵治疗友军，5回合内无法移动或攻击"""
         if self.heal_turns < 5:
             self.heal_turns += 1
-            print(f"医疗兵正在治疗 {target.team}，{self.heal_turns}/5 回合")
+            event_log.emit(EVENT_HEAL_PROGRESS, self, target, progress=self.heal_turns, total=5)
         else:
             target.health = min(target.health + 50, 100)
             self.heal_turns = 0
-            print(f"医疗兵完成了治疗，恢复了 {target.team} 的生命值！")
+            event_log.emit(EVENT_HEAL_DONE, self, target)
 
     def take_turn(self, allies, enemies):
         """医疗兵回合：优先治疗友军"""
@@ -149,7 +167,7 @@ class Medic(Soldier):
 # 突击兵类
 class Assault(Soldier):
     def __init__(self, x, y, team):
-        super().__init__(x, y, team, health=100, armor=70, speed=2.5, weapon=Weapon("冲锋枪", 50, 40, 30, 3), color=arcade.color.RED)
+        super().__init__(x, y, team, health=100, armor=70, speed=2.5, weapon=Weapon("冲锋枪", 50, 40, 30, 3), color=RED)
         self.reload_turns = 0
 
     def reload(self):
@@ -157,12 +175,12 @@ class Assault(Soldier):
         if self.reload_turns < 5:
             self.reload_turns += 1
             self.speed = 1.5  # 重装时速度降低
-            print(f"{self.team} 突击兵正在重装弹夹... ({self.reload_turns}/5)")
+            event_log.emit(EVENT_RELOAD_PROGRESS, self, progress=self.reload_turns, total=5)
         else:
             self.weapon.reload()
             self.reload_turns = 0
             self.speed = 2.5
-            print(f"{self.team} 突击兵完成了重装！")
+            event_log.emit(EVENT_RELOAD_DONE, self)
 
     def take_turn(self, enemies):
         """突击兵回合：攻击或重装弹夹"""
@@ -174,15 +192,18 @@ class Assault(Soldier):
 
 # 支援兵类
 class Support(Soldier):
+    sight_range = 200  # 狙击手的视野与射程相同
+
     def __init__(self, x, y, team):
-        super().__init__(x, y, team, health=100, armor=50, speed=1.0, weapon=Weapon("狙击枪", 200, 200, float('inf'), 1), color=arcade.color.YELLOW)
+        super().__init__(x, y, team, health=100, armor=50, speed=1.0, weapon=Weapon("狙击枪", 200, 200, float('inf'), 1), color=YELLOW)
         self.aim_turns = 0
+        self.line_of_sight = None  # 视线判定服务（LineOfSight），由游戏在加载地图后设置
 
     def aim_and_attack(self, target):
         """支援兵瞄准并攻击，瞄准5回合后才能攻击"""
         if self.aim_turns < 5:
             self.aim_turns += 1
-            print(f"{self.team} 支援兵正在瞄准 {target.team} ({self.aim_turns}/5)")
+            event_log.emit(EVENT_AIM_PROGRESS, self, target, progress=self.aim_turns, total=5)
         else:
             self.attack(target)
             self.aim_turns = 0
@@ -197,6 +218,7 @@ class Support(Soldier):
 
     def _has_obstacles(self, target):
         """判断瞄准路径中是否有障碍物"""
-        # 简化为假设路径中没有障碍物
-        return False
+        if self.line_of_sight is None:
+            return False  # 没有地图信息时假设路径中没有障碍物
+        return not self.line_of_sight.visible_pixels(self.x, self.y, target.x, target.y)
 
@@ -0,0 +1,193 @@
+import numpy as np
+
+DEFAULT_CELL_SIZE = 50  # 网格边长（像素），与突击兵射程相当
+
+
+def _expand(counts):
+    """把每个元素按 counts 展开，返回 (所属元素下标, 元素内偏移)"""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    offset = np.arange(len(owner)) - np.repeat(starts, counts)
+    return owner, offset
+
+
+class UniformGrid:
+    """均匀网格空间索引，每回合按单位位置重建，一次回答一整批范围查询
+
+    点可以带有分组编号（例如批量引擎中的环境编号），查询只会返回同组的点。
+    建立索引时先按网格编号排序（O(N log N)），查询只检查半径覆盖到的格子。
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.num_points = 0
+
+    def build(self, x, y, group=None):
+        """用点坐标建立索引；x、y 为一维数组，group 为每个点的分组编号"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        group = np.zeros(len(x), dtype=np.int64) if group is None else np.asarray(group, dtype=np.int64)
+        self.x, self.y = x, y
+        self.num_points = len(x)
+        if self.num_points == 0:
+            return self
+
+        cx = np.floor(x / self.cell_size).astype(np.int64)
+        cy = np.floor(y / self.cell_size).astype(np.int64)
+        self.origin = (cx.min(), cy.min())
+        cx -= self.origin[0]
+        cy -= self.origin[1]
+        self.shape = (int(group.max()) + 1, int(cy.max()) + 1, int(cx.max()) + 1)
+
+        keys = self._keys(group, cy, cx)
+        self.order = np.argsort(keys, kind="stable")  # 同一格子内保持点的原始顺序
+        sorted_keys = keys[self.order]
+        self.cell_keys, self.cell_starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+        self.cell_ends = self.cell_starts + counts
+        return self
+
+    def _keys(self, group, cy, cx):
+        """把 (分组, 格子行, 格子列) 编码为一个整数"""
+        return (group * self.shape[1] + cy) * self.shape[2] + cx
+
+    def query_pairs(self, qx, qy, radius, qgroup=None):
+        """范围查询：返回所有距离 <= radius 的 (查询下标, 点下标, 距离平方)
+
+        qx、qy 为一维数组，radius 可以是标量或与查询等长的数组。
+        """
+        qx = np.asarray(qx, dtype=float)
+        qy = np.asarray(qy, dtype=float)
+        radius = np.broadcast_to(np.asarray(radius, dtype=float), qx.shape)
+        qgroup = np.zeros(len(qx), dtype=np.int64) if qgroup is None else np.asarray(qgroup, dtype=np.int64)
+        empty = np.zeros(0, dtype=np.int64)
+        if self.num_points == 0 or len(qx) == 0:
+            return empty, empty, np.zeros(0)
+
+        # 每个查询覆盖的格子范围（裁剪到索引边界内）
+        _, rows, cols = self.shape
+        x0 = np.clip(np.floor((qx - radius) / self.cell_size).astype(np.int64) - self.origin[0], 0, cols)
+        x1 = np.clip(np.floor((qx + radius) / self.cell_size).astype(np.int64) - self.origin[0], -1, cols - 1)
+        y0 = np.clip(np.floor((qy - radius) / self.cell_size).astype(np.int64) - self.origin[1], 0, rows)
+        y1 = np.clip(np.floor((qy + radius) / self.cell_size).astype(np.int64) - self.origin[1], -1, rows - 1)
+        width = np.maximum(x1 - x0 + 1, 0)
+        height = np.maximum(y1 - y0 + 1, 0)
+        valid = (qgroup >= 0) & (qgroup < self.shape[0])
+        num_cells = np.where(valid, width * height, 0)
+
+        # 展开为 (查询, 格子) 对，并查找格子中的点
+        query, offset = _expand(num_cells)
+        cell_x = x0[query] + offset % width[query]
+        cell_y = y0[query] + offset // width[query]
+        keys = self._keys(qgroup[query], cell_y, cell_x)
+        pos = np.searchsorted(self.cell_keys, keys)
+        pos = np.minimum(pos, len(self.cell_keys) - 1)
+        found = self.cell_keys[pos] == keys
+        query, pos = query[found], pos[found]
+        starts = self.cell_starts[pos]
+        counts = self.cell_ends[pos] - starts
+
+        # 展开为 (查询, 点) 对，并按真实距离过滤
+        owner, offset = _expand(counts)
+        query = query[owner]
+        point = self.order[starts[owner] + offset]
+        dx = self.x[point] - qx[query]
+        dy = self.y[point] - qy[query]
+        d2 = dx * dx + dy * dy
+        inside = d2 <= radius[query] * radius[query]
+        return query[inside], point[inside], d2[inside]
+
+    def first_within(self, qx, qy, radius, qgroup=None, point_mask=None):
+        """对每个查询返回半径内下标最小的点，没有时为 -1（与“列表中第一个在射程内的敌人”一致）"""
+        query, point, _ = self.query_pairs(qx, qy, radius, qgroup)
+        if point_mask is not None:
+            keep = point_mask[point]
+            query, point = query[keep], point[keep]
+        result = np.full(len(np.atleast_1d(qx)), self.num_points, dtype=np.int64)
+        np.minimum.at(result, query, point)
+        result[result == self.num_points] = -1
+        return result
+
+    def nearest(self, qx, qy, qgroup=None, point_mask=None, exclude=None, max_radius=np.inf):
+        """对每个查询返回最近的点（距离相同时取下标较小者），没有时为 -1；同时返回距离平方
+
+        exclude 为与查询等长的点下标数组，用于排除查询单位自身。
+        从一个格子的半径开始逐步加倍搜索，已找到的查询不再参与下一轮。
+        """
+        qx = np.asarray(qx, dtype=float)
+        qy = np.asarray(qy, dtype=float)
+        qgroup = np.zeros(len(qx), dtype=np.int64) if qgroup is None else np.asarray(qgroup, dtype=np.int64)
+        result = np.full(len(qx), -1, dtype=np.int64)
+        dist = np.full(len(qx), np.inf)
+        if self.num_points == 0:
+            return result, dist
+
+        # 每个查询覆盖全部点所需的半径（到点集包围盒最远角的距离）
+        far_x = np.maximum(np.abs(qx - self.x.min()), np.abs(qx - self.x.max()))
+        far_y = np.maximum(np.abs(qy - self.y.min()), np.abs(qy - self.y.max()))
+        needed = np.minimum(np.hypot(far_x, far_y), max_radius)
+        pending = np.arange(len(qx))
+        radius = float(self.cell_size)
+        while len(pending):
+            radius = min(radius, max_radius)
+            query, point, d2 = self.query_pairs(qx[pending], qy[pending], radius, qgroup[pending])
+            keep = np.ones(len(point), dtype=bool)
+            if point_mask is not None:
+                keep &= point_mask[point]
+            if exclude is not None:
+                keep &= point != exclude[pending][query]
+            query, point, d2 = query[keep], point[keep], d2[keep]
+
+            order = np.lexsort((point, d2, query))
+            query, point, d2 = query[order], point[order], d2[order]
+            first = np.ones(len(query), dtype=bool)
+            first[1:] = query[1:] != query[:-1]
+            hit = pending[query[first]]
+            result[hit] = point[first]
+            dist[hit] = d2[first]
+
+            resolved = radius >= needed[pending]
+            resolved[query[first]] = True
+            pending = pending[~resolved]
+            radius *= 2
+        return result, dist
+
+
+def first_enemy_index_in_range(units, enemies, cell_size=DEFAULT_CELL_SIZE, visible=None):
+    """为一组 Soldier 找出射程内列表顺序最靠前的存活敌人在 enemies 中的下标，没有时为 -1
+
+    与 BatchEngine.team_phase 一致，阵亡的敌人不会被选为目标。
+    visible 为敌人是否可见的布尔数组（战争迷雾），给出时只考虑可见的敌人。
+    """
+    if not units or not enemies:
+        return np.full(len(units), -1, dtype=np.int64)
+    grid = UniformGrid(cell_size).build([e.x for e in enemies], [e.y for e in enemies])
+    alive = np.array([e.is_alive() for e in enemies], dtype=bool)
+    mask = alive if visible is None else alive & visible
+    return grid.first_within([u.x for u in units], [u.y for u in units], [u.weapon.range for u in units],
+                             point_mask=mask)
+
+
+def first_enemy_in_range(units, enemies, cell_size=DEFAULT_CELL_SIZE):
+    """为一组 Soldier 找出射程内列表顺序最靠前的存活敌人，没有时为 None"""
+    first = first_enemy_index_in_range(units, enemies, cell_size)
+    return [enemies[i] if i >= 0 else None for i in first]
+
+
+def nearest_injured_ally(units, allies, cell_size=DEFAULT_CELL_SIZE):
+    """为一组 Soldier（如医疗兵）找出最近的受伤友军，没有时为 None"""
+    if not units or not allies:
+        return [None] * len(units)
+    grid = UniformGrid(cell_size).build([a.x for a in allies], [a.y for a in allies])
+    injured = np.array([a.health < 100 for a in allies])
+    nearest, _ = grid.nearest([u.x for u in units], [u.y for u in units], point_mask=injured)
+    return [allies[i] if i >= 0 else None for i in nearest]
+
+
+def nearest_enemy(units, enemies, cell_size=DEFAULT_CELL_SIZE):
+    """为一组 Soldier（如支援兵）找出最近的存活敌人，没有时为 None"""
+    if not units or not enemies:
+        return [None] * len(units)
+    grid = UniformGrid(cell_size).build([e.x for e in enemies], [e.y for e in enemies])
+    alive = np.array([e.is_alive() for e in enemies], dtype=bool)
+    nearest, _ = grid.nearest([u.x for u in units], [u.y for u in units], point_mask=alive)
+    return [enemies[i] if i >= 0 else None for i in nearest]
@@ -0,0 +1,242 @@
+import atexit
+import sys
+
+import numpy as np
+
+# 兵种和队伍名称，按编号排列（entites.batch 的兵种、队伍编号也从这里取名称）
+UNIT_TYPE_NAMES = ("Engineer", "Medic", "Assault", "Support")
+TEAM_NAMES = ("蓝方", "红方")
+
+# 事件级别（数值越大越重要），低于当前级别的事件在 emit 的第一行就被丢弃
+DEBUG = 10  # 逐发子弹、逐回合的进度
+INFO = 20  # 每个动作、每个回合
+OFF = 100  # 关闭所有事件
+
+# 事件类型
+EVENT_TURN = 0  # 开始新回合
+EVENT_MOVE = 1  # MoveAction
+EVENT_ATTACK = 2  # AttackAction
+EVENT_HIT = 3  # 一发子弹命中，value 为实际伤害
+EVENT_BUILD = 4  # BuildObstacleAction
+EVENT_BUILD_PROGRESS = 5  # 修筑进度，progress/total
+EVENT_BUILD_DONE = 6  # 修筑完成
+EVENT_HEAL = 7  # HealAction
+EVENT_HEAL_PROGRESS = 8  # 治疗进度
+EVENT_HEAL_DONE = 9  # 治疗完成
+EVENT_RELOAD = 10  # ReloadAction
+EVENT_RELOAD_PROGRESS = 11  # 装弹进度
+EVENT_RELOAD_DONE = 12  # 装弹完成
+EVENT_AIM = 13  # AimAndAttackAction
+EVENT_AIM_PROGRESS = 14  # 瞄准进度
+EVENT_SUPPLY = 15  # SupplyAction
+EVENT_ARMOR_RESTORED = 16  # 补给恢复护甲，value 为恢复后的护甲
+EVENT_AMMO_RESTORED = 17  # 补给补充弹药
+NUM_EVENT_TYPES = 18
+
+EVENT_LEVELS = (
+    INFO, INFO, INFO, DEBUG, INFO, DEBUG, INFO, INFO, DEBUG, INFO,
+    INFO, DEBUG, INFO, INFO, DEBUG, INFO, INFO, INFO,
+)
+
+# 文本输出格式，与原先 print 的内容一致
+EVENT_FORMATS = {
+    EVENT_TURN: "Executing turn {turn}",
+    EVENT_MOVE: "{team} 的 {unit} 移动到 ({x:g}, {y:g})",
+    EVENT_ATTACK: "{team} 的 {unit} 攻击 {target_team} 的 {target_unit}",
+    EVENT_HIT: "{team} 士兵使用 {weapon} 攻击了 {target_team}，造成 {value:g} 伤害！",
+    EVENT_BUILD: "{team} 的工程兵正在修筑障碍",
+    EVENT_BUILD_PROGRESS: "{team} 工程兵正在修筑障碍... ({progress}/{total})",
+    EVENT_BUILD_DONE: "{team} 工程兵完成了障碍的修筑！",
+    EVENT_HEAL: "{team} 的医疗兵正在治疗 {target_team} 的单位",
+    EVENT_HEAL_PROGRESS: "医疗兵正在治疗 {target_team}，{progress}/{total} 回合",
+    EVENT_HEAL_DONE: "医疗兵完成了治疗，恢复了 {target_team} 的生命值！",
+    EVENT_RELOAD: "{team} 的突击兵正在重装弹夹",
+    EVENT_RELOAD_PROGRESS: "{team} 突击兵正在重装弹夹... ({progress}/{total})",
+    EVENT_RELOAD_DONE: "{team} 突击兵完成了重装！",
+    EVENT_AIM: "{team} 的支援兵正在瞄准 {target_team} 的单位",
+    EVENT_AIM_PROGRESS: "{team} 支援兵正在瞄准 {target_team} ({progress}/{total})",
+    EVENT_SUPPLY: "{team} 的支援兵正在为 {target_team} 提供补给",
+    EVENT_ARMOR_RESTORED: "{team} 的护甲恢复至 {value:g}",
+    EVENT_AMMO_RESTORED: "{team} 的武器弹药已补充",
+}
+
+WEAPON_NAMES = ("手枪", "手枪", "冲锋枪", "狙击枪")  # 各兵种的默认武器名称，按兵种编号
+TEAM_CODES = {name: code for code, name in enumerate(TEAM_NAMES)}
+UNIT_TYPE_CODES = {name: code for code, name in enumerate(UNIT_TYPE_NAMES)}
+
+# 每条事件的紧凑记录（32 字节），单位用 (队伍编号, 兵种编号) 表示，-1 表示没有
+EVENT_DTYPE = np.dtype([
+    ("turn", "<i4"),
+    ("kind", "u1"),
+    ("team", "i1"),
+    ("unit_type", "i1"),
+    ("target_team", "i1"),
+    ("target_type", "i1"),
+    ("progress", "u1"),
+    ("total", "u1"),
+    ("pad", "u1"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("value", "<f4"),
+    ("unit", "<i4"),  # 单位编号（id 的低 32 位），用于区分同队同兵种的单位
+])
+
+EVENT_CAPACITY = 1 << 16  # 环形缓冲区默认容量
+
+
+def _unit_codes(unit):
+    """把 Soldier 转换为 (队伍编号, 兵种编号)"""
+    if unit is None:
+        return -1, -1
+    return TEAM_CODES.get(unit.team, -1), UNIT_TYPE_CODES.get(unit.__class__.__name__, -1)
+
+
+def format_event(record):
+    """把一条事件记录格式化为与原先 print 相同的中文文本"""
+    team, unit_type = int(record["team"]), int(record["unit_type"])
+    target_team, target_type = int(record["target_team"]), int(record["target_type"])
+    return EVENT_FORMATS[int(record["kind"])].format(
+        turn=int(record["turn"]),
+        team=TEAM_NAMES[team] if team >= 0 else "",
+        unit=UNIT_TYPE_NAMES[unit_type] if unit_type >= 0 else "",
+        weapon=WEAPON_NAMES[unit_type] if unit_type >= 0 else "",
+        target_team=TEAM_NAMES[target_team] if target_team >= 0 else "",
+        target_unit=UNIT_TYPE_NAMES[target_type] if target_type >= 0 else "",
+        progress=int(record["progress"]),
+        total=int(record["total"]),
+        x=float(record["x"]),
+        y=float(record["y"]),
+        value=float(record["value"]),
+    )
+
+
+class NullSink:
+    """丢弃所有事件"""
+
+    def write(self, records):
+        pass
+
+    def close(self):
+        pass
+
+
+class TextSink:
+    """把事件格式化为中文文本写到流（默认标准输出）"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, records):
+        stream = self.stream or sys.stdout
+        stream.write("".join(format_event(record) + "\n" for record in records))
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+
+class BinarySink:
+    """把事件记录原样追加到二进制文件，可用 read_events 读回"""
+
+    def __init__(self, filename):
+        self.file = open(filename, "ab")
+
+    def write(self, records):
+        self.file.write(records.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+def read_events(filename):
+    """读取 BinarySink 写出的事件文件，返回 EVENT_DTYPE 结构化数组"""
+    return np.fromfile(filename, dtype=EVENT_DTYPE)
+
+
+class EventLog:
+    """事件流：事件先写入预分配的环形缓冲区，flush 时批量交给各个输出端
+
+    缓冲区写满时自动 flush 后从头覆盖；未交给输出端的事件不会丢失，
+    已输出的事件在被覆盖之前都可以通过 recent 查看。
+    """
+
+    def __init__(self, level=DEBUG, sinks=None, capacity=EVENT_CAPACITY):
+        self.buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.capacity = capacity
+        self.sinks = [TextSink()] if sinks is None else list(sinks)
+        self.turn = 0
+        self.count = 0  # 累计写入的事件数
+        self._flushed = 0  # 已交给输出端的事件数
+        self.set_level(level)
+
+    def set_level(self, level):
+        """设置事件级别，低于该级别的事件直接丢弃"""
+        self.level = level
+        self.enabled = [event_level >= level for event_level in EVENT_LEVELS]
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def begin_turn(self, turn):
+        """记录新回合的开始，之后的事件都带上该回合编号"""
+        self.turn = turn
+        self.emit(EVENT_TURN)
+
+    def emit(self, kind, unit=None, target=None, x=0.0, y=0.0, value=0.0, progress=0, total=0):
+        """写入一条事件；unit、target 为 Soldier 或 None"""
+        if not self.enabled[kind]:
+            return
+        if self.count - self._flushed >= self.capacity:
+            self.flush()
+        team, unit_type = _unit_codes(unit)
+        target_team, target_type = _unit_codes(target)
+        self.buffer[self.count % self.capacity] = (
+            self.turn, kind, team, unit_type, target_team, target_type, progress, total, 0,
+            x, y, value, id(unit) & 0x7FFFFFFF if unit is not None else -1,
+        )
+        self.count += 1
+
+    def pending(self):
+        """尚未交给输出端的事件（按时间顺序）"""
+        return self._window(self.count - self._flushed)
+
+    def recent(self, n=None):
+        """最近的 n 条事件（按时间顺序），n 为 None 时返回缓冲区中保留的全部事件"""
+        available = min(self.count, self.capacity)
+        return self._window(available if n is None else min(n, available))
+
+    def _window(self, n):
+        """缓冲区中最后 n 条事件的副本"""
+        end = self.count % self.capacity
+        if n <= end:
+            return self.buffer[end - n:end].copy()
+        return np.concatenate((self.buffer[self.capacity - (n - end):], self.buffer[:end]))
+
+    def flush(self):
+        """把尚未输出的事件批量交给所有输出端"""
+        if self.count == self._flushed:
+            return
+        records = self.pending()
+        self._flushed = self.count
+        for sink in self.sinks:
+            sink.write(records)
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
+
+
+# 游戏默认使用的事件流，输出与原先的 print 相同；训练时可以 set_level(OFF) 或替换输出端
+event_log = EventLog()
+atexit.register(event_log.flush)
+
+
+def configure(level=None, sinks=None):
+    """调整默认事件流的级别和输出端"""
+    if level is not None:
+        event_log.set_level(level)
+    if sinks is not None:
+        event_log.flush()
+        event_log.sinks = list(sinks)
+    return event_log
@@ -0,0 +1,284 @@
+import arcade
+import arcade.gui
+from arcade.gui import UIManager, UIFlatButton, UIInputText, UIBoxLayout, UILabel
+from map.map_render import TerrainRenderer  # 导入地形贴图渲染
+from battle import Battle  # 导入对局逻辑
+from scheduler import TurnScheduler, MODES  # 导入回合调度
+from settings import load_settings  # 导入设置
+from instrumentation import profiler  # 导入性能统计
+
+# 窗口界面：主菜单、设置和游戏视图。只有打开窗口时才由 main.py 导入，无界面运行不需要 arcade
+
+# 镜头每次按键平移的距离（像素）
+CAMERA_PAN_STEP = 100
+
+# 回合间的延迟（设置文件中没有 turn_delay 时使用）
+TURN_DELAY = 0.1  # 每个回合至少持续0.1秒
+
+# 性能叠加层（F3）的文字大小和行距
+OVERLAY_FONT_SIZE = 10
+OVERLAY_LINE_HEIGHT = 14
+
+
+class MainMenuView(arcade.View):
+    """主菜单界面"""
+
+    def __init__(self):
+        super().__init__()
+        self.ui_manager = UIManager()
+
+    def on_show(self):
+        """当这个视图显示时"""
+        arcade.set_background_color(arcade.color.DARK_BLUE_GRAY)
+        self.ui_manager.clear()  # 清理现有的UI元素
+        self.ui_manager.enable()
+
+        # 创建一个垂直布局，用于排列按钮
+        self.v_box = UIBoxLayout(vertical=True, space_between=20)
+
+        # 创建开始游戏按钮
+        start_button = UIFlatButton(text="开始游戏", width=200)
+        start_button.on_click = self.on_click_start
+        self.v_box.add(start_button)
+
+        # 创建修改设置按钮
+        settings_button = UIFlatButton(text="修改设置", width=200)
+        settings_button.on_click = self.on_click_settings
+        self.v_box.add(settings_button)
+
+        # 创建退出游戏按钮
+        exit_button = UIFlatButton(text="退出游戏", width=200)
+        exit_button.on_click = self.on_click_exit
+        self.v_box.add(exit_button)
+
+        # 将按钮添加到UIManager中
+        self.ui_manager.add(
+            arcade.gui.UIAnchorWidget(
+                anchor_x="center_x",
+                anchor_y="center_y",
+                child=self.v_box)
+        )
+
+    def on_click_start(self, event):
+        """处理开始游戏按钮点击"""
+        game_view = TurnBasedStrategyGame()
+        game_view.setup()
+        self.window.show_view(game_view)
+
+    def on_click_settings(self, event):
+        """处理修改设置按钮点击"""
+        settings_view = SettingsView()
+        self.window.show_view(settings_view)
+
+    def on_click_exit(self, event):
+        """处理退出游戏按钮点击"""
+        arcade.close_window()
+
+    def on_draw(self):
+        """渲染主菜单界面"""
+        arcade.start_render()
+        # 渲染UI元素
+        self.ui_manager.draw()
+
+        # 添加标题文字
+        arcade.draw_text("2D Strategy Game", self.window.width / 2, self.window.height / 1.5,
+                         arcade.color.WHITE, font_size=50, anchor_x="center")
+
+    def on_hide_view(self):
+        """当视图隐藏时，禁用UIManager"""
+        self.ui_manager.disable()
+
+
+class SettingsView(arcade.View):
+    """设置界面"""
+
+    def __init__(self):
+        super().__init__()
+        self.ui_manager = UIManager()
+
+    def on_show(self):
+        """当这个视图显示时"""
+        arcade.set_background_color(arcade.color.DARK_GREEN)
+        self.ui_manager.clear()  # 清理现有的UI元素
+        self.ui_manager.enable()
+
+        # 创建一个垂直布局，用于排列设置项
+        self.v_box = UIBoxLayout(vertical=True, space_between=20)
+
+        # 添加窗口宽度设置
+        self.v_box.add(UILabel(text="窗口宽度:", font_size=20))
+        self.width_input = UIInputText(text=str(self.window.width), width=200)
+        self.v_box.add(self.width_input)
+
+        # 添加窗口高度设置
+        self.v_box.add(UILabel(text="窗口高度:", font_size=20))
+        self.height_input = UIInputText(text=str(self.window.height), width=200)
+        self.v_box.add(self.height_input)
+
+        # 添加全屏切换按钮
+        self.fullscreen_button = UIFlatButton(text="切换全屏", width=200)
+        self.fullscreen_button.on_click = self.on_click_fullscreen
+        self.v_box.add(self.fullscreen_button)
+
+        # 添加应用设置按钮
+        apply_button = UIFlatButton(text="应用设置", width=200)
+        apply_button.on_click = self.on_click_apply
+        self.v_box.add(apply_button)
+
+        # 添加返回主菜单按钮
+        back_button = UIFlatButton(text="返回主菜单", width=200)
+        back_button.on_click = self.on_click_back
+        self.v_box.add(back_button)
+
+        # 将设置项添加到UIManager中
+        self.ui_manager.add(
+            arcade.gui.UIAnchorWidget(
+                anchor_x="center_x",
+                anchor_y="center_y",
+                child=self.v_box)
+        )
+
+    def on_click_fullscreen(self, event):
+        """切换全屏模式"""
+        self.window.set_fullscreen(not self.window.fullscreen)
+
+    def on_click_apply(self, event):
+        """应用窗口大小设置"""
+        try:
+            new_width = int(self.width_input.text)
+            new_height = int(self.height_input.text)
+            self.window.set_size(new_width, new_height)
+        except ValueError:
+            print("请输入有效的窗口宽度和高度！")
+
+    def on_click_back(self, event):
+        """返回主菜单"""
+        main_menu = MainMenuView()
+        self.window.show_view(main_menu)
+
+    def on_draw(self):
+        """渲染设置界面"""
+        arcade.start_render()
+        # 渲染UI元素
+        self.ui_manager.draw()
+
+    def on_hide_view(self):
+        """当视图隐藏时，禁用UIManager"""
+        self.ui_manager.disable()
+
+
+class TurnBasedStrategyGame(arcade.View):
+    """游戏主视图：负责渲染和输入，回合逻辑在 Battle 中，回合节奏由 TurnScheduler 控制"""
+
+    def __init__(self):
+        super().__init__()
+        self.battle = Battle()  # 对局状态和回合逻辑
+        self.scheduler = TurnScheduler(load_settings().get("turn_delay", TURN_DELAY))  # 回合调度
+        self.terrain_renderer = None  # 地形贴图渲染器
+        self.camera = None  # 镜头，用于平移地图
+        self.gui_camera = None  # 屏幕坐标镜头，用于绘制叠加层
+        self.show_profiler = False  # 是否显示性能叠加层
+
+    def setup(self):
+        """游戏开始前的设置"""
+        arcade.set_background_color(arcade.color.ASH_GREY)
+
+        # 加载地图并初始化单位
+        self.battle.setup()
+
+        # 初始化地图渲染
+        self.camera = arcade.Camera(self.window.width, self.window.height)
+        self.gui_camera = arcade.Camera(self.window.width, self.window.height)
+        self.initialize_map_sprites()
+
+    def on_show(self):
+        """当这个视图显示时"""
+        arcade.set_background_color(arcade.color.ASH_GREY)
+
+    def on_draw(self):
+        """渲染屏幕内容，每帧都调用"""
+        arcade.start_render()
+        with profiler.timer("draw"):
+            self.camera.use()
+
+            # 绘制地图
+            self.draw_map()
+
+            # 绘制玩家单位
+            for unit in self.battle.player_units:
+                unit.draw()
+
+            # 绘制敌方单位
+            for unit in self.battle.enemy_units:
+                unit.draw()
+
+        if self.show_profiler:
+            self.draw_profiler_overlay()
+
+    def draw_profiler_overlay(self):
+        """在屏幕左上角绘制性能统计"""
+        self.gui_camera.use()
+        y = self.window.height - OVERLAY_LINE_HEIGHT
+        for line in profiler.overlay_lines():
+            arcade.draw_text(line, 10, y, arcade.color.WHITE, OVERLAY_FONT_SIZE)
+            y -= OVERLAY_LINE_HEIGHT
+
+    def initialize_map_sprites(self):
+        """把地形和高度数组烘焙为少量区块贴图，每个区块只是一个四边形"""
+        tile_size = 5  # 每个地块的大小（像素）
+        with profiler.timer("map_sprites"):
+            self.terrain_renderer = TerrainRenderer(self.battle.terrain_map, self.battle.height_map, tile_size)
+            self.terrain_renderer.build()
+        # 地形修改时只重新烘焙受影响的区块
+        self.battle.terrain.add_listener(self.terrain_renderer.rebuild_cells)
+
+    def draw_map(self):
+        """绘制地图，只提交与当前视口相交的区块"""
+        left, bottom = self.camera.position
+        self.terrain_renderer.update_viewport(left, left + self.window.width, bottom, bottom + self.window.height)
+        self.terrain_renderer.draw()
+
+    def pan_camera(self, dx, dy):
+        """平移镜头，限制在地图范围内"""
+        x, y = self.camera.position
+        max_x = max(self.terrain_renderer.width - self.window.width, 0)
+        max_y = max(self.terrain_renderer.height - self.window.height, 0)
+        self.camera.move_to((min(max(x + dx, 0), max_x), min(max(y + dy, 0), max_y)), 1.0)
+
+    def on_update(self, delta_time):
+        """游戏逻辑更新，每帧调用；本帧执行几个回合由调度器决定，与帧率无关"""
+        self.scheduler.update(delta_time, self.handle_turn_logic)
+
+    def handle_turn_logic(self):
+        """执行一个回合，对局结束后返回 False 让调度器停止"""
+        if self.battle.is_over():
+            return False
+        self.battle.handle_turn_logic()
+
+    def on_key_press(self, key, modifiers):
+        """处理按键事件"""
+        if key == arcade.key.ESCAPE:
+            main_menu = MainMenuView()
+            self.window.show_view(main_menu)
+        elif key == arcade.key.LEFT:
+            self.pan_camera(-CAMERA_PAN_STEP, 0)
+        elif key == arcade.key.RIGHT:
+            self.pan_camera(CAMERA_PAN_STEP, 0)
+        elif key == arcade.key.DOWN:
+            self.pan_camera(0, -CAMERA_PAN_STEP)
+        elif key == arcade.key.UP:
+            self.pan_camera(0, CAMERA_PAN_STEP)
+        elif key == arcade.key.SPACE:
+            self.scheduler.toggle_pause()
+        elif key == arcade.key.EQUAL:
+            self.scheduler.speed_up()
+        elif key == arcade.key.MINUS:
+            self.scheduler.slow_down()
+        elif key == arcade.key.TAB:
+            # 在实时、快进、不限速三种模式之间切换
+            self.scheduler.set_mode(MODES[(MODES.index(self.scheduler.mode) + 1) % len(MODES)])
+        elif key == arcade.key.F3:
+            # 显示叠加层时开启性能统计；启动时用 --profile 开启的统计在隐藏叠加层后继续记录
+            self.show_profiler = not self.show_profiler
+            if self.show_profiler:
+                profiler.set_enabled(True)
@@ -0,0 +1,178 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+WINDOW = 600  # 滚动统计保留的最近样本数（计时为最近若干次调用，计数为最近若干回合）
+EXPORT_EVERY = 100  # 设置了导出文件时，每隔多少回合写一次
+PERCENTILES = (50, 95, 99)
+CSV_FIELDS = ("name", "kind", "samples", "mean", "p50", "p95", "p99", "max", "total")
+
+
+class _NullTimer:
+    """关闭性能统计时使用的计时器，进入和退出都不做任何事"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """某个名称的计时器；每个名称只创建一个实例，不要在同名计时器内部再次进入它"""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """回合级别的性能统计：代码段计时、计数和数值，按滚动窗口汇总为百分位数
+
+    计时：with profiler.timer("名称"): ...，每次调用记录一个样本（秒）。
+    计数：profiler.count("名称", n)，在回合内累加，end_turn 时作为该回合的一个样本。
+    数值：profiler.gauge("名称", v)，end_turn 时记录最后一次设置的值。
+    enabled 为 False 时所有方法立即返回（计时器为共享的空对象），开销可以忽略。
+    """
+
+    def __init__(self, enabled=False, window=WINDOW, export_path=None, export_every=EXPORT_EVERY):
+        self.enabled = enabled
+        self.window = window
+        self.export_path = export_path  # 以 .csv 结尾时导出 CSV，否则导出 JSON
+        self.export_every = export_every
+        self.reset()
+
+    def reset(self):
+        """清空所有统计"""
+        self.turns = 0
+        self.timings = {}  # 名称 -> 最近的耗时样本
+        self._timers = {}
+        self.counters = {}  # 名称 -> 最近若干回合的计数
+        self.totals = {}  # 名称 -> 累计计数
+        self.gauges = {}  # 名称 -> 最近若干回合的数值
+        self._turn_counts = {}
+        self._turn_gauges = {}
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+
+    def timer(self, name):
+        """返回名称对应的计时器，用于 with 语句"""
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self._timers.get(name)
+        if timer is None:
+            samples = self.timings[name] = deque(maxlen=self.window)
+            timer = self._timers[name] = _Timer(samples)
+        return timer
+
+    def count(self, name, n=1):
+        """本回合的计数加 n"""
+        if not self.enabled:
+            return
+        self._turn_counts[name] = self._turn_counts.get(name, 0) + n
+
+    def gauge(self, name, value):
+        """设置本回合的数值，例如存活单位数"""
+        if not self.enabled:
+            return
+        self._turn_gauges[name] = value
+
+    def end_turn(self):
+        """结束一个回合：把本回合的计数和数值写入滚动窗口，并按需导出"""
+        if not self.enabled:
+            return
+        self.turns += 1
+        for name in self.counters.keys() | self._turn_counts.keys():
+            n = self._turn_counts.get(name, 0)
+            if name not in self.counters:
+                self.counters[name] = deque(maxlen=self.window)
+                self.totals[name] = 0
+            self.counters[name].append(n)
+            self.totals[name] += n
+        for name, value in self._turn_gauges.items():
+            if name not in self.gauges:
+                self.gauges[name] = deque(maxlen=self.window)
+            self.gauges[name].append(value)
+        self._turn_counts = {}
+        self._turn_gauges = {}
+        if self.export_path and self.turns % self.export_every == 0:
+            self.export(self.export_path)
+
+    def stats(self):
+        """汇总统计：{名称: {kind, samples, mean, p50, p95, p99, max[, total]}}，计时单位为毫秒"""
+        result = {}
+        for kind, series, scale in (("timer", self.timings, 1000.0), ("counter", self.counters, 1.0),
+                                    ("gauge", self.gauges, 1.0)):
+            for name, samples in series.items():
+                if not samples:
+                    continue
+                values = np.fromiter(samples, dtype=float, count=len(samples)) * scale
+                entry = {"kind": kind, "samples": len(values), "mean": float(values.mean())}
+                for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                    entry[f"p{p}"] = float(value)
+                entry["max"] = float(values.max())
+                if kind == "counter":
+                    entry["total"] = self.totals[name]
+                result[name] = entry
+        return result
+
+    def export(self, filename):
+        """按扩展名导出为 CSV 或 JSON，先写临时文件再替换"""
+        tmp = filename + ".tmp"
+        stats = self.stats()
+        with open(tmp, "w", newline="") as f:
+            if filename.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                writer.writeheader()
+                for name, entry in stats.items():
+                    writer.writerow(dict(entry, name=name))
+            else:
+                json.dump({"turns": self.turns, "stats": stats}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, filename)
+
+    def overlay_lines(self):
+        """性能叠加层显示的文字，每个统计项一行"""
+        lines = [f"回合 {self.turns}"]
+        for name, entry in self.stats().items():
+            if entry["kind"] == "timer":
+                lines.append(f"{name}: p50 {entry['p50']:.2f} ms  p95 {entry['p95']:.2f} ms  "
+                             f"max {entry['max']:.2f} ms")
+            elif entry["kind"] == "counter":
+                lines.append(f"{name}: {entry['mean']:.1f}/回合  p95 {entry['p95']:.0f}  累计 {entry['total']}")
+            else:
+                lines.append(f"{name}: {self.gauges[name][-1]}")
+        return lines
+
+
+# 游戏和训练共用的默认实例，默认关闭
+profiler = Profiler()
+
+
+def configure(enabled=None, export_path=None, export_every=None, window=None):
+    """调整默认实例的设置"""
+    if enabled is not None:
+        profiler.set_enabled(enabled)
+    if export_path is not None:
+        profiler.export_path = export_path
+    if export_every is not None:
+        profiler.export_every = export_every
+    if window is not None:
+        profiler.window = window
+        profiler.reset()
+    return profiler
@@ -1,317 +1,74 @@
-import arcade
-import arcade.gui
-import time
-from arcade.gui import UIManager, UIFlatButton, UIInputText, UIBoxLayout, UILabel
-from map.load_map import load_map_from_csv  # 导入地图加载函数
-from entites.soldier import Engineer, Medic, Assault, Support  # 导入士兵类
-from entites.actions import MoveAction, AttackAction, HealAction, BuildObstacleAction, ReloadAction, AimAndAttackAction  # 导入动作类
+import argparse
+from battle import Battle  # 导入对局逻辑
+from scheduler import run_headless  # 导入回合调度
+from events import event_log, OFF  # 导入事件流
+from instrumentation import profiler, configure as configure_profiler  # 导入性能统计
 
 # 设置默认游戏窗口大小
 DEFAULT_SCREEN_WIDTH = 800
 DEFAULT_SCREEN_HEIGHT = 600
 SCREEN_TITLE = "2D Turn-Based Strategy Game"
 
-# 回合间的延迟
-TURN_DELAY = 0.1  # 每个回合至少持续0.1秒
+# 无界面模式的默认回合上限，以及判定僵持的回合数：默认编制下双方走到各自的集合点后不会交火，
+# 连续 STALL_TURNS 回合所有单位的生命值都没有变化时提前结束，避免无限运行
+DEFAULT_MAX_TURNS = 5000
+STALL_TURNS = 200
 
-# 地图文件路径
-TERRAIN_FILE = "terrain_map.csv"
-HEIGHT_FILE = "height_map.csv"
 
+def run_headless_game(max_turns=DEFAULT_MAX_TURNS, quiet=False, seed=None, stall_turns=STALL_TURNS,
+                      fog_of_war=False):
+    """不打开窗口，以最快速度运行一局，返回 (回合数, 耗时秒数)
 
-class MainMenuView(arcade.View):
-    """主菜单界面"""
+    对局结束、达到 max_turns（None 表示不限）或连续 stall_turns 回合没有单位生命值变化时停止。
+    """
+    if quiet:
+        event_log.set_level(OFF)
+    battle = Battle(seed, fog_of_war)
+    battle.setup()
+    units = battle.player_units + battle.enemy_units
+    last_health = None
+    quiet_turns = 0
 
-    def __init__(self):
-        super().__init__()
-        self.ui_manager = UIManager()
+    def step():
+        nonlocal last_health, quiet_turns
+        if battle.is_over() or quiet_turns >= stall_turns:
+            return False
+        battle.handle_turn_logic()
+        health = [u.health for u in units]
+        quiet_turns = quiet_turns + 1 if health == last_health else 0
+        last_health = health
 
-    def on_show(self):
-        """当这个视图显示时"""
-        arcade.set_background_color(arcade.color.DARK_BLUE_GRAY)
-        self.ui_manager.clear()  # 清理现有的UI元素
-        self.ui_manager.enable()
-
-        # 创建一个垂直布局，用于排列按钮
-        self.v_box = UIBoxLayout(vertical=True, space_between=20)
-
-        # 创建开始游戏按钮
-        start_button = UIFlatButton(text="开始游戏", width=200)
-        start_button.on_click = self.on_click_start
-        self.v_box.add(start_button)
-
-        # 创建修改设置按钮
-        settings_button = UIFlatButton(text="修改设置", width=200)
-        settings_button.on_click = self.on_click_settings
-        self.v_box.add(settings_button)
-
-        # 创建退出游戏按钮
-        exit_button = UIFlatButton(text="退出游戏", width=200)
-        exit_button.on_click = self.on_click_exit
-        self.v_box.add(exit_button)
-
-        # 将按钮添加到UIManager中
-        self.ui_manager.add(
-            arcade.gui.UIAnchorWidget(
-                anchor_x="center_x",
-                anchor_y="center_y",
-                child=self.v_box)
-        )
-
-    def on_click_start(self, event):
-        """处理开始游戏按钮点击"""
-        game_view = TurnBasedStrategyGame()
-        game_view.setup()
-        self.window.show_view(game_view)
-
-    def on_click_settings(self, event):
-        """处理修改设置按钮点击"""
-        settings_view = SettingsView()
-        self.window.show_view(settings_view)
-
-    def on_click_exit(self, event):
-        """处理退出游戏按钮点击"""
-        arcade.close_window()
-
-    def on_draw(self):
-        """渲染主菜单界面"""
-        arcade.start_render()
-        # 渲染UI元素
-        self.ui_manager.draw()
-
-        # 添加标题文字
-        arcade.draw_text("2D Strategy Game", self.window.width / 2, self.window.height / 1.5,
-                         arcade.color.WHITE, font_size=50, anchor_x="center")
-
-    def on_hide_view(self):
-        """当视图隐藏时，禁用UIManager"""
-        self.ui_manager.disable()
-
-
-class SettingsView(arcade.View):
-    """设置界面"""
-
-    def __init__(self):
-        super().__init__()
-        self.ui_manager = UIManager()
-
-    def on_show(self):
-        """当这个视图显示时"""
-        arcade.set_background_color(arcade.color.DARK_GREEN)
-        self.ui_manager.clear()  # 清理现有的UI元素
-        self.ui_manager.enable()
-
-        # 创建一个垂直布局，用于排列设置项
-        self.v_box = UIBoxLayout(vertical=True, space_between=20)
-
-        # 添加窗口宽度设置
-        self.v_box.add(UILabel(text="窗口宽度:", font_size=20))
-        self.width_input = UIInputText(text=str(self.window.width), width=200)
-        self.v_box.add(self.width_input)
-
-        # 添加窗口高度设置
-        self.v_box.add(UILabel(text="窗口高度:", font_size=20))
-        self.height_input = UIInputText(text=str(self.window.height), width=200)
-        self.v_box.add(self.height_input)
-
-        # 添加全屏切换按钮
-        self.fullscreen_button = UIFlatButton(text="切换全屏", width=200)
-        self.fullscreen_button.on_click = self.on_click_fullscreen
-        self.v_box.add(self.fullscreen_button)
-
-        # 添加应用设置按钮
-        apply_button = UIFlatButton(text="应用设置", width=200)
-        apply_button.on_click = self.on_click_apply
-        self.v_box.add(apply_button)
-
-        # 添加返回主菜单按钮
-        back_button = UIFlatButton(text="返回主菜单", width=200)
-        back_button.on_click = self.on_click_back
-        self.v_box.add(back_button)
-
-        # 将设置项添加到UIManager中
-        self.ui_manager.add(
-            arcade.gui.UIAnchorWidget(
-                anchor_x="center_x",
-                anchor_y="center_y",
-                child=self.v_box)
-        )
-
-    def on_click_fullscreen(self, event):
-        """切换全屏模式"""
-        self.window.set_fullscreen(not self.window.fullscreen)
-
-    def on_click_apply(self, event):
-        """应用窗口大小设置"""
-        try:
-            new_width = int(self.width_input.text)
-            new_height = int(self.height_input.text)
-            self.window.set_size(new_width, new_height)
-        except ValueError:
-            print("请输入有效的窗口宽度和高度！")
-
-    def on_click_back(self, event):
-        """返回主菜单"""
-        main_menu = MainMenuView()
-        self.window.show_view(main_menu)
-
-    def on_draw(self):
-        """渲染设置界面"""
-        arcade.start_render()
-        # 渲染UI元素
-        self.ui_manager.draw()
-
-    def on_hide_view(self):
-        """当视图隐藏时，禁用UIManager"""
-        self.ui_manager.disable()
-
-
-class TurnBasedStrategyGame(arcade.View):
-    """游戏主视图"""
-
-    def __init__(self):
-        super().__init__()
-        self.turn_counter = 0  # 当前回合计数
-        self.player_units = []  # 玩家单位列表
-        self.enemy_units = []  # 敌方单位列表
-        self.terrain_map = None  # 地形地图
-        self.height_map = None  # 高度地图
-
-    def setup(self):
-        """游戏开始前的设置"""
-        arcade.set_background_color(arcade.color.ASH_GREY)
-
-        # 加载地图
-        self.load_map()
-
-        # 初始化单位
-        self.initialize_units()
-
-    def load_map(self):
-        """加载地图"""
-        self.terrain_map, self.height_map = load_map_from_csv(TERRAIN_FILE, HEIGHT_FILE)
-
-    def initialize_units(self):
-        """初始化玩家和敌方单位"""
-        # 创建玩家和敌方的士兵
-        self.player_units = [
-            Engineer(100, 100, "蓝方"),
-            Medic(150, 100, "蓝方"),
-            Assault(200, 100, "蓝方"),
-            Support(250, 100, "蓝方")
-        ]
-
-        self.enemy_units = [
-            Engineer(500, 500, "红方"),
-            Medic(550, 500, "红方"),
-            Assault(600, 500, "红方"),
-            Support(650, 500, "红方")
-        ]
-
-    def on_show(self):
-        """当这个视图显示时"""
-        arcade.set_background_color(arcade.color.ASH_GREY)
-
-    def on_draw(self):
-        """渲染屏幕内容，每帧都调用"""
-        arcade.start_render()
-
-        # 绘制地图
-        self.draw_map()
-
-        # 绘制玩家单位
-        for unit in self.player_units:
-            unit.draw()
-
-        # 绘制敌方单位
-        for unit in self.enemy_units:
-            unit.draw()
-
-    def setup(self):
-        """游戏开始前的设置"""
-        arcade.set_background_color(arcade.color.ASH_GREY)
-
-        # 加载地图
-        self.load_map()
-
-        # 初始化单位
-        self.initialize_units()
-
-        # 初始化地图渲染
-        self.map_sprites = arcade.SpriteList()  # 创建一个地图的SpriteList
-        self.initialize_map_sprites()
-
-    def initialize_map_sprites(self):
-        """将地图的每个地块初始化为Sprite，并添加到SpriteList"""
-        tile_size = 5  # 每个地块的大小（像素）
-
-        for row in range(len(self.terrain_map)):
-            for col in range(len(self.terrain_map[0])):
-                terrain_type = self.terrain_map[row][col]  # 获取地形类型
-                height = self.height_map[row][col]  # 获取高度信息（暂时未使用）
-
-                # 根据地形类型选择颜色
-                if terrain_type == 0:  # 空地
-                    color = arcade.color.LIGHT_YELLOW
-                elif terrain_type == 1:  # 障碍物
-                    color = arcade.color.BLACK
-                elif terrain_type == 2:  # 水域
-                    color = arcade.color.BLUE
-                elif terrain_type == 3:  # 山地
-                    color = arcade.color.YELLOW
-                else:
-                    color = arcade.color.WHITE  # 未知地形类型
-
-                # 创建一个Sprite并设置它的位置和颜色
-                sprite = arcade.SpriteSolidColor(tile_size, tile_size, color)
-                sprite.center_x = col * tile_size + tile_size / 2
-                sprite.center_y = row * tile_size + tile_size / 2
-
-                # 将Sprite添加到SpriteList
-                self.map_sprites.append(sprite)
-
-    def draw_map(self):
-        """绘制地图"""
-        self.map_sprites.draw()  # 只需要绘制缓存的SpriteList
-
-
-    def on_update(self, delta_time):
-        """游戏逻辑更新，每帧调用"""
-        # 控制回合系统
-        self.handle_turn_logic()
-
-    def handle_turn_logic(self):
-        """处理回合逻辑"""
-        self.turn_counter += 1
-        print(f"Executing turn {self.turn_counter}")
-
-        # 执行回合操作，先攻击再移动
-        for unit in self.player_units:
-            enemies_in_range = [enemy for enemy in self.enemy_units if unit.distance_to(enemy) <= unit.weapon.range]
-            if enemies_in_range:
-                action = AttackAction(unit, enemies_in_range[0])
-            else:
-                action = MoveAction(unit, 300, 300)  # 示例移动到某个位置
-            action.execute()
-
-        # 同样处理敌方单位的回合逻辑
-        for unit in self.enemy_units:
-            enemies_in_range = [enemy for enemy in self.player_units if unit.distance_to(enemy) <= unit.weapon.range]
-            if enemies_in_range:
-                action = AttackAction(unit, enemies_in_range[0])
-            else:
-                action = MoveAction(unit, 600, 600)  # 示例移动到某个位置
-            action.execute()
-
-    def on_key_press(self, key, modifiers):
-        """处理按键事件"""
-        if key == arcade.key.ESCAPE:
-            main_menu = MainMenuView()
-            self.window.show_view(main_menu)
+    return run_headless(step, max_turns)
 
 
 def main():
-    """游戏主函数"""
+    """游戏主函数；使用 --headless 时不打开窗口，直接以最快速度运行"""
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("--headless", action="store_true", help="不打开窗口，不限速运行")
+    parser.add_argument("--turns", type=int, default=DEFAULT_MAX_TURNS,
+                        help=f"无界面模式下最多运行的回合数，0 表示不限（默认 {DEFAULT_MAX_TURNS}）")
+    parser.add_argument("--quiet", action="store_true", help="无界面模式下关闭事件输出")
+    parser.add_argument("--seed", type=int, help="无界面模式下战斗结算的随机种子")
+    parser.add_argument("--fog", action="store_true", help="无界面模式下开启战争迷雾，只能攻击视野内的敌人")
+    parser.add_argument("--profile", action="store_true", help="开启性能统计")
+    parser.add_argument("--profile-out", help="性能统计导出文件（.json 或 .csv），隐含 --profile")
+    parser.add_argument("--profile-every", type=int, help="每隔多少回合导出一次性能统计")
+    args = parser.parse_args()
+    if args.profile or args.profile_out:
+        configure_profiler(True, args.profile_out, args.profile_every)
+    if args.headless:
+        turns, elapsed = run_headless_game(args.turns or None, args.quiet, args.seed, fog_of_war=args.fog)
+        print(f"运行了 {turns} 个回合，用时 {elapsed:.2f} 秒")
+        if args.profile_out:
+            profiler.export(args.profile_out)
+        elif profiler.enabled:
+            print("\n".join(profiler.overlay_lines()))
+        return
+
+    # 窗口和界面只在这里导入，无界面模式不加载 arcade / pyglet
+    import arcade
+    from gui import MainMenuView
+
     window = arcade.Window(DEFAULT_SCREEN_WIDTH, DEFAULT_SCREEN_HEIGHT, SCREEN_TITLE)
     main_menu_view = MainMenuView()
     window.show_view(main_menu_view)
@@ -0,0 +1,195 @@
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from map.generate_map import EMPTY, OBSTACLE, WATER, MOUNTAIN, DEFAULT_TILE_SIZE, generate_random_map_tiled
+from map.map_file import load_map_file, read_map_header, save_map_file
+
+# 用法（在 2dmap/src 目录下）：
+#   python -m map.build_dataset --out maps --sizes 256x256 512x512 --obstacle 0.1 0.2 --maps-per-setting 100
+
+MANIFEST_FILE = "manifest.json"
+MAP_NAME = "map_{:06d}.bmap"
+MANIFEST_EVERY = 100  # 每完成多少张地图写一次清单，中断后也能保留进度
+TERRAIN_NAMES = {EMPTY: "empty", OBSTACLE: "obstacle", WATER: "water", MOUNTAIN: "mountain"}
+
+
+def map_seed(base_seed, index):
+    """第 index 张地图的种子，只由 (base_seed, index) 决定"""
+    return int(np.random.SeedSequence([base_seed, index]).generate_state(1, np.uint64)[0])
+
+
+def plan_maps(sizes, obstacle_chances, water_chances, mountain_chances, maps_per_setting, base_seed,
+              tile_size=DEFAULT_TILE_SIZE):
+    """展开参数网格，返回每张地图的参数（编号固定，重复运行时保持一致）
+
+    分块边长也记入参数：同一种子在不同 tile_size 下生成的地图不同，续跑时必须一致才能复用。
+    """
+    jobs = []
+    settings = itertools.product(sizes, obstacle_chances, water_chances, mountain_chances)
+    for (width, height), obstacle, water, mountain in settings:
+        for _ in range(maps_per_setting):
+            index = len(jobs)
+            jobs.append({
+                "index": index,
+                "file": MAP_NAME.format(index),
+                "width": width,
+                "height": height,
+                "obstacle_chance": obstacle,
+                "water_chance": water,
+                "mountain_chance": mountain,
+                "seed": map_seed(base_seed, index),
+                "tile_size": tile_size,
+            })
+    return jobs
+
+
+def terrain_stats(terrain_map, height_map):
+    """统计各类地形的比例和高度分布"""
+    counts = np.bincount(np.asarray(terrain_map).ravel(), minlength=len(TERRAIN_NAMES))
+    stats = {name: float(counts[kind] / terrain_map.size) for kind, name in TERRAIN_NAMES.items()}
+    stats["height_mean"] = float(np.mean(height_map))
+    stats["height_std"] = float(np.std(height_map))
+    return stats
+
+
+def build_map(job, directory):
+    """生成一张地图并写入目录，返回清单条目（含地形统计）"""
+    game_map = generate_random_map_tiled(job["width"], job["height"], job["obstacle_chance"], job["water_chance"],
+                                         job["mountain_chance"], seed=job["seed"], tile_size=job["tile_size"])
+    terrain_map, height_map = game_map[:, :, 0], game_map[:, :, 1]
+    entry = dict(job, stats=terrain_stats(terrain_map, height_map))
+    save_map_file(os.path.join(directory, job["file"]), terrain_map, height_map, seed=job["seed"],
+                  dataset_entry=entry)
+    return entry
+
+
+def existing_entry(job, directory):
+    """已经生成过且参数一致的地图直接从文件头读出清单条目，否则返回 None"""
+    filename = os.path.join(directory, job["file"])
+    if not os.path.exists(filename):
+        return None
+    try:
+        entry = read_map_header(filename).get("dataset_entry")
+    except (ValueError, OSError):
+        return None
+    if entry is None or any(entry.get(key) != value for key, value in job.items()):
+        return None
+    return entry
+
+
+def write_manifest(directory, entries, parameters):
+    """原子地写入清单文件"""
+    path = os.path.join(directory, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"parameters": parameters, "maps": sorted(entries, key=lambda e: e["index"])}, f,
+                  ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def build_dataset(directory, jobs, workers=1, parameters=None, verbose=True):
+    """并行生成所有尚未生成的地图并写出清单，返回清单条目列表"""
+    os.makedirs(directory, exist_ok=True)
+    parameters = parameters or {}
+    entries = []
+    pending = []
+    for job in jobs:
+        entry = existing_entry(job, directory)
+        if entry is None:
+            pending.append(job)
+        else:
+            entries.append(entry)
+    if verbose:
+        print(f"共 {len(jobs)} 张地图，已存在 {len(entries)} 张，需要生成 {len(pending)} 张")
+
+    def finished(entry):
+        entries.append(entry)
+        if len(entries) % MANIFEST_EVERY == 0:
+            write_manifest(directory, entries, parameters)
+            if verbose:
+                print(f"已完成 {len(entries)}/{len(jobs)}")
+
+    if workers == 1:
+        for job in pending:
+            finished(build_map(job, directory))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(build_map, job, directory) for job in pending]
+            for future in as_completed(futures):
+                finished(future.result())
+
+    write_manifest(directory, entries, parameters)
+    return sorted(entries, key=lambda e: e["index"])
+
+
+class MapDataset:
+    """按编号读取地图数据集；清单只在创建时读取一次，之后按编号 O(1) 定位文件"""
+
+    def __init__(self, directory, mmap=True):
+        self.directory = directory
+        self.mmap = mmap
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.parameters = manifest["parameters"]
+        self.entries = manifest["maps"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        """返回 (地形地图, 高度地图, 清单条目)"""
+        entry = self.entries[index]
+        terrain_map, height_map, _ = load_map_file(os.path.join(self.directory, entry["file"]), self.mmap)
+        return terrain_map, height_map, entry
+
+    def sample(self, rng=None):
+        """随机取一张地图"""
+        rng = np.random.default_rng(rng)
+        return self[int(rng.integers(len(self.entries)))]
+
+    def select(self, **criteria):
+        """按参数筛选，返回满足所有条件的地图编号，例如 select(obstacle_chance=0.2)"""
+        return [i for i, entry in enumerate(self.entries)
+                if all(entry.get(key) == value for key, value in criteria.items())]
+
+
+def _parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量并行生成地图数据集，并写出清单")
+    parser.add_argument("--out", default="maps", help="输出目录")
+    parser.add_argument("--sizes", nargs="+", type=_parse_size, default=[(256, 256)], help="地图尺寸，如 512x512")
+    parser.add_argument("--obstacle", nargs="+", type=float, default=[0.2], help="障碍物概率")
+    parser.add_argument("--water", nargs="+", type=float, default=[0.05], help="水域概率")
+    parser.add_argument("--mountain", nargs="+", type=float, default=[0.1], help="山地概率")
+    parser.add_argument("--maps-per-setting", type=int, default=10, help="每组参数生成的地图数量")
+    parser.add_argument("--seed", type=int, default=0, help="数据集的基础种子")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE, help="分块生成的块边长")
+    args = parser.parse_args()
+
+    parameters = {
+        "sizes": args.sizes,
+        "obstacle_chances": args.obstacle,
+        "water_chances": args.water,
+        "mountain_chances": args.mountain,
+        "maps_per_setting": args.maps_per_setting,
+        "seed": args.seed,
+        "tile_size": args.tile_size,
+    }
+    jobs = plan_maps(args.sizes, args.obstacle, args.water, args.mountain, args.maps_per_setting, args.seed,
+                     args.tile_size)
+    entries = build_dataset(args.out, jobs, args.workers, parameters)
+    print(f"数据集已写入 {args.out}，共 {len(entries)} 张地图")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from map.generate_map import DEFAULT_TILE_SIZE, generate_map_tile
+from map.map_file import TERRAIN_DTYPE, HEIGHT_DTYPE, load_map_file
+
+TILE_SIZE = 5  # 每个地块的大小（像素）
+CACHE_CHUNKS = 64  # 默认最多常驻的区块数（256 x 256 的区块约 192KB）
+
+
+class ChunkedMap:
+    """按区块按需生成或加载的大地图，常驻内存的区块数量有上限（LRU）
+
+    区块边长与 generate_random_map_tiled 的 tile_size 相同，使用相同 seed 时
+    任意区块的内容与整张分块生成的地图一致。内存占用只取决于活动区域的大小。
+    terrain 和 heights 属性可以像二维数组一样索引（整数、数组或切片），跨区块拼接。
+
+    目前只有 TerrainRenderer（from_chunked_map）按区块读取；PathFinder、LineOfSight、FogOfWar、
+    Battle 和 VecBattleEnv 都使用整张数组，在 ChunkedMap 上使用它们时需要先用 region 取出一个窗口。
+    """
+
+    def __init__(self, width, height, seed=None, chunk_size=DEFAULT_TILE_SIZE, loader=None,
+                 cache_chunks=CACHE_CHUNKS, tile_size=TILE_SIZE,
+                 obstacle_chance=0.2, water_chance=0.05, mountain_chance=0.1):
+        if seed is None and loader is None:
+            seed = np.random.SeedSequence().entropy
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.cache_chunks = cache_chunks
+        self.tile_size = tile_size
+        self.chances = (obstacle_chance, water_chance, mountain_chance)
+        self.loader = loader or self._generate_chunk  # loader(区块行, 区块列) -> (地形, 高度)
+        self.chunk_rows = -(-height // chunk_size)
+        self.chunk_cols = -(-width // chunk_size)
+        self.chunks = OrderedDict()  # (区块行, 区块列) -> (地形, 高度)
+        self.loads = 0  # 累计生成或加载的区块数
+        self.terrain = MapLayer(self, 0, TERRAIN_DTYPE)
+        self.heights = MapLayer(self, 1, HEIGHT_DTYPE)
+
+    @classmethod
+    def from_map_file(cls, filename, chunk_size=DEFAULT_TILE_SIZE, cache_chunks=CACHE_CHUNKS, tile_size=TILE_SIZE):
+        """从二进制地图文件按区块读取（文件以内存映射打开，只有被访问的区块会读入内存）"""
+        terrain_map, height_map, metadata = load_map_file(filename, mmap=True)
+
+        def loader(chunk_row, chunk_col):
+            r0, c0 = chunk_row * chunk_size, chunk_col * chunk_size
+            return (np.array(terrain_map[r0:r0 + chunk_size, c0:c0 + chunk_size]),
+                    np.array(height_map[r0:r0 + chunk_size, c0:c0 + chunk_size]))
+
+        rows, cols = terrain_map.shape
+        return cls(cols, rows, metadata.get("seed"), chunk_size, loader, cache_chunks, tile_size)
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def _generate_chunk(self, chunk_row, chunk_col):
+        tile = generate_map_tile(self.seed, chunk_row, chunk_col, self.chunk_size, self.width, self.height,
+                                 *self.chances)
+        return tile[..., 0].astype(TERRAIN_DTYPE), tile[..., 1].astype(HEIGHT_DTYPE)
+
+    def chunk(self, chunk_row, chunk_col):
+        """返回区块的 (地形, 高度)，不在缓存中时生成或加载，并淘汰最久未使用的区块"""
+        key = (chunk_row, chunk_col)
+        data = self.chunks.get(key)
+        if data is not None:
+            self.chunks.move_to_end(key)
+            return data
+        data = self.loader(chunk_row, chunk_col)
+        self.loads += 1
+        self.chunks[key] = data
+        while len(self.chunks) > self.cache_chunks:
+            self.chunks.popitem(last=False)
+        return data
+
+    def lookup(self, rows, cols, layer=0):
+        """批量查询格子的地形（layer=0）或高度（layer=1），按区块分组读取"""
+        rows, cols = np.broadcast_arrays(np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))
+        shape = rows.shape
+        rows, cols = rows.ravel(), cols.ravel()
+        if ((rows < 0) | (rows >= self.height) | (cols < 0) | (cols >= self.width)).any():
+            raise IndexError("格子坐标超出地图范围")
+        result = np.empty(len(rows), dtype=TERRAIN_DTYPE if layer == 0 else HEIGHT_DTYPE)
+        keys = (rows // self.chunk_size) * self.chunk_cols + cols // self.chunk_size
+        unique, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique) + 1))
+        for i, key in enumerate(unique.tolist()):
+            idx = order[bounds[i]:bounds[i + 1]]
+            chunk_row, chunk_col = divmod(key, self.chunk_cols)
+            data = self.chunk(chunk_row, chunk_col)[layer]
+            result[idx] = data[rows[idx] - chunk_row * self.chunk_size, cols[idx] - chunk_col * self.chunk_size]
+        return result.reshape(shape)
+
+    def terrain_at(self, rows, cols):
+        return self.lookup(rows, cols, 0)
+
+    def height_at(self, rows, cols):
+        return self.lookup(rows, cols, 1)
+
+    def region(self, row0, col0, row1, col1, layer=0):
+        """拼出格子矩形 [row0, row1) x [col0, col1) 的地形或高度数组"""
+        row0, col0 = max(row0, 0), max(col0, 0)
+        row1, col1 = min(row1, self.height), min(col1, self.width)
+        result = np.empty((max(row1 - row0, 0), max(col1 - col0, 0)),
+                          dtype=TERRAIN_DTYPE if layer == 0 else HEIGHT_DTYPE)
+        if result.size == 0:
+            return result
+        size = self.chunk_size
+        for chunk_row in range(row0 // size, (row1 - 1) // size + 1):
+            for chunk_col in range(col0 // size, (col1 - 1) // size + 1):
+                data = self.chunk(chunk_row, chunk_col)[layer]
+                r0, c0 = max(row0, chunk_row * size), max(col0, chunk_col * size)
+                r1, c1 = min(row1, (chunk_row + 1) * size), min(col1, (chunk_col + 1) * size)
+                result[r0 - row0:r1 - row0, c0 - col0:c1 - col0] = \
+                    data[r0 - chunk_row * size:r1 - chunk_row * size, c0 - chunk_col * size:c1 - chunk_col * size]
+        return result
+
+    def prefetch_cells(self, row0, col0, row1, col1):
+        """预先载入覆盖格子矩形的所有区块，返回新载入的区块数"""
+        size = self.chunk_size
+        before = self.loads
+        for chunk_row in range(max(row0 // size, 0), min((row1 - 1) // size, self.chunk_rows - 1) + 1):
+            for chunk_col in range(max(col0 // size, 0), min((col1 - 1) // size, self.chunk_cols - 1) + 1):
+                self.chunk(chunk_row, chunk_col)
+        return self.loads - before
+
+    def prefetch_viewport(self, left, right, bottom, top, margin=0):
+        """按镜头视口（像素）预取区块，margin 为视口外额外预取的格子数"""
+        t = self.tile_size
+        return self.prefetch_cells(int(bottom // t) - margin, int(left // t) - margin,
+                                   int(top // t) + margin + 1, int(right // t) + margin + 1)
+
+    def prefetch_units(self, xs, ys, radius):
+        """预取单位周围 radius 像素范围内的区块（多个单位共用一个区块时只载入一次），返回新载入的区块数"""
+        span = self.chunk_size * self.tile_size
+        xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+        if xs.size == 0:
+            return 0
+        reach = int(np.ceil(radius / span))
+        keys = set()
+        for cx, cy in zip((xs // span).astype(np.int64).tolist(), (ys // span).astype(np.int64).tolist()):
+            for chunk_row in range(max(cy - reach, 0), min(cy + reach, self.chunk_rows - 1) + 1):
+                for chunk_col in range(max(cx - reach, 0), min(cx + reach, self.chunk_cols - 1) + 1):
+                    keys.add((chunk_row, chunk_col))
+        before = self.loads
+        for key in sorted(keys):
+            self.chunk(*key)
+        return self.loads - before
+
+
+class MapLayer:
+    """ChunkedMap 的一层（地形或高度），支持与 NumPy 二维数组相同的基本索引方式
+
+    支持 layer[行, 列]（整数、负数、数组或切片）、layer[行]、len(layer) 和 np.asarray(layer)（拼出整层）。
+    """
+
+    def __init__(self, chunked_map, layer, dtype):
+        self.map = chunked_map
+        self.layer = layer
+        self.dtype = dtype
+        self.ndim = 2
+
+    @property
+    def shape(self):
+        return self.map.shape
+
+    @property
+    def size(self):
+        return self.map.height * self.map.width
+
+    def __len__(self):
+        return self.map.height
+
+    def __iter__(self):
+        for row in range(self.map.height):
+            yield self[row]
+
+    def __array__(self, dtype=None, copy=None):
+        result = self.map.region(0, 0, self.map.height, self.map.width, self.layer)
+        return result if dtype is None else result.astype(dtype)
+
+    def __getitem__(self, key):
+        if key is Ellipsis:
+            key = (slice(None), slice(None))
+        elif not isinstance(key, tuple):
+            key = (key, slice(None))  # layer[行] 与数组一样取整行
+        rows, cols = key
+        rows = self._wrap(rows, self.map.height)
+        cols = self._wrap(cols, self.map.width)
+        if isinstance(rows, slice) and isinstance(cols, slice):
+            # 两个切片：按覆盖范围拼出一块再取步长（步长可以为负）
+            rows = np.arange(*rows.indices(self.map.height))
+            cols = np.arange(*cols.indices(self.map.width))
+            if len(rows) == 0 or len(cols) == 0:
+                return np.empty((len(rows), len(cols)), dtype=self.dtype)
+            r0, c0 = rows.min(), cols.min()
+            block = self.map.region(r0, c0, rows.max() + 1, cols.max() + 1, self.layer)
+            return block[np.ix_(rows - r0, cols - c0)]
+        # 切片与整数混用时结果为一维，与数组混用时为二维（行 x 列）
+        if isinstance(rows, slice):
+            rows = np.arange(*rows.indices(self.map.height))
+            rows = rows if np.ndim(cols) == 0 else rows[:, None]
+        if isinstance(cols, slice):
+            cols = np.arange(*cols.indices(self.map.width))
+            cols = cols if np.ndim(rows) == 0 else cols[None, :]
+        result = self.map.lookup(rows, cols, self.layer)
+        return result[()] if result.ndim == 0 else result
+
+    @staticmethod
+    def _wrap(index, size):
+        """负数下标按 NumPy 的规则从末尾倒数"""
+        if isinstance(index, slice):
+            return index
+        index = np.asarray(index)
+        if ((index < -size) | (index >= size)).any():
+            raise IndexError("格子坐标超出地图范围")
+        return np.where(index < 0, index + size, index)
@@ -20,26 +20,82 @@ MAX_HEIGHT = 100  # 最高高度
 PLAYER_START_POS = (0, 0)
 ENEMY_START_POS = (MAP_HEIGHT - 1, MAP_WIDTH - 1)
 
+# 分块生成时每块的默认边长（格子）
+DEFAULT_TILE_SIZE = 256
 
-def generate_random_map(width, height, obstacle_chance=0.2, water_chance=0.05, mountain_chance=0.1):
-    """生成一个随机地图，包含地形和高度信息"""
-    # 创建一个全空地的地图
-    game_map = np.full((height, width, 2), [EMPTY, 0], dtype=int)  # 地形和高度
-    
-    # 随机放置障碍物、水域和山地
-    for y in range(height):
-        for x in range(width):
-            rand_val = np.random.random()
-            if rand_val < obstacle_chance:
-                game_map[y, x][0] = OBSTACLE  # 地形为障碍物
-            elif rand_val < obstacle_chance + water_chance:
-                game_map[y, x][0] = WATER  # 地形为水域
-            elif rand_val < obstacle_chance + water_chance + mountain_chance:
-                game_map[y, x][0] = MOUNTAIN  # 地形为山地
-            
-            # 生成随机高度
-            game_map[y, x][1] = np.random.randint(MIN_HEIGHT, MAX_HEIGHT)
 
+def classify_terrain(rand_val, obstacle_chance=0.2, water_chance=0.05, mountain_chance=0.1):
+    """把 [0, 1) 区间的随机数按概率阈值映射为地形类型"""
+    thresholds = np.cumsum([obstacle_chance, water_chance, mountain_chance])
+    terrain = np.searchsorted(thresholds, rand_val, side="right")
+    # 超出所有阈值的位置为空地
+    return np.array([OBSTACLE, WATER, MOUNTAIN, EMPTY])[terrain]
+
+
+def generate_random_map(width, height, obstacle_chance=0.2, water_chance=0.05, mountain_chance=0.1, seed=None):
+    """生成一个随机地图，包含地形和高度信息
+
+    seed 可以是整数、np.random.SeedSequence 或 np.random.Generator，为 None 时使用随机种子。
+    """
+    rng = np.random.default_rng(seed)
+    rand_val = rng.random((height, width))
+    terrain_map = classify_terrain(rand_val, obstacle_chance, water_chance, mountain_chance)
+    height_map = rng.integers(MIN_HEIGHT, MAX_HEIGHT, size=(height, width))
+
+    # 地形和高度合并为 (height, width, 2) 的地图
+    return np.stack((terrain_map, height_map), axis=-1)
+
+
+def generate_map_tile(seed, tile_row, tile_col, tile_size, width, height,
+                      obstacle_chance=0.2, water_chance=0.05, mountain_chance=0.1):
+    """生成地图中的一块，随机流只由 (seed, 块行号, 块列号) 决定，与生成顺序无关"""
+    seed_seq = np.random.SeedSequence(seed, spawn_key=(tile_row, tile_col))
+    tile_width = min(tile_size, width - tile_col * tile_size)
+    tile_height = min(tile_size, height - tile_row * tile_size)
+    return generate_random_map(tile_width, tile_height, obstacle_chance, water_chance, mountain_chance,
+                               seed=seed_seq)
+
+
+def _generate_tile_job(args):
+    """进程池任务：生成一块并返回其位置"""
+    tile_row, tile_col = args[1], args[2]
+    return tile_row, tile_col, generate_map_tile(*args)
+
+
+def _place_tile(game_map, tile_row, tile_col, tile_size, tile):
+    """把一块写回整张地图"""
+    y, x = tile_row * tile_size, tile_col * tile_size
+    game_map[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+
+
+def generate_random_map_tiled(width, height, obstacle_chance=0.2, water_chance=0.05, mountain_chance=0.1,
+                              seed=None, tile_size=DEFAULT_TILE_SIZE, workers=1, return_seed=False):
+    """分块生成大地图，可使用进程池并行；相同 seed 和 tile_size 下结果与 workers 数量无关
+
+    seed 为 None 时会随机选取一个整数种子（np.random.SeedSequence 的 entropy），
+    return_seed=True 时返回 (地图, 种子)，把种子传回 seed 即可复现同一张地图。
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    game_map = np.empty((height, width, 2), dtype=int)
+    jobs = [
+        (seed, tile_row, tile_col, tile_size, width, height, obstacle_chance, water_chance, mountain_chance)
+        for tile_row in range(-(-height // tile_size))
+        for tile_col in range(-(-width // tile_size))
+    ]
+
+    if workers == 1:
+        for tile_row, tile_col, tile in map(_generate_tile_job, jobs):
+            _place_tile(game_map, tile_row, tile_col, tile_size, tile)
+    else:
+        # 进程池只在并行生成时导入，避免拖慢只做模拟的进程的启动
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for tile_row, tile_col, tile in executor.map(_generate_tile_job, jobs):
+                _place_tile(game_map, tile_row, tile_col, tile_size, tile)
+    if return_seed:
+        return game_map, seed
     return game_map
 
 
@@ -76,13 +132,20 @@ def load_map_from_csv(terrain_filename="terrain_map.csv", height_filename="heigh
 
 
 if __name__ == "__main__":
+    from map_file import MAP_FILE, save_map_file
+
     # 生成随机地图
-    game_map = generate_random_map(MAP_WIDTH, MAP_HEIGHT)
+    seed = np.random.SeedSequence().entropy
+    game_map = generate_random_map(MAP_WIDTH, MAP_HEIGHT, seed=seed)
 
     # 保存地图到 CSV 文件
     save_map_to_csv(game_map)
     print("地图已保存为 terrain_map.csv 和 height_map.csv")
 
+    # 同时保存为二进制地图文件，游戏启动时优先加载
+    save_map_file(MAP_FILE, game_map[:, :, 0], game_map[:, :, 1], seed=seed)
+    print(f"地图已保存为 {MAP_FILE}")
+
     # 从文件中加载地图
     loaded_map = load_map_from_csv()
     print("已从文件中加载地图。")
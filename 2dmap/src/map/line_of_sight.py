@@ -0,0 +1,160 @@
+import numpy as np
+
+# 地形类型（与 generate_map.py 一致）
+EMPTY = 0  # 空地
+OBSTACLE = 1  # 障碍物
+WATER = 2  # 水域
+MOUNTAIN = 3  # 山地
+
+BLOCKING_TERRAIN = (OBSTACLE, MOUNTAIN)  # 阻挡视线的地形
+EYE_HEIGHT = 2  # 士兵视线高出所在地块的高度
+TILE_SIZE = 5  # 每个地块的大小（像素），与 initialize_map_sprites 一致
+LOS_CACHE_SIZE = 1 << 20  # 视线缓存的最大条目数，超出后整体清空
+MAX_SAMPLES_PER_CHUNK = 1 << 22  # 每批光线步进的最大采样点数，限制临时数组的内存
+# 缓存键：格子数不超过 MAX_PACKED_CELLS 时把 (起点格子, 终点格子) 打包成一个 int64（起点 * 格子数 + 终点），
+# 更大的地图（例如 100k x 100k）乘积会溢出，改用两个 int64 字段的结构化键（按起点、终点排序，查找较慢）
+MAX_PACKED_CELLS = 3_037_000_499  # floor(sqrt(2^63 - 1))
+PAIR_KEY_DTYPE = np.dtype([("start", "<i8"), ("end", "<i8")])
+
+
+def sight_layers(terrain_map, height_map, blocking_terrain=BLOCKING_TERRAIN):
+    """视线判定用的 (阻挡地形布尔数组, float32 高度)，可以预先算好后在多个 LineOfSight 之间共用"""
+    return np.isin(terrain_map, blocking_terrain), np.asarray(height_map, dtype=np.float32)
+
+
+class LineOfSight:
+    """基于地形和高度的视线判定，批量处理 (射手, 目标) 对并缓存结果
+
+    视线从射手格子中心出发，按 DDA 逐格步进到目标格子，途经格子（不含两端）
+    只要是阻挡地形，或者高度超过视线在该处的高度，就视为被遮挡。
+    缓存以 (起点格子, 终点格子) 为键保存在有序数组中（见 MAX_PACKED_CELLS），查找和失效都是向量化的；
+    某些格子改变时，只丢弃包围盒覆盖这些格子的条目。
+    layers 为 sight_layers 预先算好的 (阻挡, 高度)，例如多个进程共用的只读共享内存，此时不再复制地图。
+    """
+
+    def __init__(self, terrain_map, height_map, tile_size=TILE_SIZE, eye_height=EYE_HEIGHT,
+                 blocking_terrain=BLOCKING_TERRAIN, cache_size=LOS_CACHE_SIZE, layers=None):
+        self.terrain_map = terrain_map
+        self.height_map = height_map
+        self.tile_size = tile_size
+        self.eye_height = eye_height
+        self.blocking_terrain = tuple(blocking_terrain)
+        self.cache_size = cache_size
+        self.rows, self.cols = terrain_map.shape
+        self.key_dtype = np.dtype(np.int64) if self.rows * self.cols <= MAX_PACKED_CELLS else PAIR_KEY_DTYPE
+        if layers is None:
+            layers = sight_layers(terrain_map, height_map, self.blocking_terrain)
+        self.blocking, self.heights = layers
+        self.clear_cache()
+
+    def clear_cache(self):
+        """清空视线缓存"""
+        self._keys = np.zeros(0, dtype=self.key_dtype)
+        self._values = np.zeros(0, dtype=bool)
+        self._bbox = np.zeros((0, 4), dtype=np.int64)  # 行最小、行最大、列最小、列最大
+
+    def update_cells(self, row0, col0, row1, col1):
+        """地形或高度在矩形 [row0, row1) x [col0, col1) 内发生变化：刷新阻挡信息并使相关缓存失效"""
+        self.blocking[row0:row1, col0:col1] = np.isin(self.terrain_map[row0:row1, col0:col1], self.blocking_terrain)
+        self.heights[row0:row1, col0:col1] = self.height_map[row0:row1, col0:col1]
+        self.invalidate_rect(row0, col0, row1, col1)
+
+    def invalidate_rect(self, row0, col0, row1, col1):
+        """丢弃包围盒与矩形 [row0, row1) x [col0, col1) 相交的缓存条目"""
+        b = self._bbox
+        hit = (b[:, 0] < row1) & (b[:, 1] >= row0) & (b[:, 2] < col1) & (b[:, 3] >= col0)
+        if hit.any():
+            keep = ~hit
+            self._keys, self._values, self._bbox = self._keys[keep], self._values[keep], self._bbox[keep]
+
+    def pixel_to_cell(self, x, y):
+        """把像素坐标数组转换为格子 (行, 列) 数组"""
+        rows = np.clip(np.floor_divide(y, self.tile_size).astype(np.int64), 0, self.rows - 1)
+        cols = np.clip(np.floor_divide(x, self.tile_size).astype(np.int64), 0, self.cols - 1)
+        return rows, cols
+
+    def visible_pixels(self, x0, y0, x1, y1):
+        """像素坐标版本的 visible；标量输入时返回 bool"""
+        r0, c0 = self.pixel_to_cell(np.asarray(x0, dtype=float), np.asarray(y0, dtype=float))
+        r1, c1 = self.pixel_to_cell(np.asarray(x1, dtype=float), np.asarray(y1, dtype=float))
+        result = self.visible(r0, c0, r1, c1)
+        return bool(result) if result.ndim == 0 else result
+
+    def visible(self, r0, c0, r1, c1):
+        """批量判定从格子 (r0, c0) 能否看到格子 (r1, c1)，先查缓存，未命中的再统一步进"""
+        r0, c0, r1, c1 = np.broadcast_arrays(*(np.asarray(a, dtype=np.int64) for a in (r0, c0, r1, c1)))
+        shape = r0.shape
+        r0, c0, r1, c1 = r0.ravel(), c0.ravel(), r1.ravel(), c1.ravel()
+        keys = self._cache_keys(r0 * self.cols + c0, r1 * self.cols + c1)
+
+        result = np.empty(len(keys), dtype=bool)
+        if len(self._keys):
+            pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            cached = self._keys[pos] == keys
+            result[cached] = self._values[pos[cached]]
+        else:
+            cached = np.zeros(len(keys), dtype=bool)
+
+        miss = np.flatnonzero(~cached)
+        if len(miss):
+            # 同一批次中重复的键只计算一次
+            miss_keys, first, inverse = np.unique(keys[miss], return_index=True, return_inverse=True)
+            idx = miss[first]
+            values = self.trace(r0[idx], c0[idx], r1[idx], c1[idx])
+            result[miss] = values[inverse]
+            self._store(miss_keys, values, r0[idx], c0[idx], r1[idx], c1[idx])
+        return result.reshape(shape)
+
+    def _cache_keys(self, start, end):
+        """(起点格子, 终点格子) 编号对应的缓存键，保持按起点、终点的字典序"""
+        if self.key_dtype != PAIR_KEY_DTYPE:
+            return start * (self.rows * self.cols) + end
+        keys = np.empty(len(start), dtype=PAIR_KEY_DTYPE)
+        keys["start"], keys["end"] = start, end
+        return keys
+
+    def trace(self, r0, c0, r1, c1):
+        """不使用缓存，直接对每一对格子做向量化的光线步进"""
+        result = np.ones(len(r0), dtype=bool)
+        steps = np.maximum(np.abs(r1 - r0), np.abs(c1 - c0))
+        # 按步数排序后分批处理，减少补齐带来的无效采样；每批的采样数为 批大小 x 批内最大步数
+        order = np.argsort(steps, kind="stable")
+        sorted_steps = np.maximum(steps[order], 1)
+        start = 0
+        while start < len(order):
+            samples = np.arange(1, len(order) - start + 1) * sorted_steps[start:]
+            end = start + max(int(np.searchsorted(samples, MAX_SAMPLES_PER_CHUNK, side="right")), 1)
+            chunk = order[start:end]
+            result[chunk] = self._trace_chunk(r0[chunk], c0[chunk], r1[chunk], c1[chunk], steps[chunk])
+            start = end
+        return result
+
+    def _trace_chunk(self, r0, c0, r1, c1, steps):
+        """对一批格子对做光线步进，途经格子（不含两端）被阻挡时视线不可见"""
+        longest = int(steps.max()) if len(steps) else 0
+        if longest < 2:
+            return np.ones(len(steps), dtype=bool)
+        k = np.arange(1, longest)[None, :]
+        n = np.maximum(steps, 1)[:, None]
+        inside = k < steps[:, None]
+        t = k / n
+        rows = np.rint(r0[:, None] + (r1 - r0)[:, None] * t).astype(np.int64)
+        cols = np.rint(c0[:, None] + (c1 - c0)[:, None] * t).astype(np.int64)
+        rows = np.where(inside, rows, r0[:, None])
+        cols = np.where(inside, cols, c0[:, None])
+
+        h0 = self.heights[r0, c0] + self.eye_height
+        h1 = self.heights[r1, c1] + self.eye_height
+        sight = h0[:, None] + (h1 - h0)[:, None] * t
+        blocked = self.blocking[rows, cols] | (self.heights[rows, cols] > sight)
+        return ~(blocked & inside).any(axis=1)
+
+    def _store(self, keys, values, r0, c0, r1, c1):
+        """把新结果（keys 已排序且不在缓存中）按位置插入有序缓存数组，不重新排序整个缓存"""
+        if len(self._keys) + len(keys) > self.cache_size:
+            self.clear_cache()
+        bbox = np.stack((np.minimum(r0, r1), np.maximum(r0, r1), np.minimum(c0, c1), np.maximum(c0, c1)), axis=1)
+        pos = np.searchsorted(self._keys, keys)
+        self._keys = np.insert(self._keys, pos, keys)
+        self._values = np.insert(self._values, pos, values)
+        self._bbox = np.insert(self._bbox, pos, bbox, axis=0)
@@ -1,9 +1,16 @@
 import arcade
 import numpy as np
-import csv
 import os
 
-# 地图文件路径
+if __name__ == "__main__":
+    # 在 map 目录下直接运行（python load_map.py）时按同目录模块导入，与 generate_map.py 一致
+    from map_file import MAP_FILE, load_map_file, convert_csv_to_map_file
+    from map_render import terrain_colors
+else:
+    from map.map_file import MAP_FILE, load_map_file, convert_csv_to_map_file
+    from map.map_render import terrain_colors
+
+# 旧的 CSV 地图文件，只有在二进制地图文件不存在时转换一次
 TERRAIN_FILE = "terrain_map.csv"
 HEIGHT_FILE = "height_map.csv"
 
@@ -13,53 +20,50 @@ OBSTACLE = 1  # 障碍物
 WATER = 2  # 水域
 MOUNTAIN = 3  # 山地
 
-# 颜色定义（用于渲染）
-COLOR_MAPPING = {
-    EMPTY: arcade.color.LIGHT_YELLOW,  # 空地：浅黄色
-    OBSTACLE: arcade.color.BLACK,  # 障碍物：黑色
-    WATER: arcade.color.BLUE,  # 水域：蓝色
-    MOUNTAIN: arcade.color.YELLOW  # 山地：黄色
-}
-
-def load_map_from_csv(terrain_filename, height_filename):
-    """从 CSV 文件中加载地形和高度地图"""
-    if os.path.exists(terrain_filename) and os.path.exists(height_filename):
-        with open(terrain_filename, 'r') as f:
-            terrain_map = np.array([list(map(int, row)) for row in csv.reader(f)])
-        
-        with open(height_filename, 'r') as f:
-            height_map = np.array([list(map(int, row)) for row in csv.reader(f)])
-        
-        return terrain_map, height_map
-    else:
-        raise FileNotFoundError(f"地图文件 {terrain_filename} 或 {height_filename} 不存在！")
+# 每个批量图形包含的地图行数，限制单个顶点缓冲的大小
+ROWS_PER_SHAPE = 64
 
+def load_game_map(filename=MAP_FILE, terrain_filename=TERRAIN_FILE, height_filename=HEIGHT_FILE):
+    """加载二进制地图文件（内存映射），不存在时先把 CSV 文件对转换为二进制地图文件"""
+    if not os.path.exists(filename):
+        convert_csv_to_map_file(terrain_filename, height_filename, filename)
+    terrain_map, height_map, _ = load_map_file(filename)
+    return terrain_map, height_map
 
-def render_map(terrain_map, height_map, tile_size=5):
-    """根据地图数据渲染地图"""
+
+def build_map_shapes(terrain_map, height_map, tile_size=5, rows_per_shape=ROWS_PER_SHAPE):
+    """把整张地图构建为缓存在显存中的批量图形，之后每帧只需一次 draw 调用"""
+    colors = terrain_colors(terrain_map, height_map)
     rows, cols = terrain_map.shape
-    for row in range(rows):
-        for col in range(cols):
-            # 获取地形和高度信息
-            terrain_type = terrain_map[row, col]
-            height_value = height_map[row, col]
-            
-            # 选择地形颜色
-            color = COLOR_MAPPING.get(terrain_type, arcade.color.WHITE)
-            
-            # 根据高度调整亮度
-            brightness_factor = 1 - (height_value / 100)  # 假设高度为0-100
-            color_with_brightness = arcade.color_from_hex_string(
-                arcade.color.hex_color_adjust_brightness(color, brightness_factor)
-            )
-
-            # 绘制地形方块
-            arcade.draw_rectangle_filled(
-                col * tile_size + tile_size / 2,
-                row * tile_size + tile_size / 2,
-                tile_size, tile_size,
-                color_with_brightness
-            )
+    shapes = arcade.ShapeElementList()
+
+    # 每个格子的四个角（左下、右下、右上、左上）
+    corners = np.array([(0, 0), (1, 0), (1, 1), (0, 1)])
+    col_idx = np.arange(cols)
+    for row0 in range(0, rows, rows_per_shape):
+        row1 = min(row0 + rows_per_shape, rows)
+        grid_x, grid_y = np.meshgrid(col_idx, np.arange(row0, row1))
+        points = (np.stack((grid_x, grid_y), axis=-1)[:, :, None, :] + corners) * tile_size
+        point_colors = np.repeat(colors[row0:row1, :, None, :], 4, axis=2)
+        shapes.append(arcade.create_rectangles_filled_with_colors(
+            points.reshape(-1, 2).tolist(), point_colors.reshape(-1, 3).tolist()
+        ))
+    return shapes
+
+
+# render_map 的图形缓存：同时保存数组引用，保证 id 不会被复用
+_shape_cache = {}
+
+
+def render_map(terrain_map, height_map, tile_size=5):
+    """根据地图数据渲染地图，图形只在地图变化时构建一次"""
+    key = (id(terrain_map), id(height_map), tile_size)
+    cached = _shape_cache.get(key)
+    if cached is None:
+        _shape_cache.clear()
+        cached = (terrain_map, height_map, build_map_shapes(terrain_map, height_map, tile_size))
+        _shape_cache[key] = cached
+    cached[2].draw()
 
 
 class MapView(arcade.View):
@@ -70,15 +74,24 @@ class MapView(arcade.View):
         self.terrain_map = None
         self.height_map = None
         self.tile_size = 5  # 每个单元格的大小（像素）
+        self.map_shapes = None  # 缓存的地图图形
     
     def setup(self):
         """加载地图并设置"""
-        self.terrain_map, self.height_map = load_map_from_csv(TERRAIN_FILE, HEIGHT_FILE)
+        self.set_map(*load_game_map())
+
+    def set_map(self, terrain_map, height_map):
+        """更换地图，缓存的图形会在下一帧重新构建"""
+        self.terrain_map = terrain_map
+        self.height_map = height_map
+        self.map_shapes = None
     
     def on_draw(self):
         """渲染地图"""
         arcade.start_render()
-        render_map(self.terrain_map, self.height_map, self.tile_size)
+        if self.map_shapes is None:
+            self.map_shapes = build_map_shapes(self.terrain_map, self.height_map, self.tile_size)
+        self.map_shapes.draw()
 
 
 def main():
@@ -0,0 +1,114 @@
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+# 二进制地图文件路径
+MAP_FILE = "game_map.bmap"
+
+# 文件格式：固定长度的文件头 + JSON 元数据 + 地形数组 + 高度数组
+# 数组按行优先存储，起始位置按 ALIGNMENT 对齐，可直接用 np.memmap 打开
+MAGIC = b"BTLUMAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIQQQ")  # 魔数、版本、宽、高、元数据长度、元数据偏移、地形偏移、高度偏移
+ALIGNMENT = 64
+
+TERRAIN_DTYPE = np.dtype(np.uint8)
+HEIGHT_DTYPE = np.dtype("<i2")
+
+
+def _align(offset):
+    """向上对齐到 ALIGNMENT 字节"""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _to_dtype(array, dtype, name):
+    """把数组转换为存储类型，数值超出范围时报错而不是静默截断"""
+    converted = np.ascontiguousarray(array, dtype=dtype)
+    if not np.array_equal(converted, array):
+        raise ValueError(f"{name} 中存在无法用 {dtype} 表示的数值")
+    return converted
+
+
+def save_map_file(filename, terrain_map, height_map, seed=None, **metadata):
+    """把地形和高度地图保存为单个二进制文件，先写临时文件再原子替换"""
+    if terrain_map.shape != height_map.shape:
+        raise ValueError("地形地图和高度地图的尺寸不一致")
+    height, width = terrain_map.shape
+    terrain = _to_dtype(terrain_map, TERRAIN_DTYPE, "地形地图")
+    heights = _to_dtype(height_map, HEIGHT_DTYPE, "高度地图")
+
+    metadata = dict(metadata, seed=seed, terrain_dtype=TERRAIN_DTYPE.str, height_dtype=HEIGHT_DTYPE.str)
+    meta_bytes = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+    meta_offset = HEADER.size
+    terrain_offset = _align(meta_offset + len(meta_bytes))
+    height_offset = _align(terrain_offset + terrain.nbytes)
+
+    tmp_filename = f"{filename}.tmp{os.getpid()}"
+    with open(tmp_filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, height, len(meta_bytes),
+                            meta_offset, terrain_offset, height_offset))
+        f.write(meta_bytes)
+        f.seek(terrain_offset)
+        f.write(terrain.tobytes())
+        f.seek(height_offset)
+        f.write(heights.tobytes())
+    os.replace(tmp_filename, filename)
+
+
+def read_map_header(filename):
+    """读取文件头和元数据，不读取地图数组"""
+    with open(filename, "rb") as f:
+        raw = f.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{filename} 不是有效的地图文件")
+        magic, version, width, height, meta_len, meta_offset, terrain_offset, height_offset = HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} 不是有效的地图文件")
+        if version > VERSION:
+            raise ValueError(f"不支持的地图文件版本 {version}")
+        f.seek(meta_offset)
+        metadata = json.loads(f.read(meta_len).decode("utf-8"))
+
+    metadata.update(version=version, width=width, height=height,
+                    terrain_offset=terrain_offset, height_offset=height_offset)
+    return metadata
+
+
+def load_map_file(filename, mmap=True):
+    """加载二进制地图，返回 (地形地图, 高度地图, 元数据)
+
+    mmap 为 True 时返回只读的 np.memmap，按需分页读取，多个进程打开同一文件时共享系统页缓存；
+    为 False 时一次性读入内存。
+    """
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"地图文件 {filename} 不存在！")
+    metadata = read_map_header(filename)
+    shape = (metadata["height"], metadata["width"])
+    arrays = []
+    for key, dtype in (("terrain_offset", metadata["terrain_dtype"]), ("height_offset", metadata["height_dtype"])):
+        if mmap:
+            array = np.memmap(filename, dtype=dtype, mode="r", offset=metadata[key], shape=shape)
+        else:
+            array = np.fromfile(filename, dtype=dtype, count=shape[0] * shape[1], offset=metadata[key])
+            array = array.reshape(shape)
+        arrays.append(array)
+    return arrays[0], arrays[1], metadata
+
+
+def convert_csv_to_map_file(terrain_filename, height_filename, filename=MAP_FILE, seed=None):
+    """把旧的地形/高度 CSV 文件对转换为二进制地图文件"""
+    if not (os.path.exists(terrain_filename) and os.path.exists(height_filename)):
+        raise FileNotFoundError(f"地图文件 {terrain_filename} 或 {height_filename} 不存在！")
+    terrain_map = np.loadtxt(terrain_filename, delimiter=",", dtype=np.int64, ndmin=2)
+    height_map = np.loadtxt(height_filename, delimiter=",", dtype=np.int64, ndmin=2)
+    save_map_file(filename, terrain_map, height_map, seed=seed, source=[terrain_filename, height_filename])
+
+
+if __name__ == "__main__":
+    # 用法：python map_file.py [terrain_map.csv height_map.csv [game_map.bmap]]
+    args = sys.argv[1:] or ["terrain_map.csv", "height_map.csv"]
+    convert_csv_to_map_file(*args)
+    print(f"地图已转换为 {args[2] if len(args) > 2 else MAP_FILE}")
@@ -0,0 +1,180 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# arcade 只在创建和绘制贴图时导入，颜色计算部分只依赖 NumPy
+
+# 地形类型（与 generate_map.py 一致）
+EMPTY = 0  # 空地
+OBSTACLE = 1  # 障碍物
+WATER = 2  # 水域
+MOUNTAIN = 3  # 山地
+
+# 颜色定义（RGB，与 arcade.color 中的同名颜色一致）
+LIGHT_YELLOW = (255, 255, 224)
+BLACK = (0, 0, 0)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+WHITE = (255, 255, 255)
+
+COLOR_MAPPING = {
+    EMPTY: LIGHT_YELLOW,  # 空地：浅黄色
+    OBSTACLE: BLACK,  # 障碍物：黑色
+    WATER: BLUE,  # 水域：蓝色
+    MOUNTAIN: YELLOW  # 山地：黄色
+}
+UNKNOWN_COLOR = WHITE  # 未知地形类型
+
+MAX_HEIGHT = 100  # 高度范围 0-100，用于计算亮度
+TILE_SIZE = 5  # 每个地块的大小（像素）
+CHUNK_SIZE = 256  # 每张地形贴图覆盖的格子数（边长）
+MAX_CHUNK_SPRITES = 64  # 最多保留的区块贴图数（256 x 256 的 RGBA 贴图约 256KB），超出时淘汰最久未绘制的
+PREFETCH_MARGIN = 64  # 镜头移动时在视口外额外预取的格子数（地图来自 ChunkedMap 时）
+
+
+def color_lookup_table(max_terrain=None):
+    """生成地形类型到 RGB 颜色的查找表"""
+    size = max(COLOR_MAPPING) + 1 if max_terrain is None else max(max(COLOR_MAPPING), max_terrain) + 1
+    lut = np.tile(np.array(UNKNOWN_COLOR, dtype=np.float32), (size, 1))
+    for terrain, color in COLOR_MAPPING.items():
+        lut[terrain] = color
+    return lut
+
+
+def terrain_colors(terrain_map, height_map, shade=True):
+    """把地形和高度数组一次性转换为 (行, 列, 3) 的 uint8 颜色数组
+
+    shade 为 True 时按高度降低亮度，亮度系数为 1 - 高度 / 100（与 render_map 一致）。
+    """
+    terrain_map = np.asarray(terrain_map)
+    lut = color_lookup_table(int(terrain_map.max()) if terrain_map.size else None)
+    colors = lut[np.clip(terrain_map, 0, len(lut) - 1)]
+    colors[terrain_map < 0] = UNKNOWN_COLOR
+    if shade:
+        brightness = np.clip(1 - np.asarray(height_map, dtype=np.float32) / MAX_HEIGHT, 0, 1)
+        colors *= brightness[..., None]
+    return colors.astype(np.uint8)
+
+
+class TerrainRenderer:
+    """把地形烘焙为若干张大贴图，每张贴图对应一个 CHUNK_SIZE x CHUNK_SIZE 的区块
+
+    绘制时只提交与视口相交的区块，每个区块只是一个四边形。
+    区块可以单独重新烘焙，用于地形发生局部变化的情况。
+    没有调用 build 时，区块在第一次进入视口时才烘焙，地图可以是 ChunkedMap 的图层（见 from_chunked_map）。
+    贴图按最近绘制的顺序保留至多 max_sprites 张，内存只取决于活动区域而不是走过的范围；
+    source 为 ChunkedMap 时，视口变化会提前载入附近的区块数据。
+    """
+
+    def __init__(self, terrain_map, height_map, tile_size=TILE_SIZE, chunk_size=CHUNK_SIZE,
+                 max_sprites=MAX_CHUNK_SPRITES, source=None, prefetch_margin=PREFETCH_MARGIN):
+        import arcade
+
+        self.terrain_map = terrain_map
+        self.height_map = height_map
+        self.tile_size = tile_size
+        self.chunk_size = chunk_size
+        self.rows, self.cols = terrain_map.shape
+        self.chunk_rows = -(-self.rows // chunk_size)
+        self.chunk_cols = -(-self.cols // chunk_size)
+        self.max_sprites = max_sprites
+        self.source = source
+        self.prefetch_margin = prefetch_margin
+        self.chunk_sprites = OrderedDict()  # (区块行, 区块列) -> Sprite，按最近使用排序
+        self.visible_sprites = arcade.SpriteList()
+        self._visible_keys = set()
+        self._viewport = None
+        self._texture_version = 0
+
+    @classmethod
+    def from_chunked_map(cls, chunked_map, chunk_size=CHUNK_SIZE, **kwargs):
+        """渲染 ChunkedMap：贴图按需烘焙，区块数据随镜头预取"""
+        return cls(chunked_map.terrain, chunked_map.heights, chunked_map.tile_size, chunk_size,
+                   source=chunked_map, **kwargs)
+
+    @property
+    def width(self):
+        """地图的像素宽度"""
+        return self.cols * self.tile_size
+
+    @property
+    def height(self):
+        """地图的像素高度"""
+        return self.rows * self.tile_size
+
+    def build(self):
+        """烘焙所有区块"""
+        for chunk_row in range(self.chunk_rows):
+            for chunk_col in range(self.chunk_cols):
+                self.rebuild_chunk(chunk_row, chunk_col)
+
+    def rebuild_chunk(self, chunk_row, chunk_col):
+        """重新烘焙一个区块的贴图"""
+        self._bake_chunk(chunk_row, chunk_col)
+        self._viewport = None  # 下一次绘制时重新计算可见区块
+
+    def _bake_chunk(self, chunk_row, chunk_col):
+        """把一个区块的颜色烘焙为贴图精灵"""
+        import arcade
+        from PIL import Image
+
+        r0, c0 = chunk_row * self.chunk_size, chunk_col * self.chunk_size
+        r1, c1 = min(r0 + self.chunk_size, self.rows), min(c0 + self.chunk_size, self.cols)
+        colors = terrain_colors(self.terrain_map[r0:r1, c0:c1], self.height_map[r0:r1, c0:c1])
+        # 第 0 行位于屏幕底部，而图片的第 0 行在顶部，需要上下翻转
+        image = Image.fromarray(np.ascontiguousarray(colors[::-1]), "RGB").convert("RGBA")
+
+        self._texture_version += 1
+        texture = arcade.Texture(f"terrain_{chunk_row}_{chunk_col}_{self._texture_version}", image=image,
+                                 hit_box_algorithm="None")
+        sprite = arcade.Sprite(texture=texture, scale=self.tile_size)
+        sprite.center_x = (c0 + (c1 - c0) / 2) * self.tile_size
+        sprite.center_y = (r0 + (r1 - r0) / 2) * self.tile_size
+
+        key = (chunk_row, chunk_col)
+        self.chunk_sprites[key] = sprite
+        self.chunk_sprites.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        """贴图超过 max_sprites 时淘汰最久未绘制的区块（正在显示的区块不淘汰）"""
+        excess = len(self.chunk_sprites) - self.max_sprites
+        if excess <= 0:
+            return
+        for key in [key for key in self.chunk_sprites if key not in self._visible_keys][:excess]:
+            del self.chunk_sprites[key]
+
+    def rebuild_cells(self, row0, col0, row1, col1):
+        """重新烘焙与格子矩形 [row0, row1) x [col0, col1) 相交且已经烘焙过的区块"""
+        for chunk_row in range(row0 // self.chunk_size, (max(row1, row0 + 1) - 1) // self.chunk_size + 1):
+            for chunk_col in range(col0 // self.chunk_size, (max(col1, col0 + 1) - 1) // self.chunk_size + 1):
+                if (chunk_row, chunk_col) in self.chunk_sprites:
+                    self.rebuild_chunk(chunk_row, chunk_col)
+
+    def update_viewport(self, left, right, bottom, top):
+        """根据视口范围（像素）筛选需要绘制的区块"""
+        viewport = (left, right, bottom, top)
+        if viewport == self._viewport:
+            return
+        self._viewport = viewport
+        span = self.chunk_size * self.tile_size
+        c0, c1 = max(int(left // span), 0), min(int(right // span), self.chunk_cols - 1)
+        r0, r1 = max(int(bottom // span), 0), min(int(top // span), self.chunk_rows - 1)
+        if self.source is not None:
+            self.source.prefetch_viewport(left, right, bottom, top, self.prefetch_margin)
+        while len(self.visible_sprites):
+            self.visible_sprites.pop()
+        self._visible_keys = {(chunk_row, chunk_col) for chunk_row in range(r0, r1 + 1)
+                              for chunk_col in range(c0, c1 + 1)}
+        for key in sorted(self._visible_keys):
+            if key in self.chunk_sprites:
+                self.chunk_sprites.move_to_end(key)
+            else:
+                self._bake_chunk(*key)
+            self.visible_sprites.append(self.chunk_sprites[key])
+
+    def draw(self):
+        """绘制可见区块，使用最近邻采样保持格子边缘清晰"""
+        import arcade
+
+        self.visible_sprites.draw(filter=arcade.gl.NEAREST)
@@ -0,0 +1,315 @@
+import heapq
+import math
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+# 地形类型（与 generate_map.py 一致）
+EMPTY = 0  # 空地
+OBSTACLE = 1  # 障碍物
+WATER = 2  # 水域
+MOUNTAIN = 3  # 山地
+
+# 进入各类地形的移动代价，inf 表示不可通行
+TERRAIN_COSTS = {
+    EMPTY: 1.0,
+    OBSTACLE: math.inf,
+    WATER: math.inf,
+    MOUNTAIN: 3.0,
+}
+
+TILE_SIZE = 5  # 每个地块的大小（像素），与 initialize_map_sprites 一致
+FIELD_CELL_BUDGET = 8_000_000  # 所有代价场合计最多覆盖的格子数（每格约 13 字节），决定同时保留几个终点
+MAX_EXPANSIONS = 200000  # 单次请求最多展开的节点数，超出时本回合原地等待，下次请求从中断处继续
+# 终点移动（例如追击移动中的敌人）后，离终点较远的单位沿用附近终点的代价场：允许的偏差为
+# 到终点距离的 1 / GOAL_REUSE_RATIO（至少 GOAL_REUSE_RADIUS 格）；离终点不超过 GOAL_REUSE_DISTANCE
+# 格时改用精确终点的代价场，保证最后一段路径准确
+GOAL_REUSE_RADIUS = 4
+GOAL_REUSE_RATIO = 4
+GOAL_REUSE_DISTANCE = 16
+
+SQRT2 = math.sqrt(2)
+# 8 邻域：(行偏移, 列偏移, 距离系数)
+NEIGHBORS = (
+    (-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+    (-1, -1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (1, 1, SQRT2),
+)
+
+# 代价场中格子的状态
+UNSEEN, OPEN, CLOSED = 0, 1, 2
+
+
+class FlowField:
+    """通往一个终点格子的共享代价场：从终点出发的反向 A*，可以暂停，换一个起点后继续
+
+    dist[i] 为格子 i 到终点的代价，parent[i] 为从格子 i 出发的下一步；
+    state[i] 为 CLOSED 时两者都已确定为最优，任何站在已关闭格子上的单位都能 O(1) 取得下一步。
+    所有数据保存在按格子编号索引的扁平数组中，内循环不使用字典或集合。
+    """
+
+    def __init__(self, goal, num_cells, cols):
+        self.goal = goal  # 终点的格子编号
+        self.dist = array("d", [math.inf]) * num_cells
+        self.parent = array("i", [-1]) * num_cells
+        self.state = bytearray(num_cells)
+        self.dist[goal] = 0.0
+        self.parent[goal] = goal
+        self.state[goal] = OPEN
+        self.heap = [(0.0, 0.0, goal)]  # (g + 到当前起点的启发值, g, 格子编号)
+        self.target = -1  # 开放列表的排序所针对的起点
+        row, col = divmod(goal, cols)
+        self.bounds = [row, row, col, col]  # 已关闭格子的包围盒 (行最小, 行最大, 列最小, 列最大)
+
+
+class PathFinder:
+    """基于地形代价的寻路服务：每个终点一个共享的代价场（反向 A*，按需扩展）
+
+    路径以格子 (行, 列) 表示。前往同一终点的所有单位共用一个代价场：后来的单位只需从
+    上一次中断的地方继续搜索，已经探索过的区域内任何格子都能 O(1) 取得下一步，
+    单位偏离原路径一两格也不需要重新搜索。终点只移动了几格（追击移动中的敌人）时，
+    离终点较远的单位沿用附近终点的代价场，靠近后再换成精确终点。
+    地形局部变化时调用 update_cells，只丢弃探索范围与变化区域相交的代价场。
+    """
+
+    def __init__(self, terrain_map, tile_size=TILE_SIZE, terrain_costs=TERRAIN_COSTS,
+                 field_cell_budget=FIELD_CELL_BUDGET):
+        self.tile_size = tile_size
+        self.terrain_costs = dict(terrain_costs)
+        self.field_cell_budget = field_cell_budget
+        self.version = 0  # 地图版本，地形改变时递增，使旧缓存失效
+        self.set_terrain(terrain_map)
+
+    def set_terrain(self, terrain_map):
+        """设置（或替换）地形地图，并清空所有缓存"""
+        lut = np.full(max(max(self.terrain_costs), int(terrain_map.max())) + 1, math.inf)
+        for terrain, cost in self.terrain_costs.items():
+            lut[terrain] = cost
+        self.terrain_map = terrain_map
+        self._lut = lut
+        self.cost_map = lut[np.asarray(terrain_map)]
+        self.rows, self.cols = self.cost_map.shape
+        # A* 内循环使用 Python 列表访问比逐个读取 NumPy 元素快得多
+        self._costs = self.cost_map.ravel().tolist()
+        passable = self.cost_map[np.isfinite(self.cost_map)]
+        self._min_cost = float(passable.min()) if passable.size else 1.0
+        self.max_fields = max(self.field_cell_budget // (self.rows * self.cols), 1)
+        self.invalidate()
+
+    def invalidate(self):
+        """使所有代价场失效"""
+        self.version += 1
+        self._fields = OrderedDict()  # 终点格子编号 -> FlowField（LRU）
+
+    def update_cells(self, row0, col0, row1, col1):
+        """地形在矩形 [row0, row1) x [col0, col1) 内发生变化：刷新代价并使受影响的代价场失效
+
+        只有代价变高（例如新建障碍）时，探索范围不与该区域相交的代价场仍然是最优的，只丢弃相交的；
+        有格子代价变低时更短的路径可能出现在任何地方，此时清空全部代价场（代价地图不重建）。
+        """
+        terrain = np.asarray(self.terrain_map[row0:row1, col0:col1])
+        if terrain.size and int(terrain.max()) >= len(self._lut):
+            self.set_terrain(self.terrain_map)
+            return
+        old = self.cost_map[row0:row1, col0:col1]
+        new = self._lut[terrain]
+        if np.array_equal(old, new):
+            return
+        cheaper = (new < old).any()
+        self.cost_map[row0:row1, col0:col1] = new
+        for row in range(row0, min(row1, self.rows)):
+            start = row * self.cols
+            self._costs[start + col0:start + min(col1, self.cols)] = self.cost_map[row, col0:col1].tolist()
+        if cheaper:
+            passable = new[np.isfinite(new)]
+            if passable.size:
+                self._min_cost = min(self._min_cost, float(passable.min()))
+            self.invalidate()
+            return
+
+        # 开放列表中的格子在已关闭格子外一圈，斜向移动不能穿过不可通行格子的拐角，范围向外扩两格
+        r0, c0, r1, c1 = row0 - 2, col0 - 2, row1 + 2, col1 + 2
+        for goal in [goal for goal, field in self._fields.items()
+                     if field.bounds[0] < r1 and field.bounds[1] >= r0
+                     and field.bounds[2] < c1 and field.bounds[3] >= c0]:
+            del self._fields[goal]
+
+    def passable(self, row, col):
+        """判断格子是否可通行"""
+        return 0 <= row < self.rows and 0 <= col < self.cols and math.isfinite(self._costs[row * self.cols + col])
+
+    def pixel_to_cell(self, x, y):
+        """把像素坐标转换为格子 (行, 列)"""
+        row = min(max(int(y // self.tile_size), 0), self.rows - 1)
+        col = min(max(int(x // self.tile_size), 0), self.cols - 1)
+        return row, col
+
+    def cell_center(self, cell):
+        """格子中心的像素坐标"""
+        row, col = cell
+        return (col + 0.5) * self.tile_size, (row + 0.5) * self.tile_size
+
+    def nearest_passable(self, cell, max_radius=16):
+        """在格子附近找到最近的可通行格子，找不到时返回 None"""
+        row, col = cell
+        if self.passable(row, col):
+            return cell
+        r0, r1 = max(row - max_radius, 0), min(row + max_radius + 1, self.rows)
+        c0, c1 = max(col - max_radius, 0), min(col + max_radius + 1, self.cols)
+        window = np.isfinite(self.cost_map[r0:r1, c0:c1])
+        if not window.any():
+            return None
+        rr, cc = np.nonzero(window)
+        d2 = (rr + r0 - row) ** 2 + (cc + c0 - col) ** 2
+        best = np.argmin(d2)
+        return int(rr[best] + r0), int(cc[best] + c0)
+
+    def find_path(self, start, goal):
+        """返回从 start 到 goal 的格子路径（包含两端），不可达时返回 None
+
+        起点不可通行（例如站在刚修好的障碍上）时先走到最近的可通行格子。
+        """
+        if not self.passable(*goal):
+            return None
+        if start == goal:
+            return [start]
+        path = []
+        if not self.passable(*start):
+            path.append(start)
+            start = self.nearest_passable(start)
+            if start is None:
+                return None
+        field = self._field(goal[0] * self.cols + goal[1])
+        start_idx = start[0] * self.cols + start[1]
+        if not self._reach(field, start_idx):
+            return None
+        cell = start_idx
+        path.append(start)
+        parent = field.parent
+        while cell != field.goal:
+            cell = parent[cell]
+            path.append(divmod(cell, self.cols))
+        return path
+
+    def next_waypoint(self, x, y, target_x, target_y):
+        """单位从 (x, y) 前往 (target_x, target_y) 时下一步应当朝向的像素坐标，不可达时返回 None"""
+        start = self.pixel_to_cell(x, y)
+        goal = self.nearest_passable(self.pixel_to_cell(target_x, target_y))
+        if goal is None:
+            return None
+        if start == goal:
+            return target_x, target_y
+        if not self.passable(*start):
+            nearest = self.nearest_passable(start)
+            return None if nearest is None else self.cell_center(nearest)
+
+        start_idx = start[0] * self.cols + start[1]
+        field = self._nearby_field(start, goal)
+        if field is None:
+            field = self._field(goal[0] * self.cols + goal[1])
+        if not self._reach(field, start_idx):
+            return None
+        return self.cell_center(divmod(field.parent[start_idx], self.cols))
+
+    def _field(self, goal):
+        """取得（必要时创建）终点格子编号 goal 的代价场，并淘汰最久未使用的代价场"""
+        field = self._fields.get(goal)
+        if field is not None:
+            self._fields.move_to_end(goal)
+            return field
+        field = self._fields[goal] = FlowField(goal, self.rows * self.cols, self.cols)
+        while len(self._fields) > self.max_fields:
+            self._fields.popitem(last=False)
+        return field
+
+    def _nearby_field(self, start, goal):
+        """起点离终点较远时，返回终点附近允许偏差内已有的代价场（按最近使用的顺序查找，没有时为 None）"""
+        row, col = goal
+        distance = max(abs(start[0] - row), abs(start[1] - col))
+        if distance <= GOAL_REUSE_DISTANCE:
+            return None
+        tolerance = max(GOAL_REUSE_RADIUS, distance // GOAL_REUSE_RATIO)
+        cols = self.cols
+        for other in reversed(self._fields):
+            other_row, other_col = divmod(other, cols)
+            if abs(other_row - row) <= tolerance and abs(other_col - col) <= tolerance:
+                self._fields.move_to_end(other)
+                return self._fields[other]
+        return None
+
+    def _reach(self, field, start):
+        """继续代价场的反向 A*，直到格子 start 关闭（返回 True）、开放列表耗尽或达到本次展开上限
+
+        启发函数为到 start 的八方向距离；换了起点时按新的启发值重排开放列表。已关闭格子的代价与
+        启发函数无关，始终是最优的，所以不同起点的请求可以共用同一次搜索的结果。
+        """
+        state = field.state
+        if state[start] == CLOSED:
+            return True
+        cols = self.cols
+        rows = self.rows
+        costs = self._costs
+        min_cost = self._min_cost
+        dist, parent = field.dist, field.parent
+        start_row, start_col = divmod(start, cols)
+        diagonal = SQRT2 - 1
+
+        def heuristic(idx):
+            dr, dc = divmod(idx, cols)
+            dr = abs(dr - start_row)
+            dc = abs(dc - start_col)
+            return min_cost * (dr + diagonal * dc if dr > dc else dc + diagonal * dr)
+
+        heap = field.heap
+        if field.target != start:
+            heap = field.heap = [(g + heuristic(idx), g, idx) for _, g, idx in heap
+                                 if state[idx] == OPEN and g == dist[idx]]
+            heapq.heapify(heap)
+            field.target = start
+        bounds = field.bounds
+        pop, push = heapq.heappop, heapq.heappush
+        expansions = 0
+
+        while heap:
+            item = pop(heap)
+            _, g, current = item
+            if state[current] == CLOSED or g > dist[current]:
+                continue
+            if expansions >= MAX_EXPANSIONS:
+                push(heap, item)
+                return False
+            state[current] = CLOSED
+            expansions += 1
+            row, col = divmod(current, cols)
+            if row < bounds[0]:
+                bounds[0] = row
+            elif row > bounds[1]:
+                bounds[1] = row
+            if col < bounds[2]:
+                bounds[2] = col
+            elif col > bounds[3]:
+                bounds[3] = col
+
+            # 反向搜索：从邻格走进 current 的代价为 current 的地形代价
+            enter = costs[current]
+            for dr, dc, step in NEIGHBORS:
+                nr, nc = row + dr, col + dc
+                if not (0 <= nr < rows and 0 <= nc < cols):
+                    continue
+                neighbor = nr * cols + nc
+                if state[neighbor] == CLOSED or costs[neighbor] == math.inf:
+                    continue
+                if dr and dc and (costs[row * cols + nc] == math.inf or costs[nr * cols + col] == math.inf):
+                    continue
+                tentative = g + enter * step
+                if tentative < dist[neighbor]:
+                    dist[neighbor] = tentative
+                    parent[neighbor] = current
+                    state[neighbor] = OPEN
+                    ar, ac = abs(nr - start_row), abs(nc - start_col)
+                    push(heap, (tentative + min_cost * (ar + diagonal * ac if ar > ac else ac + diagonal * ar),
+                                tentative, neighbor))
+            # 关闭的格子必须先松弛完邻格再返回，之后换起点继续搜索时开放列表才是完整的边界
+            if current == start:
+                return True
+        return False
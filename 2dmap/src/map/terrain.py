@@ -0,0 +1,112 @@
+import numpy as np
+
+from map.generate_map import OBSTACLE
+
+TILE_SIZE = 5  # 每个地块的大小（像素），与 initialize_map_sprites 一致
+
+
+class MutableTerrain:
+    """运行时可修改的地形：修改直接写入共享的地形和高度数组，并记录脏矩形
+
+    寻路、视线、战争迷雾和地形贴图等派生数据都引用同一对数组，通过 add_listener 注册
+    回调 callback(row0, col0, row1, col1)（Battle 注册 PathFinder、LineOfSight 和 FogOfWar 的 update_cells，
+    窗口注册 TerrainRenderer.rebuild_cells；在可修改的地图上编码观测时也可以注册
+    ObservationEncoder.update_cells）。VecBattleEnv 的地形是各局共用的只读数组，不使用本类。
+    flush 时把本批修改合并为尽量少的矩形逐个通知，各个监听者只刷新矩形覆盖的部分，不会重建整张地图。
+    """
+
+    def __init__(self, terrain_map, height_map, tile_size=TILE_SIZE):
+        self.terrain_map = terrain_map
+        self.height_map = height_map
+        self.tile_size = tile_size
+        self.rows, self.cols = terrain_map.shape
+        self.listeners = []
+        self.dirty = []  # 尚未通知的脏矩形 (row0, col0, row1, col1)
+        self.version = 0  # 每次 flush 出修改时递增
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self.listeners.remove(callback)
+
+    def pixel_to_cell(self, x, y):
+        """把像素坐标转换为格子 (行, 列)"""
+        row = min(max(int(y // self.tile_size), 0), self.rows - 1)
+        col = min(max(int(x // self.tile_size), 0), self.cols - 1)
+        return row, col
+
+    def fill(self, row0, col0, row1, col1, terrain=None, height=None):
+        """把矩形 [row0, row1) x [col0, col1) 设为给定地形和/或高度，只有内容真的改变时才记为脏矩形
+
+        返回是否有格子发生变化。
+        """
+        row0, col0 = max(row0, 0), max(col0, 0)
+        row1, col1 = min(row1, self.rows), min(col1, self.cols)
+        if row0 >= row1 or col0 >= col1:
+            return False
+        changed = False
+        for array, value in ((self.terrain_map, terrain), (self.height_map, height)):
+            if value is None:
+                continue
+            region = array[row0:row1, col0:col1]
+            if (region != value).any():
+                region[...] = value
+                changed = True
+        if changed:
+            self.dirty.append((row0, col0, row1, col1))
+        return changed
+
+    def set_cell(self, row, col, terrain=None, height=None):
+        """修改单个格子"""
+        return self.fill(row, col, row + 1, col + 1, terrain, height)
+
+    def obstacle_near(self, x, y, radius=1):
+        """像素坐标所在的格子及周围 radius 格内是否有障碍物"""
+        row, col = self.pixel_to_cell(x, y)
+        window = self.terrain_map[max(row - radius, 0):row + radius + 1, max(col - radius, 0):col + radius + 1]
+        return bool((window == OBSTACLE).any())
+
+    def place_obstacle(self, x, y):
+        """在像素坐标所在的格子放置障碍物，返回 (行, 列)"""
+        row, col = self.pixel_to_cell(x, y)
+        self.set_cell(row, col, OBSTACLE)
+        return row, col
+
+    def dirty_rects(self):
+        """合并重叠或相邻的脏矩形，返回合并后的列表"""
+        rects = list(self.dirty)
+        merged = True
+        while merged and len(rects) > 1:
+            merged = False
+            result = []
+            for rect in rects:
+                for i, other in enumerate(result):
+                    if (rect[0] <= other[2] and other[0] <= rect[2]
+                            and rect[1] <= other[3] and other[1] <= rect[3]):
+                        result[i] = (min(rect[0], other[0]), min(rect[1], other[1]),
+                                     max(rect[2], other[2]), max(rect[3], other[3]))
+                        merged = True
+                        break
+                else:
+                    result.append(rect)
+            rects = result
+        return rects
+
+    def flush(self):
+        """把积累的修改通知所有监听者，返回通知的矩形列表"""
+        if not self.dirty:
+            return []
+        rects = self.dirty_rects()
+        self.dirty = []
+        self.version += 1
+        for rect in rects:
+            for callback in self.listeners:
+                callback(*rect)
+        return rects
+
+
+def writable(layer):
+    """MutableTerrain 需要可以原地修改的数组；内存映射只读打开的地图文件需要先复制"""
+    array = np.asarray(layer)
+    return array if array.flags.writeable else np.array(array)
@@ -0,0 +1,236 @@
+import numpy as np
+
+from map.line_of_sight import BLOCKING_TERRAIN, EYE_HEIGHT, TILE_SIZE
+
+MAX_SAMPLES_PER_CHUNK = 1 << 22  # 每批光线采样的最大点数（单位数 x 模板采样数），限制临时数组的内存
+VIEW_CACHE_SIZE = 512  # 每个阵营缓存的视野数（按 中心格子, 半径），单位在几个格子间来回移动时不必重算
+_TEMPLATES = {}  # 视野半径（格子） -> 光线模板
+
+
+def terrain_layers(terrain_map, height_map, blocking_terrain=BLOCKING_TERRAIN, heights=None):
+    """由地形和高度地图得到视野计算用的 (遮挡高度, 地面高度)，多个 TeamVisibility 可以共用
+
+    遮挡高度在阻挡地形处为无穷大，其余为地面高度，这样“阻挡地形或高于视线”只需要一次比较。
+    heights 为已经算好的 float32 高度（例如 sight_layers 的结果）时直接使用，不再复制。
+    """
+    if heights is None:
+        heights = np.asarray(height_map, dtype=np.float32).copy()
+    occluders = np.where(np.isin(terrain_map, blocking_terrain), np.float32(np.inf), heights)
+    return occluders, heights
+
+
+def ray_template(radius):
+    """视野半径内所有格子相对观察者的偏移，以及到达每个格子的光线途经的格子
+
+    返回 (偏移行, 偏移列, 采样行, 采样列, 采样所属偏移, 采样参数 t, 每条光线第一个采样的位置, 这些光线的偏移)。
+    途经格子数大于 0 的光线，其采样在模板中是连续的一段，可以用 reduceat 按光线合并。
+    判定规则与 LineOfSight 相同：按 DDA 逐格步进，途经格子（不含两端）为阻挡地形或高于视线时不可见；
+    途经格子按相对偏移四舍五入，所以模板只依赖半径、所有单位共用（刚好在 .5 处取整的光线可能与
+    LineOfSight 相差一格）。
+    """
+    template = _TEMPLATES.get(radius)
+    if template is not None:
+        return template
+    dr, dc = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    inside = dr * dr + dc * dc <= radius * radius
+    dr, dc = dr[inside].astype(np.int64), dc[inside].astype(np.int64)
+    steps = np.maximum(np.abs(dr), np.abs(dc))
+    counts = np.maximum(steps - 1, 0)  # 每条光线途经的格子数
+    owner = np.repeat(np.arange(len(dr)), counts)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts) + 1  # 第几步，从 1 开始
+    t = k / steps[owner]
+    sample_dr = np.floor(dr[owner] * t + 0.5).astype(np.int64)
+    sample_dc = np.floor(dc[owner] * t + 0.5).astype(np.int64)
+    starts = np.flatnonzero(np.diff(owner, prepend=-1))
+    template = (dr, dc, sample_dr, sample_dc, owner, t.astype(np.float32), starts, owner[starts])
+    _TEMPLATES[radius] = template
+    return template
+
+
+class TeamVisibility:
+    """一个阵营的视野网格：每个格子被多少个己方单位看到（counts > 0 即可见）
+
+    每个单位的视野用光线模板向量化计算（阻挡地形或高于视线的格子遮挡其后方），
+    结果按单位保存；update 只重新计算换了格子、视野半径或存活状态改变的单位，
+    以及附近地形发生过变化的单位：先从 counts 减去旧视野，再加上新视野。
+    最近算过的视野按 (中心格子, 半径) 缓存，地形变化时丢弃与变化区域相交的缓存。
+    """
+
+    def __init__(self, occluders, heights, num_slots, tile_size=TILE_SIZE, eye_height=EYE_HEIGHT):
+        self.occluders = occluders
+        self.heights = heights
+        self.tile_size = tile_size
+        self.eye_height = eye_height
+        self.rows, self.cols = heights.shape
+        self.counts = np.zeros((self.rows, self.cols), dtype=np.int32)
+        self.num_slots = num_slots
+        self._cells = np.full(num_slots, -1, dtype=np.int64)  # 每个单位当前视野的中心格子，-1 表示没有视野
+        self._radius = np.zeros(num_slots, dtype=np.int64)
+        self._views = [None] * num_slots  # 每个单位看到的格子（展平下标）
+        self._dirty = np.zeros(num_slots, dtype=bool)
+        self._cache = {}  # (中心格子, 半径) -> 展平下标数组，按插入顺序淘汰
+
+    @property
+    def visible(self):
+        """可见格子的布尔网格"""
+        return self.counts > 0
+
+    def pixel_to_cell(self, x, y):
+        """把像素坐标数组转换为格子 (行, 列) 数组"""
+        rows = np.clip(np.floor_divide(y, self.tile_size).astype(np.int64), 0, self.rows - 1)
+        cols = np.clip(np.floor_divide(x, self.tile_size).astype(np.int64), 0, self.cols - 1)
+        return rows, cols
+
+    def visible_at(self, xs, ys):
+        """像素坐标处的格子是否可见"""
+        rows, cols = self.pixel_to_cell(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float))
+        return self.counts[rows, cols] > 0
+
+    def update(self, xs, ys, sight_ranges, alive):
+        """根据单位的像素坐标、视野距离（像素）和存活状态更新视野，返回重新计算的单位数"""
+        rows, cols = self.pixel_to_cell(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float))
+        cells = np.where(alive, rows * self.cols + cols, -1)
+        radius = np.ceil(np.asarray(sight_ranges, dtype=float) / self.tile_size).astype(np.int64)
+        changed = np.flatnonzero((cells != self._cells) | (radius != self._radius) | self._dirty)
+        if len(changed) == 0:
+            return 0
+
+        flat = self.counts.reshape(-1)
+        old = [self._views[i] for i in changed if self._views[i] is not None]
+        if old:
+            flat -= np.bincount(np.concatenate(old), minlength=flat.size).astype(np.int32)
+
+        new = []
+        missing = []
+        for slot in changed[cells[changed] >= 0].tolist():
+            view = self._cache.get((int(cells[slot]), int(radius[slot])))
+            if view is None:
+                missing.append(slot)
+            else:
+                self._views[slot] = view
+                new.append(view)
+        missing = np.array(missing, dtype=np.int64)
+        for r in np.unique(radius[missing]).tolist():
+            group = missing[radius[missing] == r]
+            views = self.compute_views(rows[group], cols[group], r)
+            for slot, view in zip(group.tolist(), views):
+                self._views[slot] = view
+                self._remember(int(cells[slot]), r, view)
+            new.extend(views)
+        for slot in changed[cells[changed] < 0].tolist():
+            self._views[slot] = None
+        if new:
+            flat += np.bincount(np.concatenate(new), minlength=flat.size).astype(np.int32)
+
+        self._cells[changed] = cells[changed]
+        self._radius[changed] = radius[changed]
+        self._dirty[changed] = False
+        return len(changed)
+
+    def _remember(self, cell, radius, view):
+        """把算好的视野放进缓存，超出 VIEW_CACHE_SIZE 时丢弃最早放入的"""
+        if len(self._cache) >= VIEW_CACHE_SIZE:
+            del self._cache[next(iter(self._cache))]
+        self._cache[(cell, radius)] = view
+
+    def compute_views(self, rows, cols, radius):
+        """计算一组观察者（相同视野半径）看到的格子，返回每个观察者的展平下标数组"""
+        dr, dc, sample_dr, sample_dc, owner, t, starts, rays = ray_template(radius)
+        inner = (rows >= radius) & (rows < self.rows - radius) & (cols >= radius) & (cols < self.cols - radius)
+        views = [None] * len(rows)
+        chunk = max(MAX_SAMPLES_PER_CHUNK // max(len(owner), 1), 1)
+        for edge in (False, True):
+            index = np.flatnonzero(inner != edge)
+            for start in range(0, len(index), chunk):
+                group = index[start:start + chunk]
+                r, c = rows[group][:, None], cols[group][:, None]
+                if edge:
+                    # 靠近地图边缘的观察者：越界的目标和采样先截断，再由 valid 排除
+                    target_rows, target_cols = r + dr, c + dc
+                    valid = ((target_rows >= 0) & (target_rows < self.rows)
+                             & (target_cols >= 0) & (target_cols < self.cols))
+                    targets = (np.clip(target_rows, 0, self.rows - 1) * self.cols
+                               + np.clip(target_cols, 0, self.cols - 1))
+                    samples = (np.clip(r + sample_dr, 0, self.rows - 1) * self.cols
+                               + np.clip(c + sample_dc, 0, self.cols - 1))
+                else:
+                    # 视野完全在地图内的观察者直接用展平下标取样，不需要越界处理
+                    base = r * self.cols + c
+                    targets = base + (dr * self.cols + dc)
+                    samples = base + (sample_dr * self.cols + sample_dc)
+                    valid = None
+                visible = self._trace(r * self.cols + c, targets, samples, owner, t, starts, rays)
+                if valid is not None:
+                    visible &= valid
+                for i, slot in enumerate(group.tolist()):
+                    views[slot] = targets[i][visible[i]]
+        return views
+
+    def _trace(self, base, targets, samples, owner, t, starts, rays):
+        """沿光线模板判定遮挡，返回与 targets 同形状的可见布尔数组"""
+        occluders, heights = self.occluders.reshape(-1), self.heights.reshape(-1)
+        h0 = heights[base] + self.eye_height
+        sight = h0 + (heights[targets][:, owner] + self.eye_height - h0) * t
+        blocked = occluders[samples] > sight
+        visible = np.ones(targets.shape, dtype=bool)
+        if len(starts):
+            visible[:, rays] = ~np.logical_or.reduceat(blocked, starts, axis=1)
+        return visible
+
+    def update_cells(self, row0, col0, row1, col1):
+        """地形在矩形 [row0, row1) x [col0, col1) 内变化后，标记视野范围与之相交的单位，下次 update 时重算
+
+        遮挡和高度数组由调用方（例如 FogOfWar）刷新，多个 TeamVisibility 共用同一份。
+        """
+        active = self._cells >= 0
+        r, c = np.divmod(self._cells, self.cols)
+        reach = self._radius
+        hit = active & (r - reach < row1) & (r + reach >= row0) & (c - reach < col1) & (c + reach >= col0)
+        self._dirty |= hit
+        for key in [key for key in self._cache if self._intersects(key, row0, col0, row1, col1)]:
+            del self._cache[key]
+
+    def _intersects(self, key, row0, col0, row1, col1):
+        """缓存的视野（中心格子, 半径）的外接方框是否与矩形相交"""
+        r, c = divmod(key[0], self.cols)
+        reach = key[1]
+        return r - reach < row1 and r + reach >= row0 and c - reach < col1 and c + reach >= col0
+
+
+class FogOfWar:
+    """对局中每个阵营（按 Soldier.team 区分）的视野，供 Battle 屏蔽看不见的敌人"""
+
+    def __init__(self, terrain_map, height_map, tile_size=TILE_SIZE, eye_height=EYE_HEIGHT,
+                 blocking_terrain=BLOCKING_TERRAIN):
+        self.terrain_map = terrain_map
+        self.height_map = height_map
+        self.tile_size = tile_size
+        self.eye_height = eye_height
+        self.blocking_terrain = tuple(blocking_terrain)
+        self.occluders, self.heights = terrain_layers(terrain_map, height_map, self.blocking_terrain)
+        self.teams = {}  # 阵营名 -> TeamVisibility
+
+    def update(self, team, units):
+        """根据该阵营单位的当前位置更新视野，返回重新计算的单位数"""
+        visibility = self.teams.get(team)
+        if visibility is None or visibility.num_slots != len(units):
+            visibility = self.teams[team] = TeamVisibility(self.occluders, self.heights, len(units),
+                                                           self.tile_size, self.eye_height)
+        return visibility.update([u.x for u in units], [u.y for u in units],
+                                 [u.sight_range for u in units], [u.is_alive() for u in units])
+
+    def visible_mask(self, team, units):
+        """units（通常是敌方单位）中哪些处在该阵营的视野内；尚未更新过视野的阵营什么也看不到"""
+        visibility = self.teams.get(team)
+        if visibility is None or not units:
+            return np.zeros(len(units), dtype=bool)
+        return visibility.visible_at([u.x for u in units], [u.y for u in units])
+
+    def update_cells(self, row0, col0, row1, col1):
+        """地形变化的监听回调：刷新共用的遮挡和高度数组，并标记受影响的单位"""
+        occluders, heights = terrain_layers(self.terrain_map[row0:row1, col0:col1],
+                                            self.height_map[row0:row1, col0:col1], self.blocking_terrain)
+        self.occluders[row0:row1, col0:col1] = occluders
+        self.heights[row0:row1, col0:col1] = heights
+        for visibility in self.teams.values():
+            visibility.update_cells(row0, col0, row1, col1)
@@ -0,0 +1,254 @@
+import os
+
+import numpy as np
+
+from entites.batch import (
+    SoldierArrays, BatchEngine, ENGINEER, MEDIC, ASSAULT, SUPPORT,
+    PLAYER_TEAM, ENEMY_TEAM, ACTION_AUTO, NUM_ACTIONS,
+)
+from entites.replay import BattleRecorder
+from map.generate_map import load_map_from_csv
+from map.map_file import MAP_FILE, load_map_file
+from map.line_of_sight import LineOfSight, sight_layers
+from map.visibility import TeamVisibility, terrain_layers
+from entites.influence import FIELDS as INFLUENCE_FIELDS, INFLUENCE_CELL_SIZE, HEAL_REACH_TURNS, HEAL_DISTANCE, \
+    TeamInfluence
+from rl.observation import ObservationEncoder
+
+# 地图文件路径（与 main.py 一致）
+TERRAIN_FILE = "terrain_map.csv"
+HEIGHT_FILE = "height_map.csv"
+
+TILE_SIZE = 5  # 每个地块的大小（像素），与 initialize_map_sprites 一致
+
+# 默认编制：与 TurnBasedStrategyGame.initialize_units 相同
+DEFAULT_ROSTER = (
+    # (兵种, 队伍, x, y)
+    (ENGINEER, PLAYER_TEAM, 100, 100),
+    (MEDIC, PLAYER_TEAM, 150, 100),
+    (ASSAULT, PLAYER_TEAM, 200, 100),
+    (SUPPORT, PLAYER_TEAM, 250, 100),
+    (ENGINEER, ENEMY_TEAM, 500, 500),
+    (MEDIC, ENEMY_TEAM, 550, 500),
+    (ASSAULT, ENEMY_TEAM, 600, 500),
+    (SUPPORT, ENEMY_TEAM, 650, 500),
+)
+
+# 每个单位的观测特征
+OBS_FEATURES = ("x", "y", "health", "armor", "ammo", "team", "unit_type", "alive", "terrain")
+
+WIN_REWARD = 1.0  # 胜利奖励（失败时为负）
+
+# 各兵种的视野距离（像素，与 Soldier.sight_range 一致），用于战争迷雾
+SIGHT_RANGES = {ENGINEER: 150, MEDIC: 150, ASSAULT: 150, SUPPORT: 200}
+
+
+def env_layers(terrain_map, height_map, fog_of_war=False):
+    """由地图预先计算环境需要的派生图层：视线用的 blocking、heights，开启战争迷雾时还有 occluders
+
+    SubprocVecBattleEnv 在父进程中计算一次放进共享内存，通过 layers 交给各个工作进程的环境。
+    """
+    layers = {}
+    layers["blocking"], layers["heights"] = sight_layers(terrain_map, height_map)
+    if fog_of_war:
+        layers["occluders"], _ = terrain_layers(terrain_map, height_map, heights=layers["heights"])
+    return layers
+
+
+def load_game_map():
+    """加载游戏地图，优先使用二进制地图文件（内存映射），不存在时回退到 CSV 文件"""
+    if os.path.exists(MAP_FILE):
+        terrain_map, height_map, _ = load_map_file(MAP_FILE)
+        return terrain_map, height_map
+    game_map = load_map_from_csv(TERRAIN_FILE, HEIGHT_FILE)
+    return game_map[:, :, 0], game_map[:, :, 1]
+
+
+class VecBattleEnv:
+    """无窗口的批量对战环境，一次调用推进 num_envs 局独立的游戏
+
+    智能体控制蓝方单位，红方单位按 handle_turn_logic 的默认规则行动。
+    动作是 (num_envs, 蓝方单位数) 的整数数组，编号见 entites/batch.py 中的 ACTION_*。
+    某一局结束后会在下一次 step 前自动重置。
+    fog_of_war=True 时按蓝方视野屏蔽观测：visible[环境, 单位] 为 False 的单位观测全部为 0。
+    influence=True 时每次观测同时增量更新双方的影响力平面 influence_planes，形状为
+    (num_envs, 2 x len(INFLUENCE_FIELDS), 行, 列)，前一半为蓝方、后一半为红方；开启战争迷雾时只计入可见的敌人。
+    """
+
+    def __init__(self, num_envs, terrain_map=None, height_map=None, roster=DEFAULT_ROSTER,
+                 max_turns=500, tile_size=TILE_SIZE, seed=None, obs_buffer=None, record=False,
+                 fog_of_war=False, influence=False, layers=None):
+        if terrain_map is None or height_map is None:
+            terrain_map, height_map = load_game_map()
+        self.terrain_map = terrain_map
+        self.height_map = height_map
+        self.tile_size = tile_size
+        self.world_width = terrain_map.shape[1] * tile_size
+        self.world_height = terrain_map.shape[0] * tile_size
+
+        self.num_envs = num_envs
+        self.max_turns = max_turns
+        unit_types, teams, xs, ys = zip(*roster)
+        self.initial_units = SoldierArrays.from_roster(unit_types, teams, xs, ys, num_envs)
+        self.player_slots = np.flatnonzero(np.asarray(teams) == PLAYER_TEAM)
+        self.num_actions = NUM_ACTIONS
+
+        # 派生图层（见 env_layers）可以由调用方提供，例如父进程放在共享内存中的只读数组
+        if layers is None:
+            layers = env_layers(terrain_map, height_map, fog_of_war)
+        self.line_of_sight = LineOfSight(terrain_map, height_map, tile_size,
+                                         layers=(layers["blocking"], layers["heights"]))
+        self.engine = BatchEngine(self.initial_units.copy(), seed=seed, line_of_sight=self.line_of_sight,
+                                  bounds=(self.world_width, self.world_height))
+        # 录制对局（record=True 时），可用 recorder.save 保存后通过 entites.replay 回放
+        self.recorder = BattleRecorder(self.engine, seed=seed) if record else None
+        self._reset_envs = np.zeros(num_envs, dtype=bool)  # 上一回合之后被重置的环境，录制时记录下来
+        self.units = self.engine.units
+        self.turns = np.zeros(num_envs, dtype=np.int64)
+        self.needs_reset = np.zeros(num_envs, dtype=bool)
+        self.actions = np.full(self.units.x.shape, ACTION_AUTO, dtype=np.int64)
+        # 观测写入预分配的数组，可以由调用方提供（例如共享内存）
+        obs_shape = (num_envs, self.units.num_units, len(OBS_FEATURES))
+        self.obs = np.zeros(obs_shape, dtype=np.float32) if obs_buffer is None else obs_buffer
+
+        # 战争迷雾：每局一个蓝方视野网格，共用同一份地形遮挡数组
+        self.visible = np.ones(self.units.x.shape, dtype=bool)
+        self.fog = None
+        if fog_of_war:
+            occluders, heights = layers.get("occluders"), layers["heights"]
+            if occluders is None:
+                occluders, _ = terrain_layers(terrain_map, height_map, heights=heights)
+            self.fog = [TeamVisibility(occluders, heights, len(self.player_slots), tile_size)
+                        for _ in range(num_envs)]
+            unit_types = self.units.unit_type[0, self.player_slots]
+            self.sight_ranges = np.array([SIGHT_RANGES[int(kind)] for kind in unit_types], dtype=float)
+
+        # 影响力平面：每局每个阵营一个 TeamInfluence，直接写入 influence_planes 的切片
+        self.influence = None
+        if influence:
+            rows = -(-self.world_height // INFLUENCE_CELL_SIZE)
+            cols = -(-self.world_width // INFLUENCE_CELL_SIZE)
+            num_fields = len(INFLUENCE_FIELDS)
+            self.influence_planes = np.zeros((num_envs, 2 * num_fields, rows, cols), dtype=np.float32)
+            self.team_slots = (self.player_slots, np.flatnonzero(np.asarray(teams) == ENEMY_TEAM))
+            self.influence = [
+                [TeamInfluence(rows, cols, len(slots), INFLUENCE_CELL_SIZE,
+                               fields=self.influence_planes[env, k * num_fields:(k + 1) * num_fields])
+                 for k, slots in enumerate(self.team_slots)]
+                for env in range(num_envs)
+            ]
+
+    def reset(self):
+        """重置所有对局，返回初始观测"""
+        self.units.assign(self.initial_units)
+        self.turns[:] = 0
+        self.needs_reset[:] = False
+        self._reset_envs[:] = True
+        return self.observe()
+
+    def step(self, actions):
+        """所有对局同时推进一个回合，返回 (观测, 奖励, 是否结束, 附加信息)"""
+        if self.needs_reset.any():
+            self.units.assign(self.initial_units, self.needs_reset)
+            self.turns[self.needs_reset] = 0
+            self._reset_envs |= self.needs_reset
+
+        u = self.units
+        player = u.team == PLAYER_TEAM
+        before = np.where(player, -u.health, u.health).sum(axis=1)
+
+        self.actions[:, self.player_slots] = actions
+        if self.recorder is not None:
+            self.recorder.step(self.actions, reset=self._reset_envs)
+        else:
+            self.engine.step(self.actions)
+        self._reset_envs[:] = False
+        self.turns += 1
+
+        after = np.where(player, -u.health, u.health).sum(axis=1)
+        reward = (before - after) / 100
+
+        alive = u.alive()
+        player_alive = (alive & player).any(axis=1)
+        enemy_alive = (alive & ~player).any(axis=1)
+        reward += np.where(~enemy_alive, WIN_REWARD, 0) - np.where(~player_alive, WIN_REWARD, 0)
+        done = ~player_alive | ~enemy_alive | (self.turns >= self.max_turns)
+        self.needs_reset = done
+
+        info = {"turns": self.turns.copy(), "player_alive": player_alive, "enemy_alive": enemy_alive}
+        return self.observe(), reward.astype(np.float32), done, info
+
+    def action_mask(self):
+        """蓝方单位当前可执行的动作，形状为 (num_envs, 蓝方单位数, 动作数)"""
+        return self.units.action_mask()[:, self.player_slots]
+
+    def observation_encoder(self, downsample=1):
+        """创建绑定到本环境单位数组的空间张量编码器，每次 step 后调用其 update 即可"""
+        visible = self.visible if self.fog is not None else None
+        return ObservationEncoder(self.units, self.terrain_map, self.height_map, self.tile_size, downsample,
+                                  visible=visible)
+
+    def update_visibility(self):
+        """更新每局的蓝方视野并写入 visible（蓝方单位总是可见），只重算移动过的单位"""
+        u = self.units
+        slots = self.player_slots
+        for env, visibility in enumerate(self.fog):
+            visibility.update(u.x[env, slots], u.y[env, slots], self.sight_ranges, u.health[env, slots] > 0)
+            self.visible[env] = visibility.visible_at(u.x[env], u.y[env])
+        self.visible[:, slots] = True
+
+    def update_influence(self):
+        """更新每局双方的影响力平面，只重新盖章位置或状态改变的单位"""
+        u = self.units
+        threat = np.where(u.ammo > 0, u.damage * u.fire_rate, 0)
+        heal_range = np.where(u.unit_type == MEDIC, u.speed * HEAL_REACH_TURNS + HEAL_DISTANCE, 0)
+        alive = u.alive() & self.visible
+        for env, teams in enumerate(self.influence):
+            for influence, slots in zip(teams, self.team_slots):
+                influence.update(u.x[env, slots], u.y[env, slots], threat[env, slots], u.range[env, slots],
+                                 heal_range[env, slots], alive[env, slots])
+
+    def observe(self):
+        """把单位状态写入预分配的观测数组（各项已归一化）"""
+        u = self.units
+        if self.fog is not None:
+            self.update_visibility()
+        if self.influence is not None:
+            self.update_influence()
+        obs = self.obs
+        obs[..., 0] = u.x / self.world_width
+        obs[..., 1] = u.y / self.world_height
+        obs[..., 2] = u.health / 100
+        obs[..., 3] = u.armor / 100
+        obs[..., 4] = np.divide(u.ammo, u.max_ammo, out=np.ones_like(u.ammo), where=np.isfinite(u.max_ammo))
+        obs[..., 5] = u.team
+        obs[..., 6] = u.unit_type
+        obs[..., 7] = u.alive()
+        rows = np.clip((u.y // self.tile_size).astype(np.int64), 0, self.terrain_map.shape[0] - 1)
+        cols = np.clip((u.x // self.tile_size).astype(np.int64), 0, self.terrain_map.shape[1] - 1)
+        obs[..., 8] = self.terrain_map[rows, cols]
+        if self.fog is not None:
+            obs *= self.visible[..., None]
+        return obs
+
+
+class BattleEnv:
+    """单局对战环境，接口与 VecBattleEnv 相同但不带批量维度"""
+
+    def __init__(self, **kwargs):
+        self.vec_env = VecBattleEnv(1, **kwargs)
+        self.num_actions = self.vec_env.num_actions
+
+    def reset(self):
+        """重置对局，返回初始观测"""
+        return self.vec_env.reset()[0]
+
+    def step(self, actions):
+        """推进一个回合；actions 为每个蓝方单位的动作编号"""
+        obs, reward, done, info = self.vec_env.step(np.asarray(actions)[None])
+        info = {key: value[0] for key, value in info.items()}
+        return obs[0], float(reward[0]), bool(done[0]), info
+
+    def action_mask(self):
+        """蓝方单位当前可执行的动作"""
+        return self.vec_env.action_mask()[0]
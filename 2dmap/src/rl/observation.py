@@ -0,0 +1,192 @@
+import numpy as np
+
+from entites.batch import ENGINEER, MEDIC, ASSAULT, SUPPORT, PLAYER_TEAM, ENEMY_TEAM
+
+# 地形类型（与 generate_map.py 一致）
+OBSTACLE = 1  # 障碍物
+WATER = 2  # 水域
+MOUNTAIN = 3  # 山地
+MAX_HEIGHT = 100  # 高度范围 0-100
+
+TILE_SIZE = 5  # 每个地块的大小（像素）
+
+# 地形平面：所有环境共用同一张地图，只保存一份
+TERRAIN_PLANES = ("obstacle", "water", "mountain", "height")
+# 单位平面：每个格子内单位的数量、生命值之和、弹药比例之和（按队伍），以及忙碌单位的数量
+UNIT_PLANES = ("blue_units", "blue_health", "blue_ammo", "red_units", "red_health", "red_ammo", "busy")
+# 每个单位的特征
+UNIT_FEATURES = ("x", "y", "health", "armor", "ammo", "alive", "team",
+                 "engineer", "medic", "assault", "support",
+                 "build", "heal", "reload", "aim")
+
+# 判断单位是否变化时比较的字段
+WATCHED_FIELDS = ("x", "y", "health", "armor", "ammo", "build_turns", "heal_turns", "reload_turns", "aim_turns")
+# 各种冷却进度的总回合数（与 soldier.py 一致），用于归一化
+COOLDOWN_TURNS = (("build_turns", 3), ("heal_turns", 5), ("reload_turns", 5), ("aim_turns", 5))
+REBUILD_INTERVAL = 1000  # 每隔多少次增量更新完整重建一次单位平面，消除浮点累加误差
+
+
+class ObservationEncoder:
+    """把批量单位状态编码为预分配的张量缓冲区：空间平面 + 每个单位的特征向量
+
+    - terrain_planes: (len(TERRAIN_PLANES), 行, 列)，只在地形变化时更新
+    - unit_planes: (环境数, len(UNIT_PLANES), 行, 列)
+    - unit_features: (环境数, 单位数, len(UNIT_FEATURES))
+
+    update 只处理自上次以来发生变化的单位：从旧格子减去它原来的贡献，再加到新格子上。
+    downsample 大于 1 时每个平面格子覆盖 downsample x downsample 个地块。
+    visible 为 (环境数, 单位数) 的布尔数组时（战争迷雾，由调用方原地更新），看不见的单位不计入平面，
+    特征全部为 0；可见性变化也按单位变化处理。
+    """
+
+    def __init__(self, units, terrain_map, height_map, tile_size=TILE_SIZE, downsample=1,
+                 rebuild_interval=REBUILD_INTERVAL, visible=None):
+        self.units = units
+        self.visible = visible
+        self.terrain_map = terrain_map
+        self.height_map = height_map
+        self.tile_size = tile_size
+        self.downsample = downsample
+        self.rebuild_interval = rebuild_interval
+        self.rows = -(-terrain_map.shape[0] // downsample)
+        self.cols = -(-terrain_map.shape[1] // downsample)
+        self.world_width = terrain_map.shape[1] * tile_size
+        self.world_height = terrain_map.shape[0] * tile_size
+
+        num_envs, num_units = units.x.shape
+        self.terrain_planes = np.zeros((len(TERRAIN_PLANES), self.rows, self.cols), dtype=np.float32)
+        self.unit_planes = np.zeros((num_envs, len(UNIT_PLANES), self.rows, self.cols), dtype=np.float32)
+        self.unit_features = np.zeros((num_envs, num_units, len(UNIT_FEATURES)), dtype=np.float32)
+        self._tensors = None
+
+        # 每个单位上一次写入平面的位置和贡献，用于增量更新
+        self._cells = np.zeros((num_envs, num_units), dtype=np.int64)
+        self._contrib = np.zeros((num_envs, num_units, 4), dtype=np.float32)  # 数量、生命、弹药、忙碌
+        self._previous = {name: np.zeros_like(getattr(units, name)) for name in WATCHED_FIELDS}
+        self._previous_visible = np.zeros((num_envs, num_units), dtype=bool)
+        self._updates = 0
+
+        self.update_cells(0, 0, terrain_map.shape[0], terrain_map.shape[1])
+        self.rebuild()
+
+    def update_cells(self, row0, col0, row1, col1):
+        """重新编码地块矩形 [row0, row1) x [col0, col1) 所在区域的地形平面"""
+        d = self.downsample
+        pr0, pc0 = row0 // d, col0 // d
+        pr1, pc1 = -(-row1 // d), -(-col1 // d)
+        terrain = self.terrain_map[pr0 * d:pr1 * d, pc0 * d:pc1 * d]
+        height = np.asarray(self.height_map[pr0 * d:pr1 * d, pc0 * d:pc1 * d], dtype=np.float32)
+        for channel, kind in enumerate((OBSTACLE, WATER, MOUNTAIN)):
+            self.terrain_planes[channel, pr0:pr1, pc0:pc1] = self._pool(terrain == kind)
+        self.terrain_planes[3, pr0:pr1, pc0:pc1] = self._pool(height / MAX_HEIGHT)
+
+    def _pool(self, values):
+        """把地块数组按 downsample 求平均（边缘不足的块按实际地块数平均）"""
+        d = self.downsample
+        values = np.asarray(values, dtype=np.float32)
+        if d == 1:
+            return values
+        rows, cols = -(-values.shape[0] // d), -(-values.shape[1] // d)
+        total = np.zeros((rows, cols), dtype=np.float32)
+        count = np.zeros((rows, cols), dtype=np.float32)
+        r = np.arange(values.shape[0]) // d
+        c = np.arange(values.shape[1]) // d
+        np.add.at(total, (r[:, None], c[None, :]), values)
+        np.add.at(count, (r[:, None], c[None, :]), 1)
+        return total / count
+
+    def rebuild(self):
+        """根据当前单位状态完整重建单位平面和特征"""
+        self.unit_planes[:] = 0
+        every = np.ones(self.units.x.shape, dtype=bool)
+        self._contrib[:] = 0
+        self._apply(*np.nonzero(every))
+        self._updates = 0
+
+    def update(self):
+        """增量更新：只处理自上次更新以来状态发生变化的单位，返回变化的单位数"""
+        self._updates += 1
+        if self._updates >= self.rebuild_interval:
+            self.rebuild()
+            return self.units.x.size
+
+        u = self.units
+        changed = np.zeros(u.x.shape, dtype=bool)
+        for name in WATCHED_FIELDS:
+            changed |= getattr(u, name) != self._previous[name]
+        if self.visible is not None:
+            changed |= self.visible != self._previous_visible
+        envs, slots = np.nonzero(changed)
+        if len(envs):
+            self._apply(envs, slots)
+        return len(envs)
+
+    def _apply(self, envs, slots):
+        """把指定单位的旧贡献从平面中减去，写入新的贡献和特征"""
+        u = self.units
+        plane_size = self.rows * self.cols
+        num_planes = len(UNIT_PLANES)
+        flat = self.unit_planes.reshape(-1)
+        team = u.team[envs, slots].astype(np.int64)
+        channel0 = np.where(team == PLAYER_TEAM, 0, 3)
+        base = envs * num_planes * plane_size
+
+        # 减去旧贡献
+        old = self._contrib[envs, slots]
+        old_cells = self._cells[envs, slots]
+        for k in range(3):
+            np.add.at(flat, base + (channel0 + k) * plane_size + old_cells, -old[:, k])
+        np.add.at(flat, base + 6 * plane_size + old_cells, -old[:, 3])
+
+        # 计算并加上新贡献
+        x, y = u.x[envs, slots], u.y[envs, slots]
+        alive = u.health[envs, slots] > 0
+        seen = np.ones(len(envs), dtype=bool) if self.visible is None else self.visible[envs, slots]
+        span = self.tile_size * self.downsample
+        rows = np.clip((y // span).astype(np.int64), 0, self.rows - 1)
+        cols = np.clip((x // span).astype(np.int64), 0, self.cols - 1)
+        cells = rows * self.cols + cols
+        max_ammo = u.max_ammo[envs, slots]
+        ammo = np.divide(u.ammo[envs, slots], max_ammo, out=np.ones(len(envs)), where=np.isfinite(max_ammo))
+        busy = np.zeros(len(envs), dtype=bool)
+        for name, _ in COOLDOWN_TURNS:
+            busy |= getattr(u, name)[envs, slots] > 0
+        new = np.stack((alive, alive * u.health[envs, slots] / 100, alive * ammo, alive & busy), axis=1)
+        new = new.astype(np.float32) * seen[:, None]
+        for k in range(3):
+            np.add.at(flat, base + (channel0 + k) * plane_size + cells, new[:, k])
+        np.add.at(flat, base + 6 * plane_size + cells, new[:, 3])
+        self._contrib[envs, slots] = new
+        self._cells[envs, slots] = cells
+
+        # 每个单位的特征
+        features = self.unit_features
+        features[envs, slots, 0] = x / self.world_width
+        features[envs, slots, 1] = y / self.world_height
+        features[envs, slots, 2] = u.health[envs, slots] / 100
+        features[envs, slots, 3] = u.armor[envs, slots] / 100
+        features[envs, slots, 4] = ammo
+        features[envs, slots, 5] = alive
+        features[envs, slots, 6] = team == ENEMY_TEAM
+        unit_type = u.unit_type[envs, slots]
+        for column, kind in enumerate((ENGINEER, MEDIC, ASSAULT, SUPPORT), start=7):
+            features[envs, slots, column] = unit_type == kind
+        for column, (name, total) in enumerate(COOLDOWN_TURNS, start=11):
+            features[envs, slots, column] = getattr(u, name)[envs, slots] / total
+        features[envs, slots] *= seen[:, None]
+
+        for name in WATCHED_FIELDS:
+            self._previous[name][envs, slots] = getattr(u, name)[envs, slots]
+        self._previous_visible[envs, slots] = seen
+
+    def as_tensors(self):
+        """返回与缓冲区共享内存的 torch 张量（不复制），之后的 update 会直接反映在张量中"""
+        if self._tensors is None:
+            import torch
+
+            self._tensors = {
+                "terrain_planes": torch.from_numpy(self.terrain_planes),
+                "unit_planes": torch.from_numpy(self.unit_planes),
+                "unit_features": torch.from_numpy(self.unit_features),
+            }
+        return self._tensors
@@ -0,0 +1,187 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from rl.env import VecBattleEnv, DEFAULT_ROSTER, OBS_FEATURES, env_layers, load_game_map
+from entites.batch import PLAYER_TEAM
+
+
+def _create_shared(shape, dtype, blocks):
+    """创建共享内存数组，并记录下共享内存块以便关闭"""
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    blocks.append(shm)
+    return (shm.name, shape, dtype.str), np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _share_array(array, blocks):
+    """把数组复制到新的共享内存中，只返回描述（不保留父进程中的视图）"""
+    spec, shared = _create_shared(array.shape, array.dtype, blocks)
+    shared[:] = array
+    return spec
+
+
+def _attach_shared(spec, blocks, readonly=False):
+    """在子进程中按名称挂载共享内存数组"""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    blocks.append(shm)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if readonly:
+        array.flags.writeable = False
+    return array
+
+
+def _worker(conn, start, end, specs, env_kwargs):
+    """工作进程：持有 [start, end) 范围内的环境，直接读写共享内存中的动作和结果"""
+    blocks = []
+    views = {}
+    try:
+        for name in ("terrain", "height"):
+            views[name] = _attach_shared(specs[name], blocks, readonly=True)
+        layers = {name: _attach_shared(spec, blocks, readonly=True) for name, spec in specs["layers"].items()}
+        for name in ("actions", "obs", "reward", "done"):
+            views[name] = _attach_shared(specs[name], blocks)[start:end]
+        env = VecBattleEnv(end - start, views["terrain"], views["height"], obs_buffer=views["obs"], layers=layers,
+                           **env_kwargs)
+        conn.send(None)
+
+        while True:
+            command = conn.recv()
+            if command == "step":
+                _, views["reward"][:], views["done"][:], _ = env.step(views["actions"])
+            elif command == "reset":
+                env.reset()
+            elif command == "close":
+                break
+            conn.send(None)
+    except Exception as e:
+        conn.send(f"{type(e).__name__}: {e}")
+    finally:
+        # 先释放数组视图，否则共享内存无法关闭
+        env = layers = None
+        views.clear()
+        for shm in blocks:
+            shm.close()
+        conn.close()
+
+
+class SubprocVecBattleEnv:
+    """多进程批量对战环境：每个工作进程负责一段环境，结果直接写入共享内存
+
+    每一步父进程只把动作写入共享数组，再向每个工作进程发送一条很短的命令并等待应答，
+    观测、奖励和结束标志都不经过管道序列化。地形和高度地图，以及由它们派生的视线和视野图层
+    （在父进程中用 env_layers 计算一次）都放在只读共享内存中，所有工作进程共用一份。
+    返回的观测、奖励和结束标志是共享内存的视图，下一次 step 时会被覆盖。
+    """
+
+    def __init__(self, num_envs, num_workers=None, terrain_map=None, height_map=None,
+                 roster=DEFAULT_ROSTER, seed=None, start_method=None, **env_kwargs):
+        # 先建立 close 需要的全部状态：后面任何一步失败时都能释放已经创建的共享内存和进程
+        self.closed = False
+        self._blocks = []
+        self.conns = []
+        self.processes = []
+        self.actions = self.obs = self.reward = self.done = None
+        try:
+            self._start(num_envs, num_workers, terrain_map, height_map, roster, seed, start_method, env_kwargs)
+        except BaseException:
+            self.close()
+            raise
+
+    def _start(self, num_envs, num_workers, terrain_map, height_map, roster, seed, start_method, env_kwargs):
+        """创建共享内存并启动工作进程，等待它们全部就绪"""
+        if terrain_map is None or height_map is None:
+            terrain_map, height_map = load_game_map()
+        num_workers = min(num_workers or mp.cpu_count(), num_envs)
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+
+        num_units = len(roster)
+        num_players = sum(team == PLAYER_TEAM for _, team, _, _ in roster)
+        specs = {}
+        specs["terrain"] = _share_array(terrain_map, self._blocks)
+        specs["height"] = _share_array(height_map, self._blocks)
+        layers = env_layers(terrain_map, height_map, env_kwargs.get("fog_of_war", False))
+        specs["layers"] = {name: _share_array(layer, self._blocks) for name, layer in layers.items()}
+        specs["actions"], self.actions = _create_shared((num_envs, num_players), np.int64, self._blocks)
+        specs["obs"], self.obs = _create_shared((num_envs, num_units, len(OBS_FEATURES)), np.float32, self._blocks)
+        specs["reward"], self.reward = _create_shared((num_envs,), np.float32, self._blocks)
+        specs["done"], self.done = _create_shared((num_envs,), bool, self._blocks)
+
+        # 按工作进程平均切分环境，每个工作进程使用独立的随机流
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        seeds = np.random.SeedSequence(seed).spawn(num_workers)
+        ctx = mp.get_context(start_method)
+        for i in range(num_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            self.conns.append(parent_conn)
+            kwargs = dict(env_kwargs, roster=roster, seed=seeds[i])
+            process = ctx.Process(target=_worker, daemon=True,
+                                  args=(child_conn, int(bounds[i]), int(bounds[i + 1]), specs, kwargs))
+            try:
+                process.start()
+            finally:
+                child_conn.close()
+            self.processes.append(process)
+        self._wait()
+
+    def _broadcast(self, command):
+        """向所有工作进程发送命令并等待全部应答"""
+        for conn in self.conns:
+            conn.send(command)
+        self._wait()
+
+    def _wait(self):
+        """等待所有工作进程应答，任何一个出错或意外退出时抛出异常"""
+        errors = []
+        for conn in self.conns:
+            try:
+                error = conn.recv()
+            except (EOFError, OSError) as e:
+                error = f"工作进程意外退出（{type(e).__name__}）"
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise RuntimeError(f"工作进程出错：{errors[0]}")
+
+    def reset(self):
+        """重置所有对局，返回初始观测"""
+        self._broadcast("reset")
+        return self.obs
+
+    def step(self, actions):
+        """所有对局同时推进一个回合，返回 (观测, 奖励, 是否结束, 附加信息)"""
+        self.actions[:] = actions
+        self._broadcast("step")
+        return self.obs, self.reward, self.done, {}
+
+    def close(self):
+        """关闭工作进程并释放共享内存；构造到一半失败时也可以调用"""
+        if getattr(self, "closed", True):
+            return
+        self.closed = True
+        for conn in self.conns:
+            try:
+                conn.send("close")
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for conn in self.conns:
+            conn.close()
+        self.actions = self.obs = self.reward = self.done = None
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,114 @@
+import time
+
+# 调度模式
+MODE_REALTIME = "realtime"  # 按固定的每秒回合数推进，与帧率无关
+MODE_FAST = "fast"  # 每帧固定推进若干回合（相当于每隔 K 回合渲染一次）
+MODE_UNTHROTTLED = "unthrottled"  # 每帧在时间预算内尽量多推进回合，渲染只占剩余时间
+MODES = (MODE_REALTIME, MODE_FAST, MODE_UNTHROTTLED)
+
+DEFAULT_TURN_DELAY = 0.1  # 每回合的时长（秒），与 settings.py 中的 turn_delay 一致
+MAX_TURNS_PER_UPDATE = 8  # 实时模式下一帧最多补跑的回合数，避免卡顿后越追越慢
+DEFAULT_TURNS_PER_FRAME = 10  # 快进模式下每帧推进的回合数
+FRAME_BUDGET = 1 / 60  # 不限速模式下每帧用于模拟的时间（秒）
+
+
+class TurnScheduler:
+    """把回合推进和渲染分开：on_update 把帧间隔交给 update，由调度器决定本帧执行几个回合
+
+    实时模式使用固定时间步长的累加器，回合速度不受帧率影响；
+    快进模式每帧执行固定数量的回合；不限速模式在每帧的时间预算内尽可能多地执行回合。
+    """
+
+    def __init__(self, turn_delay=DEFAULT_TURN_DELAY, mode=MODE_REALTIME, turns_per_frame=DEFAULT_TURNS_PER_FRAME,
+                 frame_budget=FRAME_BUDGET, max_turns_per_update=MAX_TURNS_PER_UPDATE):
+        self.turn_delay = turn_delay
+        self.mode = mode
+        self.turns_per_frame = turns_per_frame
+        self.frame_budget = frame_budget
+        self.max_turns_per_update = max_turns_per_update
+        self.paused = False
+        self.accumulator = 0.0
+        self.turns = 0  # 累计执行的回合数
+
+    @property
+    def turns_per_second(self):
+        return 1 / self.turn_delay
+
+    @turns_per_second.setter
+    def turns_per_second(self, value):
+        self.turn_delay = 1 / value
+
+    @property
+    def alpha(self):
+        """实时模式下距离下一回合的进度（0-1），可用于插值绘制"""
+        return min(self.accumulator / self.turn_delay, 1.0)
+
+    def set_mode(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"未知的调度模式：{mode}")
+        self.mode = mode
+        self.accumulator = 0.0
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        self.accumulator = 0.0
+
+    def speed_up(self, factor=2):
+        """加快速度：实时模式缩短回合时长，快进模式增加每帧回合数"""
+        if self.mode == MODE_FAST:
+            self.turns_per_frame = max(int(self.turns_per_frame * factor), 1)
+        else:
+            self.turn_delay /= factor
+
+    def slow_down(self, factor=2):
+        self.speed_up(1 / factor)
+
+    def update(self, delta_time, step):
+        """根据帧间隔执行若干次 step()，返回本帧执行的回合数；step 返回 False 时停止"""
+        if self.paused:
+            return 0
+        if self.mode == MODE_REALTIME:
+            self.accumulator += delta_time
+            count = min(int(self.accumulator / self.turn_delay), self.max_turns_per_update)
+            if count == self.max_turns_per_update:
+                self.accumulator = 0.0  # 追不上时丢弃积压的时间
+            else:
+                self.accumulator -= count * self.turn_delay
+            return self._run(count, step)
+        if self.mode == MODE_FAST:
+            return self._run(self.turns_per_frame, step)
+
+        deadline = time.perf_counter() + self.frame_budget
+        count = 0
+        while time.perf_counter() < deadline:
+            if step() is False:
+                break
+            count += 1
+        self.turns += count
+        return count
+
+    def _run(self, count, step):
+        done = 0
+        for _ in range(count):
+            if step() is False:
+                break
+            done += 1
+        self.turns += done
+        return done
+
+
+def run_headless(step, max_turns=None, render=None, render_every=0):
+    """不限速地连续执行回合，不打开窗口
+
+    step() 返回 False 时停止；render_every 大于 0 时每隔这么多回合调用一次 render()，
+    为 0 时完全不渲染。返回 (执行的回合数, 耗时秒数)。
+    """
+    start = time.perf_counter()
+    turns = 0
+    while max_turns is None or turns < max_turns:
+        if step() is False:
+            break
+        turns += 1
+        if render is not None and render_every > 0 and turns % render_every == 0:
+            render()
+    return turns, time.perf_counter() - start
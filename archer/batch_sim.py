@@ -0,0 +1,142 @@
+import argparse
+
+import numpy as np
+
+from archer import LONG_ATTACK_NUM, LONG_DEFENCE_NUM, techplus_long_attack, techplus_long_defence
+
+TEAM_SIZE = 5  # 每队弓箭手数量（与 archer.main 一致）
+MAX_HP = 100  # 初始生命值（与 Archer 一致）
+MAX_TURNS = 1000  # 超过该回合数仍未分出胜负的对局记为未结束
+
+
+def random_policy(hp, alive, num_shooters, rng):
+    """在存活的目标中均匀随机选择（与电脑的 random.choice 一致）；策略返回 np.intp 的目标编号"""
+    # 拒绝采样：抽到已阵亡的目标就只对这些射手重抽，分布与在存活目标中均匀抽取相同
+    target = rng.integers(0, hp.shape[1], (hp.shape[0], num_shooters), dtype=np.intp)
+    retry = ~np.take_along_axis(alive, target, axis=1) & alive.any(axis=1)[:, None]
+    rows, shooters = np.nonzero(retry)
+    while len(rows):
+        redraw = rng.integers(0, hp.shape[1], len(rows), dtype=np.intp)
+        target[rows, shooters] = redraw
+        pending = ~alive[rows, redraw]
+        rows, shooters = rows[pending], shooters[pending]
+    return target
+
+
+def focus_first_policy(hp, alive, num_shooters, rng):
+    """所有弓箭手集火编号最小的存活目标"""
+    target = alive.argmax(axis=1).astype(np.intp)
+    return np.repeat(target[:, None], num_shooters, axis=1)
+
+
+def focus_weakest_policy(hp, alive, num_shooters, rng):
+    """所有弓箭手集火生命值最低的存活目标"""
+    target = np.where(alive, hp, np.iinfo(hp.dtype).max).argmin(axis=1).astype(np.intp)
+    return np.repeat(target[:, None], num_shooters, axis=1)
+
+
+POLICIES = {
+    "random": random_policy,
+    "focus_first": focus_first_policy,
+    "focus_weakest": focus_weakest_policy,
+}
+
+
+def _shoot(hp, shooters_alive, targets, damage):
+    """把一队所有存活弓箭手的射击一次性结算到对方队伍上（与逐个调用 take_damage 相同）"""
+    # 已阵亡的射手把目标设为 -1，不会命中任何人
+    targets = np.where(shooters_alive, targets, -1)
+    for slot in range(hp.shape[1]):
+        hits = (targets == slot).sum(axis=1, dtype=np.int32)
+        np.maximum(hp[:, slot] - hits * damage, 0, out=hp[:, slot])
+
+
+def simulate_matches(num_matches, team_size=TEAM_SIZE, red_policy="random", black_policy="random",
+                     red_attack=None, red_defence=None, black_attack=None, black_defence=None,
+                     max_turns=MAX_TURNS, seed=None):
+    """同时模拟大量对局，规则与 game_turn / check_game_over 相同
+
+    每回合双方在回合开始时存活的弓箭手各自选择目标；红队先结算射击，黑队后结算，
+    但回合开始时存活的黑队弓箭手即使在本回合被击杀也会完成射击。
+    攻防默认取 archer.py 中的常量加科技加成；假设攻击力不低于防御力。
+    返回各对局的胜方（1 红队、2 黑队、0 未结束）和结束回合数。
+    """
+    rng = np.random.default_rng(seed)
+    red_policy = POLICIES.get(red_policy, red_policy)
+    black_policy = POLICIES.get(black_policy, black_policy)
+    red_attack = LONG_ATTACK_NUM + techplus_long_attack if red_attack is None else red_attack
+    black_attack = LONG_ATTACK_NUM + techplus_long_attack if black_attack is None else black_attack
+    red_defence = LONG_DEFENCE_NUM + techplus_long_defence if red_defence is None else red_defence
+    black_defence = LONG_DEFENCE_NUM + techplus_long_defence if black_defence is None else black_defence
+
+    red_hp = np.full((num_matches, team_size), MAX_HP, dtype=np.int32)
+    black_hp = np.full((num_matches, team_size), MAX_HP, dtype=np.int32)
+    winner = np.zeros(num_matches, dtype=np.int8)
+    turns = np.full(num_matches, max_turns, dtype=np.int64)
+    active = np.arange(num_matches)  # 尚未结束的对局
+
+    for turn in range(1, max_turns + 1):
+        if len(active) == 0:
+            break
+        red, black = red_hp[active], black_hp[active]
+        red_alive, black_alive = red > 0, black > 0
+
+        # 双方在回合开始时选定目标
+        red_targets = red_policy(black, black_alive, team_size, rng)
+        black_targets = black_policy(red, red_alive, team_size, rng)
+
+        # 红队先射击，黑队后射击
+        _shoot(black, red_alive, red_targets, red_attack - black_defence)
+        _shoot(red, black_alive, black_targets, black_attack - red_defence)
+        red_hp[active], black_hp[active] = red, black
+
+        # 与 check_game_over 一致：红队全灭时判黑队胜（即使黑队也全灭）
+        red_dead = ~(red > 0).any(axis=1)
+        black_dead = ~(black > 0).any(axis=1)
+        finished = red_dead | black_dead
+        winner[active[red_dead]] = 2
+        winner[active[black_dead & ~red_dead]] = 1
+        turns[active[finished]] = turn
+        active = active[~finished]
+
+    return {"winner": winner, "turns": turns}
+
+
+def summarize(result):
+    """打印胜率和回合数分布"""
+    winner, turns = result["winner"], result["turns"]
+    total = len(winner)
+    print(f"对局数：{total}")
+    print(f"红队胜率：{np.mean(winner == 1):.4f}")
+    print(f"黑队胜率：{np.mean(winner == 2):.4f}")
+    print(f"未结束：{np.mean(winner == 0):.4f}")
+    finished = turns[winner > 0]
+    if len(finished):
+        print(f"回合数：平均 {finished.mean():.2f}，最少 {finished.min()}，最多 {finished.max()}")
+        print(f"回合数分位数（5%/50%/95%）：{np.percentile(finished, [5, 50, 95])}")
+        counts = np.bincount(finished)
+        for turn in np.flatnonzero(counts):
+            print(f"  {turn:4d} 回合：{counts[turn] / total:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量模拟弓箭手对局，用于平衡攻防数值")
+    parser.add_argument("--matches", type=int, default=1000000, help="对局数量")
+    parser.add_argument("--team-size", type=int, default=TEAM_SIZE, help="每队弓箭手数量")
+    parser.add_argument("--red-policy", choices=POLICIES, default="random", help="红队选择目标的策略")
+    parser.add_argument("--black-policy", choices=POLICIES, default="random", help="黑队选择目标的策略")
+    parser.add_argument("--red-attack", type=int, help="红队远攻（默认取 archer.py 中的设置）")
+    parser.add_argument("--red-defence", type=int, help="红队远防")
+    parser.add_argument("--black-attack", type=int, help="黑队远攻")
+    parser.add_argument("--black-defence", type=int, help="黑队远防")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    args = parser.parse_args()
+
+    result = simulate_matches(args.matches, args.team_size, args.red_policy, args.black_policy,
+                              args.red_attack, args.red_defence, args.black_attack, args.black_defence,
+                              seed=args.seed)
+    summarize(result)
+
+
+if __name__ == "__main__":
+    main()
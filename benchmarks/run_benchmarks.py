@@ -0,0 +1,349 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 用法：python benchmarks/run_benchmarks.py [--output results.json] [--quick] [--filter 名称片段]
+# 所有用例都使用固定种子；缺少 arcade 或无法创建窗口时对应用例记为跳过。
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "2dmap", "src"))
+sys.path.insert(0, os.path.join(ROOT, "archer"))
+
+SEED = 12345
+MIN_TIME = 1.0  # 每个用例至少计时的秒数
+MIN_REPEATS = 3  # 单次耗时超过 min_time 的用例也至少重复几次，中位数才有意义
+MAX_REPEATS = 50
+# handle_turn_logic 的大规模用例（单位数不少于 LARGE_UNITS）只要求重复一次，并且累计耗时超过预算后不再重复
+LARGE_UNITS = 1000
+LARGE_TIME_BUDGET = 60.0
+LARGE_MAX_TURNS = 8  # 大规模用例每次重复最多计时的回合数
+
+
+class Skip(Exception):
+    """用例在当前环境无法运行"""
+
+
+def measure(run, min_time=MIN_TIME, max_repeats=MAX_REPEATS, setup=None, min_repeats=MIN_REPEATS, budget=None):
+    """重复执行 run() 直到累计时间达到 min_time 且至少 min_repeats 次，返回每次耗时的列表
+
+    给出 setup 时每次重复前先调用（不计时），其返回值传给 run，保证每次计时都从相同的初始状态开始。
+    给出 budget（秒）时，累计计时超过预算后立即停止，即使还不到 min_repeats 次。
+    """
+    times = []
+    total = 0.0
+    while len(times) < min_repeats or (total < min_time and len(times) < max_repeats):
+        if budget is not None and times and total >= budget:
+            break
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        run(*args)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    return times
+
+
+def result(name, params, times, work=None, unit=None):
+    """整理为一条 JSON 记录；work 为每次执行完成的工作量（如回合数），用于计算吞吐量"""
+    entry = {
+        "name": name,
+        "params": params,
+        "repeats": len(times),
+        "min_seconds": min(times),
+        "median_seconds": statistics.median(times),
+    }
+    if work is not None:
+        entry["throughput"] = work / statistics.median(times)
+        entry["unit"] = unit
+    return entry
+
+
+def bench_generate_map(sizes):
+    from map.generate_map import generate_random_map
+
+    for size in sizes:
+        times = measure(lambda: generate_random_map(size, size, seed=SEED))
+        yield result("generate_random_map", {"width": size, "height": size}, times, size * size, "cells/s")
+
+
+def bench_csv_roundtrip(sizes):
+    from map.generate_map import generate_random_map, save_map_to_csv, load_map_from_csv
+
+    for size in sizes:
+        game_map = generate_random_map(size, size, seed=SEED)
+        with tempfile.TemporaryDirectory() as directory:
+            terrain_file = os.path.join(directory, "terrain_map.csv")
+            height_file = os.path.join(directory, "height_map.csv")
+
+            def run():
+                save_map_to_csv(game_map, terrain_file, height_file)
+                load_map_from_csv(terrain_file, height_file)
+
+            times = measure(run)
+        yield result("csv_roundtrip", {"width": size, "height": size}, times, size * size, "cells/s")
+
+
+def bench_map_file_roundtrip(sizes):
+    from map.generate_map import generate_random_map
+    from map.map_file import save_map_file, load_map_file
+
+    for size in sizes:
+        game_map = generate_random_map(size, size, seed=SEED)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "game_map.bmap")
+
+            def run():
+                save_map_file(filename, game_map[:, :, 0], game_map[:, :, 1], seed=SEED)
+                terrain_map, height_map, _ = load_map_file(filename, mmap=False)
+
+            times = measure(run)
+        yield result("map_file_roundtrip", {"width": size, "height": size}, times, size * size, "cells/s")
+
+
+def bench_map_sprites(sizes):
+    """对应 initialize_map_sprites：把地形烘焙为区块贴图（需要 arcade 和可用的 OpenGL 窗口）"""
+    from map.generate_map import generate_random_map
+    from map.map_render import TerrainRenderer, terrain_colors
+
+    for size in sizes:
+        game_map = generate_random_map(size, size, seed=SEED)
+        times = measure(lambda: terrain_colors(game_map[:, :, 0], game_map[:, :, 1]))
+        yield result("terrain_colors", {"width": size, "height": size}, times, size * size, "cells/s")
+
+    try:
+        import arcade
+        window = arcade.Window(64, 64, "benchmark", visible=False)
+    except Exception as e:  # 没有 arcade 或没有显示设备
+        raise Skip(f"initialize_map_sprites: {e.__class__.__name__}: {e}")
+    try:
+        for size in sizes:
+            game_map = generate_random_map(size, size, seed=SEED)
+
+            def run():
+                TerrainRenderer(game_map[:, :, 0], game_map[:, :, 1]).build()
+
+            times = measure(run)
+            yield result("initialize_map_sprites", {"width": size, "height": size}, times, size * size, "cells/s")
+    finally:
+        window.close()
+
+
+def bench_terrain_edit(size, edits):
+    """地形局部修改：放置障碍物后通知寻路和视线服务（只刷新脏矩形）"""
+    from map.generate_map import generate_random_map, OBSTACLE
+    from map.pathfinding import PathFinder
+    from map.line_of_sight import LineOfSight
+    from map.terrain import MutableTerrain
+
+    game_map = generate_random_map(size, size, seed=SEED)
+    terrain_map, height_map = game_map[:, :, 0].copy(), game_map[:, :, 1].copy()
+    terrain = MutableTerrain(terrain_map, height_map)
+    terrain.add_listener(PathFinder(terrain_map).update_cells)
+    terrain.add_listener(LineOfSight(terrain_map, height_map).update_cells)
+    original = terrain_map.copy()
+    rng = np.random.default_rng(SEED)
+    cells = []
+
+    def setup():
+        # 还原上一次放置的障碍物，再换一批格子，每次重复都从原始地图开始
+        for row, col in cells:
+            terrain.set_cell(row, col, original[row, col])
+        terrain.flush()
+        cells[:] = rng.integers(0, size, (edits, 2)).tolist()
+        return cells
+
+    def run(cells):
+        for row, col in cells:
+            terrain.set_cell(row, col, OBSTACLE)
+            terrain.flush()
+
+    times = measure(run, setup=setup)
+    yield result("terrain_edit", {"width": size, "height": size, "edits": edits}, times, edits, "edits/s")
+
+
+def _random_roster(num_units, world, rng):
+    """两队各一半单位，蓝方在左下、红方在右上，兵种轮流分配"""
+    half = num_units // 2
+    xs = np.concatenate((rng.uniform(0, world / 2, half), rng.uniform(world / 2, world, num_units - half)))
+    ys = np.concatenate((rng.uniform(0, world / 2, half), rng.uniform(world / 2, world, num_units - half)))
+    teams = np.array([0] * half + [1] * (num_units - half))
+    types = np.arange(num_units) % 4
+    return types, teams, xs, ys
+
+
+def bench_handle_turn_logic(unit_counts, turns):
+    """Battle.handle_turn_logic（对象版本的回合逻辑）每秒回合数"""
+    try:
+        from battle import Battle
+        from entites.soldier import Engineer, Medic, Assault, Support
+    except ImportError as e:
+        raise Skip(f"handle_turn_logic: {e}")
+    from events import event_log, OFF
+    from map.generate_map import generate_random_map
+
+    event_log.set_level(OFF)
+    classes = (Engineer, Medic, Assault, Support)
+    game_map = generate_random_map(400, 400, seed=SEED)
+    for num_units, fog_of_war in ((n, fog) for n in unit_counts for fog in (False, True)):
+        def setup():
+            rng = np.random.default_rng(SEED)
+            battle = Battle(seed=SEED, fog_of_war=fog_of_war)
+            battle.terrain_map, battle.height_map = game_map[:, :, 0], game_map[:, :, 1]
+            battle.bind_terrain()
+            types, teams, xs, ys = _random_roster(num_units, 2000, rng)
+            units = [classes[t](float(x), float(y), "蓝方" if team == 0 else "红方")
+                     for t, team, x, y in zip(types, teams, xs, ys)]
+            for unit in units:
+                if isinstance(unit, Support):
+                    unit.line_of_sight = battle.line_of_sight
+                elif isinstance(unit, Engineer):
+                    unit.terrain = battle.terrain
+            battle.player_units = [u for u, team in zip(units, teams) if team == 0]
+            battle.enemy_units = [u for u, team in zip(units, teams) if team == 1]
+            battle.player_commands.bind(battle.player_units)
+            battle.enemy_commands.bind(battle.enemy_units)
+            return battle
+
+        # 对象版本每个移动中的单位都要寻路，大规模时每回合可能需要数秒，只跑少量回合
+        large = num_units >= LARGE_UNITS
+        n = max(turns // max(num_units // 8, 1), 1)
+        if large:
+            n = min(n, LARGE_MAX_TURNS)
+
+        def run(battle):
+            for _ in range(n):
+                battle.handle_turn_logic()
+
+        # 每次重复前重新布置对局，计时的总是同样的 n 个回合；大规模用例只保证一次，超出时间预算后停止
+        times = measure(run, setup=setup, min_repeats=1 if large else MIN_REPEATS,
+                        budget=LARGE_TIME_BUDGET if large else None)
+        entry = result("handle_turn_logic", {"units": num_units, "turns": n, "fog_of_war": fog_of_war},
+                       times, n, "turns/s")
+        if large and sum(times) >= LARGE_TIME_BUDGET:
+            entry["note"] = f"超出 {LARGE_TIME_BUDGET:g} 秒时间预算，只重复了 {len(times)} 次"
+        yield entry
+
+
+def bench_batch_engine(unit_counts, turns):
+    """BatchEngine（向量化回合引擎）每秒回合数"""
+    from entites.batch import BatchEngine, SoldierArrays
+
+    for num_units in unit_counts:
+        rng = np.random.default_rng(SEED)
+        types, teams, xs, ys = _random_roster(num_units, 2000, rng)
+        engine = BatchEngine(SoldierArrays.from_roster(types, teams, xs, ys), seed=SEED)
+        n = max(turns // max(num_units // 8, 1), 3)
+
+        def run():
+            for _ in range(n):
+                engine.step()
+
+        times = measure(run)
+        yield result("batch_engine_step", {"units": num_units, "turns": n}, times, n, "turns/s")
+
+
+def bench_archer(num_games):
+    """archer.game_turn 对局吞吐量，玩家按脚本选择第一个存活目标"""
+    import archer
+
+    def scripted_target(team):
+        return next(i for i, a in enumerate(team) if a.is_alive())
+
+    def run():
+        random.seed(SEED)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(num_games):
+                player_team = [archer.Archer(f"红队{i + 1}") for i in range(5)]
+                computer_team = [archer.Archer(f"黑队{i + 1}") for i in range(5)]
+                while True:
+                    archer.game_turn(player_team, computer_team)
+                    if archer.check_game_over(player_team, computer_team):
+                        break
+
+    original = archer.get_target
+    archer.get_target = scripted_target
+    try:
+        times = measure(run)
+    finally:
+        archer.get_target = original
+    yield result("archer_game_turn", {"games": num_games}, times, num_games, "games/s")
+
+    from batch_sim import simulate_matches
+
+    matches = num_games * 1000
+    times = measure(lambda: simulate_matches(matches, red_policy="focus_first", seed=SEED))
+    yield result("archer_batch_sim", {"matches": matches}, times, matches, "games/s")
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BATULU 性能基准")
+    parser.add_argument("--output", default="benchmark_results.json", help="结果 JSON 文件")
+    parser.add_argument("--quick", action="store_true", help="使用较小的规模，快速检查")
+    parser.add_argument("--filter", help="只运行名称包含该字符串的用例组")
+    args = parser.parse_args()
+
+    map_sizes = [128, 256] if args.quick else [256, 1000, 2000]
+    csv_sizes = [128] if args.quick else [256, 1000]
+    unit_counts = [8, 200] if args.quick else [8, 1000, 10000]
+    turns = 200 if args.quick else 1000
+    suites = {
+        "generate_map": lambda: bench_generate_map(map_sizes),
+        "csv_roundtrip": lambda: bench_csv_roundtrip(csv_sizes),
+        "map_file_roundtrip": lambda: bench_map_file_roundtrip(map_sizes),
+        "map_sprites": lambda: bench_map_sprites(csv_sizes),
+        "terrain_edit": lambda: bench_terrain_edit(map_sizes[-1], 100),
+        "handle_turn_logic": lambda: bench_handle_turn_logic(unit_counts, turns),
+        "batch_engine": lambda: bench_batch_engine(unit_counts, turns),
+        "archer": lambda: bench_archer(10 if args.quick else 100),
+    }
+
+    results, skipped = [], []
+    for name, suite in suites.items():
+        if args.filter and args.filter not in name:
+            continue
+        try:
+            for entry in suite():
+                results.append(entry)
+                rate = f"，{entry['throughput']:.1f} {entry['unit']}" if "throughput" in entry else ""
+                note = f"（{entry['note']}）" if "note" in entry else ""
+                print(f"{entry['name']} {entry['params']}：{entry['median_seconds'] * 1000:.2f} ms{rate}{note}")
+        except Skip as e:
+            skipped.append({"suite": name, "reason": str(e)})
+            print(f"跳过 {name}：{e}")
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": SEED,
+        "results": results,
+        "skipped": skipped,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()